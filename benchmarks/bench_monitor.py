@@ -0,0 +1,277 @@
+"""
+Benchmarks of lastfm_monitor.py hot paths; Last.fm, Spotify and the web scraping are replaced by in-memory stubs
+"""
+
+import contextlib
+import os
+import random
+import tempfile
+import time
+
+import pylast
+
+import lastfm_monitor as lm
+from common import benchmark, scaled, quiet, VirtualClock
+
+# Fixed terminal width, so the table layout does not depend on where the benchmarks run
+os.environ["COLUMNS"] = "160"
+
+ARTISTS = ["Radiohead", "Björk", "The National", "Sigur Rós", "Boards of Canada", "Nick Cave & The Bad Seeds", "Portishead", "Massive Attack", "Aphex Twin", "Fleetwood Mac"]
+WORDS = ["Love", "Night", "Paranoid", "Android", "Glass", "Heart", "Remastered", "Live", "Version", "Blue", "Teardrop", "Angel", "Dreams", "Everything", "Place"]
+
+
+class StopLoop(BaseException):
+    pass
+
+
+def make_network():
+    return pylast.LastFMNetwork("benchmark_api_key", "benchmark_api_secret")
+
+
+def make_tracks(network, count, seed=1):
+    rng = random.Random(seed)
+    tracks = []
+    for i in range(count):
+        artist = rng.choice(ARTISTS)
+        title = " ".join(rng.sample(WORDS, rng.randint(1, 4))) + f" {i}"
+        album = " ".join(rng.sample(WORDS, 2))
+        tracks.append(pylast.Track(artist, title, network, info={"album": album}))
+    return tracks
+
+
+# Temporarily replaces module attributes of lastfm_monitor
+@contextlib.contextmanager
+def patched(**attrs):
+    saved = {name: getattr(lm, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(lm, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(lm, name, value)
+
+
+# Listening session played by the stubbed Last.fm user: tracks of ~3 mins, short pauses and long breaks making the user inactive
+def make_session_script(tracks, ticks, active_interval):
+    rng = random.Random(2)
+    script = []
+    while len(script) < ticks:
+        roll = rng.random()
+        if roll < 0.05:
+            script.extend([None] * (600 // active_interval))
+        elif roll < 0.15:
+            script.extend([None] * (60 // active_interval))
+        else:
+            track = rng.choice(tracks)
+            script.extend([track] * rng.randint(2, 180 // active_interval))
+    return script[:ticks]
+
+
+@benchmark("monitor_loop_ticks", unit="ticks")
+def bench_monitor_loop(scale):
+    network = make_network()
+    tracks = make_tracks(network, 200)
+    ticks = scaled(5000, scale)
+    script = make_session_script(tracks, ticks, 10)
+    tmpdir = tempfile.mkdtemp(prefix="lastfm_bench_")
+
+    def run():
+        clock = VirtualClock()
+        history = [pylast.PlayedTrack(tracks[0], "Album", "", str(int(clock.now) - 86400))]
+        state = {"tick": 0, "playing": None}
+
+        def on_sleep():
+            tick = state["tick"]
+            if tick >= len(script):
+                raise StopLoop
+            state["tick"] = tick + 1
+            track = script[tick]
+            if track is not None and track is not state["playing"]:
+                history.append(pylast.PlayedTrack(track, "Album", "", str(int(clock.now))))
+            state["playing"] = track
+
+        clock.on_sleep = on_sleep
+        user = type("StubUser", (), {"get_now_playing": staticmethod(lambda: state["playing"])})()
+
+        with patched(time=clock.module(time), lastfm_get_recent_tracks=lambda username, net, number: history[:-number - 1:-1], get_track_info=lambda artist, track, album, net: (200, None, ""), send_email=lambda *a, **k: 0,
+                     LASTFM_JSON_API=False, CHECKPOINT_INTERVAL=0, LASTFM_ACTIVE_CHECK_INTERVAL=10, LASTFM_CHECK_INTERVAL=10, LASTFM_INACTIVITY_CHECK=180, PROGRESS_INDICATOR=True), contextlib.chdir(tmpdir), quiet():
+            try:
+                lm.lastfm_monitor_user(user, network, "bench_user", [], None)
+            except StopLoop:
+                pass
+
+    return run, ticks
+
+
+@benchmark("state_machine_observations", unit="observations")
+def bench_state_machine(scale):
+    observations = scaled(100000, scale)
+    tracks = [(a, f"Track {i}", "Album") for i, a in enumerate(ARTISTS * 20)]
+    script = make_session_script(tracks, observations, 10)
+    timeline = []
+    now = 1_700_000_000
+    last_start = now - 86400
+    previous = None
+    for track in script:
+        now += 10
+        if track is not None and track is not previous:
+            last_start = now
+        previous = track
+        timeline.append((now, last_start, track))
+
+    def run():
+        machine = lm.MonitorStateMachine(LASTFM_ACTIVE_CHECK_INTERVAL=10, LASTFM_INACTIVITY_CHECK=180)
+        observe = machine.observe
+        for now, last_start, track in timeline:
+            observe(now, last_start, track)
+
+    return run, observations
+
+
+@benchmark("spotify_search_process_track_items", unit="items")
+def bench_spotify_scoring(scale):
+    rng = random.Random(3)
+    count = scaled(2000, scale)
+    items = []
+    # No candidate is an exact match, so the scoring never stops early and every item is scored
+    for i in range(count):
+        artist = rng.choice(ARTISTS)
+        name = rng.choice(["Paranoid Android - Remastered", "Android Paranoid", "Karma Police", "Teardrop", "Paranoid Android (Live)"]) + rng.choice(["", f" - {rng.randint(1990, 2024)} Remaster", f" (Take {i})"])
+        items.append({
+            "name": name,
+            "artists": [{"name": artist}, {"name": rng.choice(ARTISTS)}],
+            "album": {"name": rng.choice(["OK Computer", "OK Computer OKNOTOK 1997 2017", "Mezzanine"])},
+            "duration_ms": rng.randint(120000, 420000),
+            "uri": f"spotify:track:{i:022d}",
+        })
+
+    def run():
+        # Memoized similarity scores and normalized titles are dropped, so every run scores all items from scratch
+        lm.similarity.cache_clear()
+        lm.normalize.cache_clear()
+        lm.normalize_text.cache_clear()
+        lm.clean_title.cache_clear()
+        with patched(DEBUG_MODE=False):
+            lm.spotify_search_process_track_items(items, "Radiohead", "Paranoid Android", "Paranoid Android", "OK Computer")
+
+    return run, count
+
+
+# Short titles differing by a single character are different songs, the exact match has to win over the similar ones
+@benchmark("spotify_search_process_short_titles", unit="items")
+def bench_spotify_short_titles(scale):
+    rng = random.Random(5)
+    count = scaled(2000, scale)
+    items = []
+    for i in range(count):
+        name = rng.choice(["Once", "On", "Ones", "Gone", "One Day", "Only"])
+        items.append({"name": name, "artists": [{"name": "U2"}], "album": {"name": "Achtung Baby"}, "duration_ms": 200000, "id": f"{i:022d}"})
+    items.insert(count // 2, {"name": "One", "artists": [{"name": "U2"}], "album": {"name": "Achtung Baby"}, "duration_ms": 276000, "id": "one"})
+    misses = [item for item in items if item["id"] != "one"]
+
+    def run():
+        lm.similarity.cache_clear()
+        lm.normalize.cache_clear()
+        lm.normalize_text.cache_clear()
+        lm.clean_title.cache_clear()
+        with patched(DEBUG_MODE=False):
+            assert lm.spotify_search_process_track_items(items, "U2", "One", "One", "Achtung Baby")[0] == "one"
+            assert lm.spotify_search_process_track_items(misses, "U2", "One", "One", "Achtung Baby")[0] is None
+
+    return run, len(items) + len(misses)
+
+
+@benchmark("get_spotify_apple_genius_search_urls", unit="tracks")
+def bench_search_urls(scale):
+    network = make_network()
+    tracks = make_tracks(network, scaled(2000, scale))
+    entries = [(str(t.artist), str(t.title), t.info["album"], t) for t in tracks]
+
+    def run():
+        # Memoized track links are dropped, so every run builds all URLs from scratch
+        lm.get_track_links.cache_clear()
+        for artist, title, album, track in entries:
+            lm.get_spotify_apple_genius_search_urls(artist, title, album, network, track)
+
+    return run, len(entries)
+
+
+# Title corpus resembling listening histories: most titles repeat, many carry remaster/live/feat. suffixes and non-ASCII characters
+def make_title_corpus(count, seed=4):
+    rng = random.Random(seed)
+    suffixes = ["", "", "", " - Remastered 2011", " - 2009 Remaster", " (feat. Ólafur Arnalds)", " - Live Version", " - Radio Edit", " - Extended Mix", " (Deluxe Version)", " - Dub Remix"]
+    unique = []
+    for i in range(max(1, count // 4)):
+        title = " ".join(rng.sample(WORDS, rng.randint(1, 4))) + f" {i}" + rng.choice(suffixes)
+        unique.append((rng.choice(ARTISTS), title, " ".join(rng.sample(WORDS, 2))))
+    return [rng.choice(unique) for _ in range(count)]
+
+
+@benchmark("normalize_title_corpus", unit="titles")
+def bench_normalize(scale):
+    corpus = make_title_corpus(scaled(50000, scale))
+
+    def run():
+        # Memoized results are dropped, so every run includes the misses of the first occurrence of each title
+        lm.normalize.cache_clear()
+        lm.normalize_text.cache_clear()
+        lm.clean_title.cache_clear()
+        for artist, title, album in corpus:
+            lm.normalize(artist, title, album)
+            lm.clean_title(title)
+
+    return run, len(corpus)
+
+
+@benchmark("lastfm_list_tracks_layout", unit="rows", repeat=3)
+def bench_list_tracks(scale):
+    network = make_network()
+    tracks = make_tracks(network, 500)
+    rows = scaled(10000, scale)
+    start = 1_700_000_000
+    recent = []
+    for i in range(rows):
+        track = tracks[i % len(tracks)]
+        # Every 50th entry duplicates the timestamp of the previous one, as seen in private mode sessions
+        ts = start - (i - (i % 50 == 1)) * 180
+        recent.append(pylast.PlayedTrack(track, track.info["album"], "", str(ts)))
+    user = type("StubUser", (), {"get_now_playing": staticmethod(lambda: None)})()
+
+    def run():
+        with patched(lastfm_get_recent_tracks=lambda username, net, number: recent, LASTFM_JSON_API=False), quiet():
+            lm.lastfm_list_tracks("bench_user", user, network, rows, None)
+
+    return run, rows
+
+
+def make_user_list_page(count, ads_every=10):
+    items = []
+    for i in range(count):
+        if ads_every and i % ads_every == 0:
+            items.append('<li class="user-list-item user-list-item--ad"><div class="ad">Advertisement</div></li>')
+        items.append(
+            f'<li class="user-list-item"><div class="user-list-avatar"><img src="https://lastfm.freetls.fastly.net/i/u/avatar70s/{i}.png"></div>'
+            f'<h3 class="user-list-name"><a class="link-block-target" href="/user/listener_{i}">listener_{i}</a></h3>'
+            f'<p class="user-list-meta">Scrobbling since 2010</p></li>'
+        )
+    return (
+        "<html><head><title>Followers</title></head><body><header><h1 class=\"content-top-header\">Followers ("
+        f"{count})</h1></header><section><ul class=\"user-list\">{''.join(items)}</ul></section></body></html>"
+    ).encode("utf-8")
+
+
+@benchmark("lastfm_scrape_user_list_parse", unit="users")
+def bench_scrape_user_list(scale):
+    import bs4  # noqa: F401 - fail early with a clear message if BeautifulSoup is not installed
+
+    count = scaled(1000, scale)
+    page = type("StubResponse", (), {"content": make_user_list_page(count), "status_code": 200})()
+
+    def run():
+        with patched(_lastfm_http_get_with_retry=lambda url, attempts=3, base_delay=2.0, budget=None: page):
+            users = lm._lastfm_scrape_user_list("bench_user", "followers")
+        assert len(users) == count
+
+    return run, count
+
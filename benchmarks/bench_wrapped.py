@@ -0,0 +1,65 @@
+"""
+Benchmarks of tools/lastfm_wrapped.py aggregation over large CSV files generated by lastfm_monitor
+"""
+
+import csv
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import lastfm_wrapped
+from common import benchmark, scaled
+
+_data_cache = {}
+
+
+# Returns path of a generated CSV file with the given number of rows; files are kept in the temp directory and reused across runs
+def generated_csv(rows):
+    path = Path(tempfile.gettempdir()) / f"lastfm_bench_wrapped_{rows}.csv"
+    if path.exists():
+        return path
+    rng = random.Random(4)
+    artists = [f"Artist {i}" for i in range(5000)]
+    ts = datetime(2024, 1, 1)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Artist", "Track", "Album"])
+        for _ in range(rows):
+            ts += timedelta(seconds=rng.randint(60, 400))
+            a = rng.randrange(len(artists))
+            t = rng.randrange(40)
+            writer.writerow([ts.strftime("%Y-%m-%d %H:%M:%S"), artists[a], f"Track {a}-{t}", f"Album {a}-{t // 12}"])
+    tmp.replace(path)
+    return path
+
+
+def read_data(rows):
+    if rows not in _data_cache:
+        _data_cache[rows] = lastfm_wrapped.read_csv_data(generated_csv(rows))
+    return _data_cache[rows]
+
+
+@benchmark("wrapped_read_csv_data", unit="rows", repeat=1)
+def bench_read_csv(scale):
+    rows = scaled(2000000, scale)
+    path = generated_csv(rows)
+
+    def run():
+        lastfm_wrapped.read_csv_data(path)
+
+    return run, rows
+
+
+@benchmark("wrapped_filter_and_top_items", unit="rows", repeat=3)
+def bench_top_items(scale):
+    rows = scaled(2000000, scale)
+    data = read_data(rows)
+    start, end = datetime(2024, 1, 1), datetime(2100, 1, 1)
+
+    def run():
+        filtered = lastfm_wrapped.filter_by_date_range(data, start, end)
+        lastfm_wrapped.calculate_top_items(filtered, 10)
+
+    return run, rows
@@ -0,0 +1,59 @@
+"""
+Shared helpers for lastfm_monitor benchmarks: benchmark registry, stdout silencing and a virtual clock
+"""
+
+import contextlib
+import os
+import sys
+import types
+
+BENCHMARKS = []
+
+
+# Registers a benchmark; the decorated setup(scale) function prepares the data and returns (run, operations),
+# where run() performs one measured pass consisting of the given number of operations
+# repeat limits the number of measured passes for slow, large data set benchmarks
+def benchmark(name, unit="ops", repeat=None):
+    def register(func):
+        BENCHMARKS.append({"name": name, "unit": unit, "repeat": repeat, "setup": func})
+        return func
+    return register
+
+
+# Returns the number of items for a data set of the given base size
+def scaled(size, scale, minimum=10):
+    return max(minimum, int(size * scale))
+
+
+# Silences stdout of the code under test, the output itself is not what is being measured
+@contextlib.contextmanager
+def quiet():
+    saved = sys.stdout
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = saved
+
+
+# Virtual clock replacing the time module of lastfm_monitor, sleep() advances the time instantly and calls on_sleep
+class VirtualClock:
+    def __init__(self, start=1_700_000_000.0, on_sleep=None):
+        self.now = start
+        self.on_sleep = on_sleep
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if self.on_sleep:
+            self.on_sleep()
+
+    # Returns a stand-in for the time module with time() and sleep() bound to this clock
+    def module(self, real_time):
+        fake = types.SimpleNamespace(**{name: getattr(real_time, name) for name in dir(real_time) if not name.startswith("_")})
+        fake.time = self.time
+        fake.sleep = self.sleep
+        return fake
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for lastfm_monitor hot paths
+
+Runs the benchmarks registered in bench_*.py modules (fully offline, network calls are stubbed) and stores
+the results as JSON, so regressions can be spotted by comparing two result files.
+
+Usage:
+  python3 benchmarks/run.py                              # run all benchmarks, save to benchmarks/results/<version>.json
+  python3 benchmarks/run.py --quick                      # 100x smaller data sets, for a fast smoke run
+  python3 benchmarks/run.py -k spotify -k urls           # only benchmarks with a matching name
+  python3 benchmarks/run.py --compare old.json new.json  # compare two result files
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+BENCH_MODULES = ["bench_monitor", "bench_wrapped"]
+
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(REPO_DIR / "tools"))
+sys.path.insert(0, str(BENCH_DIR))
+
+from common import BENCHMARKS  # noqa: E402
+
+
+# Runs a prepared benchmark a few times and returns the best and median throughput
+def measure(run, operations, repeat, min_time=0.2):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        loops = 0
+        start = time.perf_counter()
+        while True:
+            run()
+            loops += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        timings.append(elapsed / loops)
+    return {
+        "operations": operations,
+        "best_seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "ops_per_sec": operations / min(timings),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(args):
+    for module in BENCH_MODULES:
+        importlib.import_module(module)
+
+    import lastfm_monitor
+
+    selected = [b for b in BENCHMARKS if not args.k or any(k in b["name"] for k in args.k)]
+    if not selected:
+        print("Error: no benchmarks selected", file=sys.stderr)
+        sys.exit(1)
+
+    scale = 0.01 if args.quick else args.scale
+    results = {}
+    for bench in selected:
+        print(f"{bench['name']:<45}", end="", flush=True)
+        try:
+            run, operations = bench["setup"](scale)
+            result = measure(run, operations, min(args.repeat, bench["repeat"] or args.repeat))
+        except Exception as e:
+            print(f"FAILED: {e}")
+            results[bench["name"]] = {"error": str(e)}
+            continue
+        result["unit"] = bench["unit"]
+        results[bench["name"]] = result
+        print(f"{result['ops_per_sec']:>14,.1f} {bench['unit']}/s  ({result['operations']:,} {bench['unit']} in {result['best_seconds'] * 1000:.2f} ms)")
+
+    return {
+        "version": lastfm_monitor.VERSION,
+        "git_revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "results": results,
+    }
+
+
+# Prints the throughput change of every benchmark present in both files, returns True if any of them regressed more than threshold
+def compare(old_file, new_file, threshold):
+    with open(old_file, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_file, encoding="utf-8") as f:
+        new = json.load(f)
+
+    if old.get("scale") != new.get("scale"):
+        print(f"Warning: results were produced with different scales ({old.get('scale')} vs {new.get('scale')})\n")
+
+    print(f"{'benchmark':<45}{old.get('version', '?'):>14}{new.get('version', '?'):>14}{'change':>10}")
+    regressed = False
+    for name, new_result in new["results"].items():
+        old_result = old["results"].get(name)
+        if not old_result or "ops_per_sec" not in old_result or "ops_per_sec" not in new_result:
+            continue
+        change = new_result["ops_per_sec"] / old_result["ops_per_sec"] - 1
+        mark = ""
+        if change < -threshold:
+            mark = "  REGRESSION"
+            regressed = True
+        print(f"{name:<45}{old_result['ops_per_sec']:>14,.1f}{new_result['ops_per_sec']:>14,.1f}{change:>+10.1%}{mark}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for lastfm_monitor hot paths")
+    parser.add_argument("-k", action="append", metavar="NAME", help="Run only benchmarks whose name contains NAME (can be repeated)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale factor for data set sizes (default: 1.0)")
+    parser.add_argument("--quick", action="store_true", help="Use 100x smaller data sets")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measured repetitions, the best one is reported (default: 5)")
+    parser.add_argument("-o", "--output", type=str, help="Result file (default: benchmarks/results/<version>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running benchmarks")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as regression by --compare (default: 0.10)")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    report = run_benchmarks(args)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['version']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {os.path.relpath(output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,11 @@ beautifulsoup4 (optional, only for followers/followings tracking)
 
 VERSION = "2.4.4"
 
+import time
+
+# Start of the import and initialization phases reported by --startup-profile
+STARTUP_PROFILE_START = time.perf_counter()
+
 # ---------------------------
 # CONFIGURATION SECTION START
 # ---------------------------
@@ -38,6 +43,14 @@ CONFIG_BLOCK = """
 LASTFM_API_KEY = "your_lastfm_api_key"
 LASTFM_API_SECRET = "your_lastfm_api_secret"
 
+# Optional pool of additional Last.fm API keys, for deployments monitoring many users (see supervisor mode) near the per-key rate limit
+# Users are spread over LASTFM_API_KEY and these keys by weighted round-robin; a key failing with an invalid or suspended API key
+# error is taken out of the pool for API_KEY_RETRY_INTERVAL seconds and its users are moved to the other keys
+# Entries are (api_key, api_secret) or (api_key, api_secret, weight) tuples, e.g. [("key2", "secret2"), ("key3", "secret3", 2)]
+# Can also be set as 'key2:secret2,key3:secret3:2' in the LASTFM_API_KEYS environment variable (or .env file)
+LASTFM_API_KEYS = []
+API_KEY_RETRY_INTERVAL = 3600  # 1 hour
+
 # This Spotify Client Credentials OAuth Flow section is optional and only needed if you want to:
 #   - Get track duration from Spotify (via USE_TRACK_DURATION_FROM_SPOTIFY / -r), which is more accurate than Last.fm
 #   - Use automatic playback functionality (via TRACK_SONGS / -g), which requires Spotify track IDs
@@ -105,6 +118,9 @@ SONG_ON_LOOP_NOTIFICATION = False
 # Can also be enabled via the -f flag
 OFFLINE_ENTRIES_NOTIFICATION = False
 
+# Maximum time (in seconds) the offline entries notification waits for the track details of the entries (looked up in the background)
+OFFLINE_ENTRIES_ENRICHMENT_DEADLINE = 120
+
 # Whether to send an email on errors
 # Can also be disabled via the -e flag
 ERROR_NOTIFICATION = True
@@ -141,6 +157,34 @@ USE_TRACK_DURATION_FROM_SPOTIFY = False
 # Can also be set using the -q flag
 DO_NOT_SHOW_DURATION_MARKS = False
 
+# Matching of Spotify search results against the Last.fm track, based on name similarity scores from 0 to 100
+# Uses the rapidfuzz package if installed (pip install rapidfuzz), Python's difflib otherwise
+# SPOTIFY_MATCH_MIN_SCORE: minimum track name similarity for a search result to be accepted
+# SPOTIFY_MATCH_ARTIST_MIN_SCORE: minimum artist name similarity (against any of the result's artists)
+# SPOTIFY_MATCH_ALBUM_BONUS: bonus added to the score of results from the same album
+# SPOTIFY_SEARCH_LIMIT: number of results fetched per Spotify search query (max 50)
+SPOTIFY_MATCH_MIN_SCORE = 70
+SPOTIFY_MATCH_ARTIST_MIN_SCORE = 85
+SPOTIFY_MATCH_ALBUM_BONUS = 20
+SPOTIFY_SEARCH_LIMIT = 5
+
+# Whether to fetch the full Spotify tracklist of the album once a track of it is matched, so the next tracks
+# of the album get their duration and Spotify track ID without any search requests
+SPOTIFY_ALBUM_PREFETCH = True
+
+# Maximum number of Spotify Web API requests per minute (searches, album prefetches, shared cache refreshes), set to 0 for no limit
+# Background refreshes of the shared cache use at most half of it, so they never hold up lookups of played tracks
+SPOTIFY_RATE_LIMIT = 120
+
+# Maximum time (in seconds) a track change notification waits for the track details (duration, Spotify track ID)
+# The details are looked up in the background; if they are not ready in time the notification goes out without them
+# and they are shown once they arrive, so slow Spotify/Last.fm responses do not delay the monitoring
+# Set to 0 to never wait
+ENRICHMENT_DEADLINE = 3
+
+# Number of threads looking up track details in the background
+ENRICHMENT_WORKERS = 4
+
 # Multiplier for detecting short breaks in playback
 # The pause is detected after: LASTFM_BREAK_CHECK_MULTIPLIER * LASTFM_ACTIVE_CHECK_INTERVAL seconds of inactivity
 # Can be disabled by setting it to 0
@@ -211,9 +255,25 @@ LIVENESS_CHECK_INTERVAL = 43200  # 12 hours
 # URL used to verify internet connectivity at startup
 CHECK_INTERNET_URL = 'https://ws.audioscrobbler.com/'
 
+# Base URLs of the Last.fm and Spotify Web APIs
+# Change them only to point the tool at a local stand-in server, e.g. tools/lastfm_replay.py used for offline testing and benchmarking
+# (in such case also point CHECK_INTERNET_URL at it)
+LASTFM_API_URL = 'https://ws.audioscrobbler.com/2.0/'
+SPOTIFY_API_URL = 'https://api.spotify.com'
+SPOTIFY_ACCOUNTS_URL = 'https://accounts.spotify.com'
+
+# Whether to use the built-in lightweight JSON client for the Last.fm API requests made on every poll (recent and now playing
+# tracks, track duration), it needs one request per poll instead of two and avoids pylast's XML parsing
+# Set to False to use pylast for all Last.fm API requests
+LASTFM_JSON_API = True
+
 # Timeout used when checking initial internet connectivity; in seconds
 CHECK_INTERNET_TIMEOUT = 5
 
+# Startup requests (connectivity check, recent tracks, track details, initial friends check) run concurrently;
+# this is the total time budget for them, in seconds
+STARTUP_TIMEOUT = 30
+
 # Threshold for displaying Last.fm 50x errors - it is to suppress sporadic issues with Last.fm API endpoint
 # Adjust the values according to the LASTFM_CHECK_INTERVAL and LASTFM_ACTIVE_CHECK_INTERVAL timers
 # If more than 15 Last.fm API related errors in 2 minutes, show an alert
@@ -226,14 +286,116 @@ ERROR_500_TIME_LIMIT = 120  # 2 min
 ERROR_NETWORK_ISSUES_NUMBER_LIMIT = 15
 ERROR_NETWORK_ISSUES_TIME_LIMIT = 120  # 2 min
 
+# Circuit breaker for Last.fm outages
+# After CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive 50x, timeout, network or rate limit errors the endpoint
+# (Last.fm API or Last.fm web pages) is considered down and no requests are sent to it for a jittered, exponentially
+# growing delay, starting at CIRCUIT_BREAKER_BASE_DELAY and capped at CIRCUIT_BREAKER_MAX_DELAY
+# Once the delay elapses a single probe request is let through: success resumes normal checks, failure doubles the delay
+# The breaker is shared by all users monitored by the same process; set CIRCUIT_BREAKER_FAILURE_THRESHOLD to 0 to disable it
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 3
+CIRCUIT_BREAKER_BASE_DELAY = 30  # 30 seconds
+CIRCUIT_BREAKER_MAX_DELAY = 600  # 10 mins
+
 # CSV file to write every scrobble
 # Can also be set using the -b flag
 CSV_FILE = ""
 
-# Filename with Last.fm tracks/albums to alert on
+# Filename with Last.fm tracks/albums to alert on (one entry per line, lines starting with # are ignored)
+# Entries match the track or album name; prefix them with 'artist:', 'track:' or 'album:' to match only that field,
+# start the name with ~ to match a part of the name or write it as /regex/ to match a regular expression, e.g.:
+#   Like a Stone
+#   artist: Radiohead
+#   track: ~acoustic
+#   album: /^ok computer/
 # Can also be set using the -s flag
 MONITOR_LIST_FILE = ""
 
+# How often (in seconds) the config file and MONITOR_LIST_FILE are checked for changes, which are then applied without a restart
+# Intervals, notification, URL and email settings are reloaded; settings overridden by command line flags stay until changed in the file
+# Set to 0 to disable
+CONFIG_RELOAD_INTERVAL = 10
+
+# SQLite database used as a single state store for all monitored users (last activity, followers/followings
+# baselines, caches and session checkpoints) instead of the per-user lastfm_<username>_*.json files
+# Existing JSON files are imported automatically the first time a user's state is read
+# Leave empty to keep using the JSON files
+# Can also be set using the --state-db flag
+STATE_DB_FILE = ""
+
+# How often pending state changes are committed to STATE_DB_FILE in a single transaction; in seconds
+STATE_DB_FLUSH_INTERVAL = 30  # 30 seconds
+
+# How often to checkpoint the full monitoring state (current session, counters, timers); in seconds
+# After a restart the monitor resumes from the checkpoint without re-fetching recent tracks and track info
+# Checkpoints are kept in STATE_DB_FILE if set, otherwise in lastfm_<username>_checkpoint.json
+# Disabled by default (0), set to e.g. 60 (1 min) to enable; supervisor and cluster modes need it to resume moved or restarted users
+CHECKPOINT_INTERVAL = 0
+
+# Maximum age of a checkpoint which can still be resumed after restart; in seconds
+# Older checkpoints are ignored and monitoring starts from scratch
+CHECKPOINT_MAX_AGE = 600  # 10 mins
+
+# Supervisor mode: file with Last.fm usernames to monitor (one per line, lines starting with # are ignored)
+# The users are sharded across SUPERVISOR_WORKERS worker processes, each monitoring its users in separate threads
+# The supervisor aggregates logs (lines prefixed with [username]) and email notifications of all workers and writes
+# scrobbles to per-user CSV files (lastfm_scrobbles.csv -> lastfm_scrobbles_<username>.csv)
+# Can also be set using the --users-file flag
+USERS_FILE = ""
+
+# Number of worker processes in supervisor mode, 0 means one per CPU core
+# Can also be set using the --workers flag
+SUPERVISOR_WORKERS = 0
+
+# How often the supervisor checks the users file for added or removed users; in seconds
+# Only workers with changed users are restarted and they resume monitoring from checkpoints if CHECKPOINT_INTERVAL is set
+SUPERVISOR_RELOAD_INTERVAL = 60  # 1 min
+
+# How often the supervisor prints aggregated status of the workers (users, restarts, CPU time); in seconds
+# Set to 0 to disable
+SUPERVISOR_STATUS_INTERVAL = 3600  # 1 hour
+
+# Crashed worker processes and failed user monitoring threads are restarted with exponential backoff
+# starting at SUPERVISOR_RESTART_DELAY and capped at SUPERVISOR_RESTART_MAX_DELAY; in seconds
+SUPERVISOR_RESTART_DELAY = 5  # 5 seconds
+SUPERVISOR_RESTART_MAX_DELAY = 300  # 5 mins
+
+# Cluster mode: several hosts running supervisor mode with the same users file split the users between themselves
+# using consistent hashing of usernames; when a node joins or leaves only the users of that node move
+# Membership of the nodes is coordinated through a backend shared by all nodes:
+#   sqlite:///path/to/cluster.db - SQLite file on a file system shared by all nodes
+#   redis://[:password@]host[:port][/db] - Redis-compatible server
+# Moved users resume from checkpoints, so keep STATE_DB_FILE (or the working directory) on shared storage too
+# Can also be set using the --cluster flag
+CLUSTER_BACKEND = ""
+
+# Unique name of this node in the cluster, host name is used if empty
+# Can also be set using the --node-id flag
+CLUSTER_NODE_ID = ""
+
+# How often nodes send heartbeats and check for membership changes; in seconds
+CLUSTER_HEARTBEAT_INTERVAL = 15  # 15 seconds
+
+# Node is considered gone if it did not send a heartbeat for this long; in seconds
+CLUSTER_NODE_TTL = 60  # 1 min
+
+# Shared cache: Unix socket of the local cache daemon (started with --cache-daemon) shared by all monitor processes on the
+# host, so lookups of track durations, Spotify track IDs and Spotify access tokens are done once per host, not once per process
+# If the daemon is not running the tool falls back to its own lookups
+# Leave empty to disable
+# Can also be set using the --shared-cache flag
+SHARED_CACHE_SOCKET = ""
+
+# How long the shared cache daemon keeps track lookups; in seconds
+SHARED_CACHE_TTL = 604800  # 7 days
+
+# Maximum number of entries kept by the shared cache daemon, least recently used ones are evicted first
+SHARED_CACHE_MAX_ENTRIES = 100000
+
+# Track lookups with Spotify track IDs kept by the shared cache daemon are re-validated in the background once they are older than this,
+# so re-releases and relinked tracks get current durations and IDs; up to 50 tracks are checked per Spotify request while the daemon is idle
+# Needs SP_CLIENT_ID and SP_CLIENT_SECRET in the config or dotenv file; in seconds, set to 0 to disable
+SHARED_CACHE_REFRESH_AGE = 86400  # 1 day
+
 # Location of the optional dotenv file which can keep secrets
 # If not specified it will try to auto-search for .env files
 # To disable auto-search, set this to the literal string "none"
@@ -344,6 +506,8 @@ FRIENDS_RETRY_INTERVAL = 90
 # Do not change values below - modify them in the configuration section or config file instead
 LASTFM_API_KEY = ""
 LASTFM_API_SECRET = ""
+LASTFM_API_KEYS = []
+API_KEY_RETRY_INTERVAL = 0
 SP_CLIENT_ID = ""
 SP_CLIENT_SECRET = ""
 SP_TOKENS_FILE = ""
@@ -360,6 +524,7 @@ TRACK_NOTIFICATION = False
 SONG_NOTIFICATION = False
 SONG_ON_LOOP_NOTIFICATION = False
 OFFLINE_ENTRIES_NOTIFICATION = False
+OFFLINE_ENTRIES_ENRICHMENT_DEADLINE = 0
 ERROR_NOTIFICATION = False
 LASTFM_CHECK_INTERVAL = 0
 LASTFM_ACTIVE_CHECK_INTERVAL = 0
@@ -368,6 +533,14 @@ TRACK_SONGS = False
 PROGRESS_INDICATOR = False
 USE_TRACK_DURATION_FROM_SPOTIFY = False
 DO_NOT_SHOW_DURATION_MARKS = False
+SPOTIFY_MATCH_MIN_SCORE = 0
+SPOTIFY_MATCH_ARTIST_MIN_SCORE = 0
+SPOTIFY_MATCH_ALBUM_BONUS = 0
+SPOTIFY_SEARCH_LIMIT = 0
+SPOTIFY_ALBUM_PREFETCH = False
+SPOTIFY_RATE_LIMIT = 0
+ENRICHMENT_DEADLINE = 0
+ENRICHMENT_WORKERS = 0
 LASTFM_BREAK_CHECK_MULTIPLIER = 0
 RECENT_TRACKS_NUMBER = 0
 INACTIVE_EMAIL_RECENT_SONGS_COUNT = 0
@@ -383,13 +556,40 @@ SP_USER_GOT_OFFLINE_TRACK_ID = ""
 SP_USER_GOT_OFFLINE_DELAY_BEFORE_PAUSE = 0
 LIVENESS_CHECK_INTERVAL = 0
 CHECK_INTERNET_URL = ""
+LASTFM_API_URL = ""
+LASTFM_JSON_API = False
+SPOTIFY_API_URL = ""
+SPOTIFY_ACCOUNTS_URL = ""
 CHECK_INTERNET_TIMEOUT = 0
+STARTUP_TIMEOUT = 0
 ERROR_500_NUMBER_LIMIT = 0
 ERROR_500_TIME_LIMIT = 0
 ERROR_NETWORK_ISSUES_NUMBER_LIMIT = 0
 ERROR_NETWORK_ISSUES_TIME_LIMIT = 0
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 0
+CIRCUIT_BREAKER_BASE_DELAY = 0
+CIRCUIT_BREAKER_MAX_DELAY = 0
 CSV_FILE = ""
 MONITOR_LIST_FILE = ""
+CONFIG_RELOAD_INTERVAL = 0
+STATE_DB_FILE = ""
+STATE_DB_FLUSH_INTERVAL = 0
+CHECKPOINT_INTERVAL = 0
+CHECKPOINT_MAX_AGE = 0
+USERS_FILE = ""
+SUPERVISOR_WORKERS = 0
+SUPERVISOR_RELOAD_INTERVAL = 0
+SUPERVISOR_STATUS_INTERVAL = 0
+SUPERVISOR_RESTART_DELAY = 0
+SUPERVISOR_RESTART_MAX_DELAY = 0
+CLUSTER_BACKEND = ""
+CLUSTER_NODE_ID = ""
+CLUSTER_HEARTBEAT_INTERVAL = 0
+CLUSTER_NODE_TTL = 0
+SHARED_CACHE_SOCKET = ""
+SHARED_CACHE_TTL = 0
+SHARED_CACHE_MAX_ENTRIES = 0
+SHARED_CACHE_REFRESH_AGE = 0
 DOTENV_FILE = ""
 LF_LOGFILE = ""
 DISABLE_LOGGING = False
@@ -422,22 +622,91 @@ LASTFM_USERNAME_GLOBAL = ""
 
 exec(CONFIG_BLOCK, globals())
 
+# Names and end timestamps of the startup phases, reported by --startup-profile
+STARTUP_PHASES = [("config block", time.perf_counter())]
+
 # Default name for the optional config file
 DEFAULT_CONFIG_FILENAME = "lastfm_monitor.conf"
 
 # List of secret keys to load from env/config
-SECRET_KEYS = ("LASTFM_API_KEY", "LASTFM_API_SECRET", "SP_CLIENT_ID", "SP_CLIENT_SECRET", "SMTP_PASSWORD")
+SECRET_KEYS = ("LASTFM_API_KEY", "LASTFM_API_SECRET", "LASTFM_API_KEYS", "SP_CLIENT_ID", "SP_CLIENT_SECRET", "SMTP_PASSWORD")
 
 # Strings removed from track names for generating proper Genius search URLs
 re_search_str = r'remaster|extended|original mix|remix|rework|vocal mix|original soundtrack|radio( |-)edit|\(feat\.|( \(.*version\))|( - .*version)'
 re_replace_str = r'( - (\d*)( )*remaster$)|( - (\d*)( )*remastered( version)*( \d*)*.*$)|( \((\d*)( )*remaster\)$)|( - (\d+) - remaster$)|( - extended$)|( - extended mix$)|( - (.*); extended mix$)|( - extended version$)|( - (.*) remix$)|( - remix$)|( - remixed by .*$)|( - (.*) rework$)|( - rework$)|( - vocal mix$)|( - original mix$)|( - .*original soundtrack$)|( - .*radio( |-)edit$)|( \(feat\. .*\)$)|( \(\d+.*Remaster.*\)$)|( \(.*Version\))|( - .*version)'
 
+# Format version of monitor checkpoints, checkpoints with a different version are ignored
+CHECKPOINT_VERSION = 1
+
+# Number of memoized results of title normalization functions (normalize(), clean_title() etc.)
+NORMALIZE_CACHE_SIZE = 65536
+
+# Weight of the similarity of track names with remaster, remix etc. suffixes removed, so exact names are preferred in Spotify search results
+SPOTIFY_MATCH_CLEANED_WEIGHT = 0.9
+
+# Titles shorter than this (normalized, without remaster etc. suffixes) are matched exactly instead of by similarity
+SPOTIFY_MATCH_SHORT_TITLE_LENGTH = 6
+
+# Minimum album name similarity for the Spotify search result album bonus
+SPOTIFY_MATCH_ALBUM_MIN_SCORE = 90
+
+# Number of prefetched Spotify album tracklists kept in memory
+SPOTIFY_ALBUM_CACHE_SIZE = 256
+
+# Maximum number of track IDs per Spotify request of several tracks (/v1/tracks?ids=...)
+SPOTIFY_TRACKS_BATCH_SIZE = 50
+
+# The shared cache daemon refreshes entries only after this many seconds without requests, checking every SHARED_CACHE_REFRESH_CHECK_INTERVAL seconds
+SHARED_CACHE_REFRESH_IDLE = 10
+SHARED_CACHE_REFRESH_CHECK_INTERVAL = 60
+
+# Number of recent match results kept by the MONITOR_LIST_FILE watchlist matcher
+WATCHLIST_CACHE_SIZE = 4096
+
+# Settings the config reloader applies at runtime (other settings are used at startup only)
+RELOADABLE_SETTINGS = ("LASTFM_CHECK_INTERVAL", "LASTFM_ACTIVE_CHECK_INTERVAL", "LASTFM_INACTIVITY_CHECK", "LASTFM_BREAK_CHECK_MULTIPLIER", "ACTIVE_NOTIFICATION", "INACTIVE_NOTIFICATION", "TRACK_NOTIFICATION", "SONG_NOTIFICATION",
+                       "SONG_ON_LOOP_NOTIFICATION", "OFFLINE_ENTRIES_NOTIFICATION", "ERROR_NOTIFICATION", "PROGRESS_INDICATOR", "INACTIVE_EMAIL_RECENT_SONGS_COUNT", "SONG_ON_LOOP_VALUE", "SKIPPED_SONG_THRESHOLD1",
+                       "SKIPPED_SONG_THRESHOLD2", "LONGER_SONG_THRESHOLD1", "LONGER_SONG_THRESHOLD2", "SPOTIFY_MATCH_MIN_SCORE", "SPOTIFY_MATCH_ARTIST_MIN_SCORE", "SPOTIFY_MATCH_ALBUM_BONUS", "SPOTIFY_SEARCH_LIMIT", "SPOTIFY_ALBUM_PREFETCH", "ENRICHMENT_DEADLINE",
+                       "SMTP_HOST", "SMTP_PORT", "SMTP_USER", "SMTP_SSL", "SENDER_EMAIL", "RECEIVER_EMAIL", "MONITOR_LIST_FILE", "DEBUG_MODE", "ENABLE_SPOTIFY_URL", "ENABLE_LASTFM_URL", "ENABLE_LASTFM_ALBUM_URL",
+                       "ENABLE_APPLE_MUSIC_URL", "ENABLE_YOUTUBE_MUSIC_URL", "ENABLE_AMAZON_MUSIC_URL", "ENABLE_DEEZER_URL", "ENABLE_TIDAL_URL", "ENABLE_GENIUS_LYRICS_URL", "ENABLE_AZLYRICS_URL", "ENABLE_TEKSTOWO_URL",
+                       "ENABLE_MUSIXMATCH_URL", "ENABLE_LYRICS_COM_URL", "USE_LASTFM_URL_IN_LAST_PLAYED")
+
+# Number of tracks whose notification URLs (TrackLinks) are kept in memory
+TRACK_LINKS_CACHE_SIZE = 1024
+
+# Number of virtual nodes per cluster node on the consistent hash ring
+CLUSTER_VIRTUAL_NODES = 160
+
+# How long the supervisor waits for a stopped worker process to save its checkpoints and exit before killing it; in seconds
+SUPERVISOR_STOP_TIMEOUT = 15
+
 # Default value for Spotify network-related timeouts in functions; in seconds
 FUNCTION_TIMEOUT = 5  # 5 seconds
 
+# Number of threads running the startup requests, shared by all users monitored in the process
+STARTUP_WORKERS = 16
+
+# Number of user.getRecentTracks pages requested ahead of the printed one in streaming listing mode (-l --stream)
+LIST_STREAM_PREFETCH_PAGES = 4
+
+# Listening history export formats selected by the extension of CSV_FILE, other extensions are written as CSV
+EXPORT_FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+# Parquet / Arrow export: buffered rows are written to disk every EXPORT_FLUSH_INTERVAL seconds (and at exit), a part file
+# is closed once it holds EXPORT_ROW_GROUP_SIZE rows or is EXPORT_PART_INTERVAL seconds old
+EXPORT_ROW_GROUP_SIZE = 65536
+EXPORT_FLUSH_INTERVAL = 15  # seconds
+EXPORT_PART_INTERVAL = 86400  # 1 day
+
+# Total number of retries shared by the concurrent followings/followers scrapes of a single friends check
+FRIENDS_SCRAPE_RETRY_BUDGET = 3
+
 # Variables for caching functionality of the Spotify access token to avoid unnecessary refreshing
 SP_CACHED_ACCESS_TOKEN = None
 
+# State store (StateStore) used when STATE_DB_FILE is set, initialized in main()
+STATE_STORE = None
+
 LIVENESS_CHECK_COUNTER = LIVENESS_CHECK_INTERVAL / LASTFM_CHECK_INTERVAL
 
 stdout_bck = None
@@ -445,6 +714,16 @@ csvfieldnames = ['Date', 'Artist', 'Track', 'Album']
 
 CLI_CONFIG_PATH = None
 
+# Config file loaded at startup and values of RELOADABLE_SETTINGS assigned in it, used by the config reloader
+CONFIG_FILE_PATH = None
+CONFIG_FILE_VALUES = ()
+
+# Incremented whenever settings change at runtime (config reload, signals), so running monitoring loops pick them up
+SETTINGS_GENERATION = 0
+
+# Matcher of the current MONITOR_LIST_FILE entries, swapped by the config reloader
+WATCHLIST = None
+
 # to solve the issue: 'SyntaxError: f-string expression part cannot include a backslash'
 nl_ch = "\n"
 
@@ -455,31 +734,22 @@ if sys.version_info < (3, 9):
     print("* Error: Python version 3.9 or higher required !")
     sys.exit(1)
 
-import time
+import random
 import string
 import json
 import os
 from datetime import datetime
-from dateutil import relativedelta
 import calendar
-import requests as req
 import signal
-import smtplib
-import ssl
-from email.header import Header
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 import argparse
-import csv
+import importlib
+from urllib.parse import quote_plus, quote, urlparse
 try:
-    import pylast
-except ModuleNotFoundError:
-    raise SystemExit("Error: Couldn't find the pyLast library !\n\nTo install it, run:\n    pip install pylast\n\nOnce installed, re-run this tool. For more help, visit:\nhttps://github.com/pylast/pylast")
-from urllib.parse import quote_plus, quote
-import subprocess
+    from rapidfuzz.fuzz import ratio as rapidfuzz_ratio
+except ImportError:
+    rapidfuzz_ratio = None
 import platform
 import re
-import ipaddress
 from itertools import tee, islice, chain
 from html import escape
 import shutil
@@ -487,7 +757,71 @@ from pathlib import Path
 from typing import Tuple
 import base64
 import hashlib
+import unicodedata
+from difflib import SequenceMatcher
+import bisect
+import socket
 import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import atexit
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+
+
+# Stand-in for a module imported on its first use, so short invocations (--version, --generate-config) do not pay for
+# libraries they never touch; the loaded module then replaces the stand-in in globals(), so later lookups get it directly
+class LazyModule:
+    def __init__(self, alias, name, missing_error=None):
+        self._alias = alias
+        self._name = name
+        self._missing_error = missing_error
+
+    def __getattr__(self, attr):
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(self._name)
+        except ModuleNotFoundError:
+            if self._missing_error:
+                raise SystemExit(self._missing_error)
+            raise
+        if globals()[self._alias] is self:
+            globals()[self._alias] = module
+            LAZY_IMPORT_TIMES.append((self._name, time.perf_counter() - start))
+        return getattr(module, attr)
+
+
+# Modules imported on first use and how long the import took, reported by --startup-profile
+LAZY_IMPORT_TIMES = []
+
+
+pylast = LazyModule("pylast", "pylast", "Error: Couldn't find the pyLast library !\n\nTo install it, run:\n    pip install pylast\n\nOnce installed, re-run this tool. For more help, visit:\nhttps://github.com/pylast/pylast")
+req = LazyModule("req", "requests")
+relativedelta = LazyModule("relativedelta", "dateutil.relativedelta")
+csv = LazyModule("csv", "csv")
+subprocess = LazyModule("subprocess", "subprocess")
+sqlite3 = LazyModule("sqlite3", "sqlite3")
+pa = LazyModule("pa", "pyarrow", "Error: Couldn't find the pyarrow library, it is required for Parquet and Arrow export !\n\nTo install it, run:\n    pip install pyarrow\n\nOnce installed, re-run this tool")
+pq = LazyModule("pq", "pyarrow.parquet")
+
+STARTUP_PHASES.append(("imports", time.perf_counter()))
+
+
+# Records the end of a startup phase for --startup-profile
+def startup_phase(name):
+    STARTUP_PHASES.append((name, time.perf_counter()))
+
+
+# Prints how long each startup phase and each import done on first use took (--startup-profile)
+def print_startup_profile():
+    print("* Startup profile:")
+    previous_ts = STARTUP_PROFILE_START
+    for name, ts in STARTUP_PHASES:
+        print(f"*   {name + ':':<28}{(ts - previous_ts) * 1000:>8.1f} ms")
+        previous_ts = ts
+    for name, duration in LAZY_IMPORT_TIMES:
+        print(f"*   {'(import ' + name + ')':<28}{duration * 1000:>8.1f} ms")
+    print(f"*   {'total:':<28}{(previous_ts - STARTUP_PROFILE_START) * 1000:>8.1f} ms\n")
 
 
 # Logger class to output messages to stdout and log file
@@ -525,6 +859,27 @@ def check_internet(url=CHECK_INTERNET_URL, timeout=CHECK_INTERNET_TIMEOUT):
         return False
 
 
+# Startup steps (connectivity check, first Last.fm requests, initial friends check) run concurrently in this pool shared by all monitored users
+STARTUP_EXECUTOR = None
+STARTUP_EXECUTOR_LOCK = threading.Lock()
+
+# Connectivity check started by main(), its result is checked once the first requests are sent
+CONNECTIVITY_CHECK = None
+
+
+def get_startup_executor():
+    global STARTUP_EXECUTOR
+    with STARTUP_EXECUTOR_LOCK:
+        if STARTUP_EXECUTOR is None:
+            STARTUP_EXECUTOR = ThreadPoolExecutor(max_workers=STARTUP_WORKERS, thread_name_prefix="startup")
+        return STARTUP_EXECUTOR
+
+
+# Returns False if the connectivity check started by main() failed
+def connectivity_ok():
+    return CONNECTIVITY_CHECK is None or CONNECTIVITY_CHECK.result()
+
+
 # Clears the terminal screen
 def clear_screen(enabled=True):
     if not enabled:
@@ -634,6 +989,13 @@ def calculate_timespan(timestamp1, timestamp2, show_weeks=True, show_hours=True,
 # Sends email notification
 # Sends an email notification
 def send_email(subject, body, body_html, use_ssl, smtp_timeout=15):
+    import ipaddress
+    import smtplib
+    import ssl
+    from email.header import Header
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     debug_print(f"Attempting to send email: {subject}")
     fqdn_re = re.compile(r'(?=^.{4,253}$)(^((?!-)[a-zA-Z0-9-]{1,63}(?<!-)\.)+[a-zA-Z]{2,63}\.?$)')
     email_re = re.compile(r'[^@]+@[^@]+\.[^@]+')
@@ -701,11 +1063,109 @@ def send_email(subject, body, body_html, use_ssl, smtp_timeout=15):
     return 0
 
 
+# Returns the format the listening history is exported in, based on the extension of the file: csv, ndjson, parquet or arrow
+def export_format(file_name):
+    return EXPORT_FORMATS.get(os.path.splitext(str(file_name))[1].lower(), "csv")
+
+
+# Appends the listening history to Parquet or Arrow IPC files; the export path is a directory (a dataset readable by pyarrow, pandas,
+# Polars or DuckDB) in which every run writes its own part files, with timestamps stored as epoch seconds and zstd compression
+# Buffered rows are flushed every EXPORT_FLUSH_INTERVAL seconds by a background thread: as Parquet / Arrow files cannot be appended to,
+# the current part is rewritten as a complete file (under a hidden name, then atomically renamed), so it is readable after every flush
+# A part is closed once it holds EXPORT_ROW_GROUP_SIZE rows or is EXPORT_PART_INTERVAL seconds old and the next rows go to a new part
+class ColumnarHistoryWriter:
+    def __init__(self, path, fmt, flush_interval=EXPORT_FLUSH_INTERVAL):
+        self.path = path
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.part_rows = []
+        self.pending = 0
+        self.part_name = None
+        self.part_ts = 0
+        self.parts = 0
+        self.schema = pa.schema([("Date", pa.timestamp("s", tz="UTC")), ("Artist", pa.string()), ("Track", pa.string()), ("Album", pa.string())])
+        os.makedirs(path, exist_ok=True)
+        self.stop_event = threading.Event()
+        self.flush_thread = threading.Thread(target=self._flush_loop, name="history_export_flush", daemon=True)
+        self.flush_thread.start()
+
+    def append(self, timestamp, artist, track, album):
+        with self.lock:
+            self.part_rows.append((int(timestamp.timestamp()), str(artist), str(track), str(album)))
+            self.pending += 1
+            if len(self.part_rows) >= EXPORT_ROW_GROUP_SIZE:
+                self.flush()
+
+    # Writes all rows of the current part as a complete file with a single row group / record batch; lock must be held
+    def flush(self):
+        if not self.pending:
+            return
+        if self.part_name is None:
+            self.parts += 1
+            self.part_name = f"part-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.parts}.{self.fmt}"
+            self.part_ts = time.time()
+        dates, artists, tracks, albums = zip(*self.part_rows)
+        batch = pa.record_batch([pa.array(dates, pa.int64()).cast(self.schema.field("Date").type), pa.array(artists, pa.string()), pa.array(tracks, pa.string()), pa.array(albums, pa.string())], schema=self.schema)
+        tmp_path = os.path.join(self.path, f".{self.part_name}.tmp")
+        if self.fmt == "parquet":
+            pq.write_table(pa.Table.from_batches([batch]), tmp_path, compression="zstd")
+        else:
+            with pa.ipc.new_file(tmp_path, self.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+                writer.write_batch(batch)
+        os.replace(tmp_path, os.path.join(self.path, self.part_name))
+        debug_print(f"History export: wrote {len(self.part_rows)} rows to {self.part_name}")
+        self.pending = 0
+        if len(self.part_rows) >= EXPORT_ROW_GROUP_SIZE or time.time() - self.part_ts >= EXPORT_PART_INTERVAL:
+            self.part_rows = []
+            self.part_name = None
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            with self.lock:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"* Warning: Cannot write history export to '{self.path}': {e}")
+
+    def close(self):
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        with self.lock:
+            self.flush()
+
+
+HISTORY_WRITERS = {}
+HISTORY_WRITERS_LOCK = threading.Lock()
+
+
+# Returns the Parquet / Arrow writer of the export path, shared by all threads of the process and closed at exit
+def get_history_writer(path):
+    with HISTORY_WRITERS_LOCK:
+        writer = HISTORY_WRITERS.get(path)
+        if writer is None:
+            writer = ColumnarHistoryWriter(path, export_format(path))
+            HISTORY_WRITERS[path] = writer
+            atexit.register(writer.close)
+        return writer
+
+
 # Initializes the CSV file
 def init_csv_file(csv_file_name):
     debug_print(f"Initializing CSV file: {csv_file_name}")
+    fmt = export_format(csv_file_name)
+    if fmt in ("parquet", "arrow"):
+        try:
+            get_history_writer(csv_file_name)
+        except Exception as e:
+            raise RuntimeError(f"Could not initialize export directory '{csv_file_name}': {e}")
+        return
     try:
-        if not os.path.isfile(csv_file_name) or os.path.getsize(csv_file_name) == 0:
+        if fmt == "ndjson":
+            with open(csv_file_name, 'a', encoding="utf-8") as _:
+                pass
+        elif not os.path.isfile(csv_file_name) or os.path.getsize(csv_file_name) == 0:
             with open(csv_file_name, 'a', newline='', buffering=1, encoding="utf-8") as f:
                 writer = csv.DictWriter(f, fieldnames=csvfieldnames, quoting=csv.QUOTE_NONNUMERIC)
                 writer.writeheader()
@@ -713,9 +1173,18 @@ def init_csv_file(csv_file_name):
         raise RuntimeError(f"Could not initialize CSV file '{csv_file_name}': {e}")
 
 
-# Writes CSV entry
+# Writes CSV entry (or the entry of the NDJSON / Parquet / Arrow export, depending on the file extension)
 def write_csv_entry(csv_file_name, timestamp, artist, track, album):
     try:
+        fmt = export_format(csv_file_name)
+        if fmt in ("parquet", "arrow"):
+            get_history_writer(csv_file_name).append(timestamp, artist, track, album)
+            return
+
+        if fmt == "ndjson":
+            with open(csv_file_name, 'a', buffering=1, encoding="utf-8") as ndjson_file:
+                ndjson_file.write(json.dumps({'Date': int(timestamp.timestamp()), 'Artist': artist, 'Track': track, 'Album': album}, ensure_ascii=False) + "\n")
+            return
 
         with open(csv_file_name, 'a', newline='', buffering=1, encoding="utf-8") as csv_file:
             csvwriter = csv.DictWriter(csv_file, fieldnames=csvfieldnames, quoting=csv.QUOTE_NONNUMERIC)
@@ -898,21 +1367,23 @@ def toggle_songs_on_loop_notifications_signal_handler(sig, frame):
 
 # Signal handler for SIGTRAP allowing to increase inactivity check interval by LASTFM_INACTIVITY_CHECK_SIGNAL_VALUE seconds
 def increase_inactivity_check_signal_handler(sig, frame):
-    global LASTFM_INACTIVITY_CHECK
+    global LASTFM_INACTIVITY_CHECK, SETTINGS_GENERATION
     LASTFM_INACTIVITY_CHECK = LASTFM_INACTIVITY_CHECK + LASTFM_INACTIVITY_CHECK_SIGNAL_VALUE
     sig_name = signal.Signals(sig).name
     print(f"* Signal {sig_name} received")
+    SETTINGS_GENERATION += 1
     print(f"* Last.fm timers: [inactivity: {display_time(LASTFM_INACTIVITY_CHECK)}]")
     print_cur_ts("Timestamp:\t\t\t")
 
 
 # Signal handler for SIGABRT allowing to decrease inactivity check interval by LASTFM_INACTIVITY_CHECK_SIGNAL_VALUE seconds
 def decrease_inactivity_check_signal_handler(sig, frame):
-    global LASTFM_INACTIVITY_CHECK
+    global LASTFM_INACTIVITY_CHECK, SETTINGS_GENERATION
     if LASTFM_INACTIVITY_CHECK - LASTFM_INACTIVITY_CHECK_SIGNAL_VALUE > 0:
         LASTFM_INACTIVITY_CHECK = LASTFM_INACTIVITY_CHECK - LASTFM_INACTIVITY_CHECK_SIGNAL_VALUE
     sig_name = signal.Signals(sig).name
     print(f"* Signal {sig_name} received")
+    SETTINGS_GENERATION += 1
     print(f"* Last.fm timers: [inactivity: {display_time(LASTFM_INACTIVITY_CHECK)}]")
     print_cur_ts("Timestamp:\t\t\t")
 
@@ -960,74 +1431,172 @@ def previous_and_next(some_iterable):
     return zip(prevs, items, nexts)
 
 
+# Title normalization shared by every cache and matcher of the tool; patterns are compiled once and results are memoized
+re_search_pattern = re.compile(re_search_str, re.IGNORECASE)
+re_replace_pattern = re.compile(re_replace_str, re.IGNORECASE)
+re_chars_to_remove_pattern = re.compile(r'([\"\'])')
+re_whitespace_pattern = re.compile(r'\s+')
+
+
+# Removes quote characters which break Spotify search queries
+def strip_quotes(text):
+    return re_chars_to_remove_pattern.sub('', text)
+
+
+# Returns the title with remaster, extended, remix, radio edit, feat. etc. suffixes removed (unchanged if there are none)
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def clean_title(title):
+    if re_search_pattern.search(title):
+        return re_replace_pattern.sub('', title).strip()
+    return title
+
+
+# Returns the text in a form suitable for comparisons: Unicode NFKC normalized, casefolded and with collapsed whitespace
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text):
+    return re_whitespace_pattern.sub(' ', unicodedata.normalize("NFKC", str(text)).casefold()).strip()
+
+
+# Returns the normalized (artist, track, album) tuple, it is the identity of a track used as cache and matching key
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize(artist, track, album=""):
+    return normalize_text(artist), normalize_text(track), normalize_text(album) if album else ""
+
+
+# Returns the similarity of two normalized strings as a score from 0 to 100, scores below cutoff are returned as 0
+# rapidfuzz's ratio() and difflib's ratio() both compute 2 * matches / total length, so thresholds work the same with either of them
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def similarity(a, b, cutoff=0):
+    if a == b:
+        return 100.0
+    if not a or not b:
+        return 0.0
+    if rapidfuzz_ratio:
+        return rapidfuzz_ratio(a, b, score_cutoff=cutoff)
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    # Cheap upper bounds first, most candidates are rejected without computing the full ratio
+    if matcher.real_quick_ratio() * 100 < cutoff or matcher.quick_ratio() * 100 < cutoff:
+        return 0.0
+    score = matcher.ratio() * 100
+    return score if score >= cutoff else 0.0
+
+
+# Returns normalize() result as a single string, for caches keyed by strings (e.g. the shared cache daemon)
+def normalize_key(artist, track, album=""):
+    return "\x1f".join(normalize(artist, track, album))
+
+
+# Encodes a name for Last.fm music page URLs, the same way pylast does in get_url()
+def lastfm_url_safe(text):
+    return quote_plus(quote_plus(str(text))).lower()
+
+
+# Music service, lyrics and Last.fm URLs of a track; every URL is built on first access only and then kept
+class TrackLinks:
+    def __init__(self, artist, track, album="", lastfm_style=True):
+        self.artist = artist
+        self.track = track
+        self.album = album
+        self.lastfm_style = lastfm_style
+
+    @cached_property
+    def search_string(self):
+        return quote_plus(f"{self.artist} {self.track}")
+
+    # Search string for lyrics services with remaster, extended etc. suffixes removed
+    @cached_property
+    def lyrics_search_string(self):
+        return quote_plus(clean_title(f"{self.artist} {self.track}"))
+
+    @cached_property
+    def spotify_search_url(self):
+        return f"https://open.spotify.com/search/{self.search_string}?si=1"
+
+    @cached_property
+    def apple_search_url(self):
+        return f"https://music.apple.com/pl/search?term={quote(f'{self.artist} {self.track}')}"
+
+    @cached_property
+    def genius_search_url(self):
+        return f"https://genius.com/search?q={self.lyrics_search_string}"
+
+    @cached_property
+    def azlyrics_search_url(self):
+        return f"https://www.azlyrics.com/search/?q={self.lyrics_search_string}"
+
+    @cached_property
+    def tekstowo_search_url(self):
+        return f"https://www.tekstowo.pl/szukaj,{self.lyrics_search_string}.html"
+
+    @cached_property
+    def musixmatch_search_url(self):
+        return f"https://www.musixmatch.com/search?query={self.lyrics_search_string}"
+
+    @cached_property
+    def lyrics_com_search_url(self):
+        return f"https://www.lyrics.com/serp.php?st={self.lyrics_search_string}&qtype=1"
+
+    @cached_property
+    def youtube_music_search_url(self):
+        return f"https://music.youtube.com/search?q={self.search_string}"
+
+    @cached_property
+    def amazon_music_search_url(self):
+        return f"https://music.amazon.com/search/{self.search_string}"
+
+    @cached_property
+    def deezer_search_url(self):
+        return f"https://www.deezer.com/search/{self.search_string}"
+
+    @cached_property
+    def tidal_search_url(self):
+        return f"https://tidal.com/search?q={self.search_string}"
+
+    # Last.fm URLs are built like pylast's Track.get_url() / Album.get_url() when a Last.fm network is available,
+    # so no pylast objects need to be created just to get them
+    @cached_property
+    def lastfm_url(self):
+        if self.lastfm_style:
+            return f"https://www.last.fm/music/{lastfm_url_safe(self.artist)}/_/{lastfm_url_safe(self.track)}"
+        return f"https://www.last.fm/music/{quote_plus(self.artist)}/_/{quote_plus(self.track)}"
+
+    @cached_property
+    def lastfm_album_url(self):
+        if not self.album:
+            return ""
+        if self.lastfm_style:
+            return f"https://www.last.fm/music/{lastfm_url_safe(self.artist)}/{lastfm_url_safe(self.album)}"
+        return f"https://www.last.fm/music/{quote_plus(self.artist)}/{quote_plus(self.album)}"
+
+    # Returns the URLs in get_spotify_apple_genius_search_urls() order; URLs of services disabled via ENABLE_*_URL are left empty,
+    # except Spotify and Last.fm track URLs which are also used as the track URL in notifications (USE_LASTFM_URL_IN_LAST_PLAYED)
+    def urls(self):
+        return (
+            self.spotify_search_url,
+            self.apple_search_url if ENABLE_APPLE_MUSIC_URL else "",
+            self.genius_search_url if ENABLE_GENIUS_LYRICS_URL else "",
+            self.azlyrics_search_url if ENABLE_AZLYRICS_URL else "",
+            self.tekstowo_search_url if ENABLE_TEKSTOWO_URL else "",
+            self.musixmatch_search_url if ENABLE_MUSIXMATCH_URL else "",
+            self.lyrics_com_search_url if ENABLE_LYRICS_COM_URL else "",
+            self.youtube_music_search_url if ENABLE_YOUTUBE_MUSIC_URL else "",
+            self.amazon_music_search_url if ENABLE_AMAZON_MUSIC_URL else "",
+            self.deezer_search_url if ENABLE_DEEZER_URL else "",
+            self.tidal_search_url if ENABLE_TIDAL_URL else "",
+            self.lastfm_url,
+            self.lastfm_album_url if ENABLE_LASTFM_ALBUM_URL else "",
+        )
+
+
+# Returns the cached TrackLinks object for the track, repeated notifications for the same track reuse already built URLs
+@lru_cache(maxsize=TRACK_LINKS_CACHE_SIZE)
+def get_track_links(artist, track, album="", lastfm_style=True):
+    return TrackLinks(artist, track, album, lastfm_style)
+
+
 # Prepares Spotify, Apple & lyrics search URLs for specified track and Last.fm URLs for track and album
 def get_spotify_apple_genius_search_urls(artist, track, album=None, network=None, track_obj=None):
-    spotify_search_string = quote_plus(f"{artist} {track}")
-    # Clean search string for lyrics services (remove remaster, extended, etc.)
-    lyrics_search_string = f"{artist} {track}"
-    if re.search(re_search_str, lyrics_search_string, re.IGNORECASE):
-        lyrics_search_string = re.sub(re_replace_str, '', lyrics_search_string, flags=re.IGNORECASE)
-    apple_search_string = quote(f"{artist} {track}")
-    spotify_search_url = f"https://open.spotify.com/search/{spotify_search_string}?si=1"
-    apple_search_url = f"https://music.apple.com/pl/search?term={apple_search_string}"
-    genius_search_url = f"https://genius.com/search?q={quote_plus(lyrics_search_string)}"
-    azlyrics_search_url = f"https://www.azlyrics.com/search/?q={quote_plus(lyrics_search_string)}"
-    tekstowo_search_url = f"https://www.tekstowo.pl/szukaj,{quote_plus(lyrics_search_string)}.html"
-    musixmatch_search_url = f"https://www.musixmatch.com/search?query={quote_plus(lyrics_search_string)}"
-    lyrics_com_search_url = f"https://www.lyrics.com/serp.php?st={quote_plus(lyrics_search_string)}&qtype=1"
-    youtube_music_search_url = f"https://music.youtube.com/search?q={spotify_search_string}"
-    amazon_music_search_url = f"https://music.amazon.com/search/{spotify_search_string}"
-    deezer_search_url = f"https://www.deezer.com/search/{spotify_search_string}"
-    tidal_search_url = f"https://tidal.com/search?q={spotify_search_string}"
-
-    # Get Last.fm URL - use track object if available, otherwise construct manually
-    lastfm_url = ""
-    if track_obj and hasattr(track_obj, 'get_url'):
-        try:
-            lastfm_url = track_obj.get_url()
-        except Exception:
-            # Fallback to manual construction if get_url() fails
-            artist_encoded = quote_plus(str(artist))
-            track_encoded = quote_plus(str(track))
-            lastfm_url = f"https://www.last.fm/music/{artist_encoded}/_/{track_encoded}"
-    elif network:
-        # If we have network but no track object, try creating one
-        try:
-            track_obj_temp = pylast.Track(artist, track, network)
-            lastfm_url = track_obj_temp.get_url()
-        except Exception:
-            # Fallback to manual construction
-            artist_encoded = quote_plus(str(artist))
-            track_encoded = quote_plus(str(track))
-            lastfm_url = f"https://www.last.fm/music/{artist_encoded}/_/{track_encoded}"
-    else:
-        # No track object or network, construct manually
-        artist_encoded = quote_plus(str(artist))
-        track_encoded = quote_plus(str(track))
-        lastfm_url = f"https://www.last.fm/music/{artist_encoded}/_/{track_encoded}"
-    # Get Last.fm album URL if album provided
-    lastfm_album_url = ""
-    if album:
-        if network:
-            try:
-                lastfm_album_url = pylast.Album(artist, album, network).get_url()
-            except Exception:
-                try:
-                    # Fallback to manual construction
-                    artist_encoded = quote_plus(str(artist))
-                    album_encoded = quote_plus(str(album))
-                    lastfm_album_url = f"https://www.last.fm/music/{artist_encoded}/{album_encoded}"
-                except Exception:
-                    lastfm_album_url = ""
-        else:
-            try:
-                artist_encoded = quote_plus(str(artist))
-                album_encoded = quote_plus(str(album))
-                lastfm_album_url = f"https://www.last.fm/music/{artist_encoded}/{album_encoded}"
-            except Exception:
-                lastfm_album_url = ""
-
-    return spotify_search_url, apple_search_url, genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, lastfm_url, lastfm_album_url
+    return get_track_links(str(artist), str(track), str(album) if album else "", bool(network or track_obj)).urls()
 
 
 # Formats lyrics URLs for console output based on configuration
@@ -1152,13 +1721,213 @@ def format_music_urls_email_html(spotify_url, lastfm_url, lastfm_album_url, appl
     return "<br>".join(lines) if lines else ""
 
 
+# HTTP transport for pylast which rewrites the scheme of Last.fm API requests (pylast always uses https), so LASTFM_API_URL can point at a plain http server
+# The class is created on first use, as its base class comes from pylast which is imported lazily
+@lru_cache(maxsize=None)
+def lastfm_api_url_transport_class():
+    class LastfmApiUrlTransport(pylast.httpx.HTTPTransport):
+        def __init__(self, scheme):
+            super().__init__()
+            self.scheme = scheme
+
+        def handle_request(self, request):
+            request.url = request.url.copy_with(scheme=self.scheme)
+            return super().handle_request(request)
+
+    return LastfmApiUrlTransport
+
+
+# Points pylast network object at a custom Last.fm API URL (see LASTFM_API_URL)
+def lastfm_network_set_api_url(network, api_url):
+    url = urlparse(api_url)
+    network.ws_server = (url.netloc, url.path or "/")
+    if url.scheme != "https":
+        network.proxy = {"https://": lastfm_api_url_transport_class()(url.scheme)}
+
+
+# Track record returned by LastfmJsonClient, a lightweight stand-in for pylast.Track: an (artist, title, album) tuple
+# with the attributes the monitor reads from pylast tracks (artist, title, info['album']); str() gives 'Artist - Title' like pylast
+class LastfmTrack(tuple):
+    __slots__ = ()
+
+    def __new__(cls, artist, title, album=""):
+        return tuple.__new__(cls, (artist, title, album))
+
+    artist = property(lambda self: self[0])
+    title = property(lambda self: self[1])
+
+    @property
+    def info(self):
+        return {"album": self[2]}
+
+    def __str__(self):
+        return f"{self[0]} - {self[1]}"
+
+
+# Minimal client for the Last.fm API methods called on every poll (user.getRecentTracks, track.getInfo)
+# It requests JSON over a pooled per-thread HTTP session and returns compact records instead of pylast's XML DOM and objects;
+# errors are raised as pylast exceptions, so the error handling and circuit breaker treat both clients the same way
+class LastfmJsonClient:
+
+    # Maximum page size of user.getRecentTracks
+    PAGE_LIMIT = 200
+
+    def __init__(self, api_url):
+        self.api_url = api_url
+        self.local = threading.local()
+
+    def session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = req.Session()
+            session.headers["User-Agent"] = f"lastfm_monitor/{VERSION}"
+            self.local.session = session
+        return session
+
+    # Calls the API method and returns the decoded JSON response
+    def request(self, network, method, params):
+        query = dict(params, method=method, api_key=network.api_key, format="json")
+        lastfm_count_request(network)
+        try:
+            response = self.session().get(self.api_url, params=query, timeout=(5, 20))
+        except Exception as e:
+            raise pylast.NetworkError(network, e) from e
+        if response.status_code in (500, 502, 503, 504, 429):
+            raise pylast.WSError(network, response.status_code, f"Connection to the API failed with HTTP code {response.status_code}")
+        try:
+            data = response.json()
+        except Exception as e:
+            raise pylast.MalformedResponseError(network, e) from e
+        if not isinstance(data, dict):
+            raise pylast.MalformedResponseError(network, ValueError("unexpected JSON response"))
+        if "error" in data:
+            raise pylast.WSError(network, str(data["error"]), str(data.get("message", "")).strip())
+        return data
+
+    # Returns (now_playing, played, total_pages) for a single page of user.getRecentTracks: the currently playing LastfmTrack or None,
+    # the recently played tracks of the page as pylast.PlayedTrack tuples (with LastfmTrack as the track), newest first, and the number of pages;
+    # with to set only tracks scrobbled before that timestamp are returned, so the pages do not shift when new scrobbles arrive
+    def recent_tracks_page(self, network, username, page, per_page, to=None):
+        params = {"user": username, "limit": per_page, "page": page}
+        if to:
+            params["to"] = to
+        data = self.request(network, "user.getRecentTracks", params)
+        recent = data.get("recenttracks") or {}
+        items = recent.get("track") or []
+        # A single track is returned as an object instead of a list
+        if isinstance(items, dict):
+            items = [items]
+        now_playing = None
+        played = []
+        for item in items:
+            artist = item.get("artist") or {}
+            artist = (artist.get("#text") or artist.get("name") or "") if isinstance(artist, dict) else str(artist)
+            album = item.get("album") or {}
+            album = (album.get("#text") or "") if isinstance(album, dict) else str(album)
+            track = LastfmTrack(artist, item.get("name") or "", album)
+            if (item.get("@attr") or {}).get("nowplaying") == "true":
+                if now_playing is None:
+                    now_playing = track
+                continue
+            date = item.get("date") or {}
+            played.append(pylast.PlayedTrack(track, album, date.get("#text", ""), date.get("uts")))
+        total_pages = int((recent.get("@attr") or {}).get("totalPages") or 0)
+        return now_playing, played, total_pages
+
+    # Returns (now_playing, played): the currently playing LastfmTrack or None and up to limit recently played tracks
+    # as pylast.PlayedTrack tuples (with LastfmTrack as the track), newest first
+    def recent_tracks(self, network, username, limit):
+        now_playing = None
+        played = []
+        per_page = min(limit + 1, self.PAGE_LIMIT)
+        page = 1
+        while True:
+            page_now_playing, page_played, total_pages = self.recent_tracks_page(network, username, page, per_page)
+            if page == 1:
+                now_playing = page_now_playing
+            played.extend(page_played[:limit - len(played)])
+            if len(played) >= limit or page >= total_pages or not page_played:
+                break
+            page += 1
+        return now_playing, played
+
+    # Returns the track duration in milliseconds (0 if unknown)
+    def track_duration(self, network, artist, track):
+        data = self.request(network, "track.getInfo", {"artist": artist, "track": track})
+        try:
+            return int((data.get("track") or {}).get("duration") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+
+LASTFM_JSON_CLIENT = None
+
+
+# Returns the process-wide Last.fm JSON client
+def get_lastfm_json_client():
+    global LASTFM_JSON_CLIENT
+    if LASTFM_JSON_CLIENT is None:
+        LASTFM_JSON_CLIENT = LastfmJsonClient(LASTFM_API_URL)
+    return LASTFM_JSON_CLIENT
+
+
 # Returns the list of recently played Last.fm tracks
 def lastfm_get_recent_tracks(username, network, number):
+    if LASTFM_JSON_API:
+        return get_lastfm_json_client().recent_tracks(network, username, number)[1]
+    lastfm_count_request(network)
+    return network.get_user(username).get_recent_tracks(limit=number)
+
+
+# Returns (recent_tracks, now_playing) for the user; with the JSON client both come from a single API request
+def lastfm_get_recent_tracks_and_now_playing(username, user, network, number):
+    if LASTFM_JSON_API:
+        now_playing, recent_tracks = get_lastfm_json_client().recent_tracks(network, username, number)
+        return recent_tracks, now_playing
+    recent_tracks = lastfm_get_recent_tracks(username, network, number)
+    lastfm_count_request(network)
+    return recent_tracks, user.get_now_playing()
+
+
+# Returns the track the user is currently playing or None
+def lastfm_get_now_playing(username, user, network):
+    if LASTFM_JSON_API:
+        return get_lastfm_json_client().recent_tracks(network, username, 0)[0]
+    lastfm_count_request(network)
+    return user.get_now_playing()
+
+
+# Yields up to number tracks recently played by the user before to_ts, newest first; with the JSON client the next
+# LIST_STREAM_PREFETCH_PAGES pages are requested in parallel while the current one is consumed, pylast pages are fetched one by one
+def lastfm_stream_recent_tracks(username, network, number, to_ts):
+    if not LASTFM_JSON_API:
+        lastfm_count_request(network)
+        yield from network.get_user(username).get_recent_tracks(limit=number, time_to=to_ts, stream=True)
+        return
+
+    client = get_lastfm_json_client()
+    executor = get_startup_executor()
+    per_page = LastfmJsonClient.PAGE_LIMIT
+    last_page = -(-number // per_page)
+    futures = {page: executor.submit(client.recent_tracks_page, network, username, page, per_page, to_ts) for page in range(1, min(last_page, 1 + LIST_STREAM_PREFETCH_PAGES) + 1)}
+    count = 0
+    page = 1
     try:
-        recent_tracks = network.get_user(username).get_recent_tracks(limit=number)
-        return recent_tracks
-    except Exception:
-        raise
+        while page <= last_page:
+            _, played, total_pages = futures.pop(page).result()
+            last_page = min(last_page, total_pages)
+            next_page = page + 1 + LIST_STREAM_PREFETCH_PAGES
+            if next_page <= last_page and next_page not in futures:
+                futures[next_page] = executor.submit(client.recent_tracks_page, network, username, next_page, per_page, to_ts)
+            for played_track in played[:number - count]:
+                yield played_track
+            count += min(len(played), number - count)
+            if count >= number or not played:
+                break
+            page += 1
+    finally:
+        for future in futures.values():
+            future.cancel()
 
 
 # Returns Last.fm HTTP headers crafted to look like a real browser so the WAF is less likely to block low-volume scraping
@@ -1177,24 +1946,324 @@ def _lastfm_scrape_headers():
     }
 
 
+# Retry allowance shared between concurrent Last.fm requests, so parallel fetches hitting the same outage do not multiply the backoff time
+class RetryBudget:
+    def __init__(self, retries):
+        self.retries = retries
+        self.lock = threading.Lock()
+
+    # Consumes one retry and returns True, or returns False when the budget is exhausted
+    def take(self):
+        with self.lock:
+            if self.retries <= 0:
+                return False
+            self.retries -= 1
+            return True
+
+
+# Returns exponential backoff delay for the given attempt (0-based) capped at max_delay, with "equal jitter" (random value from the upper half)
+# so monitors failing at the same moment do not retry in lockstep
+def jittered_backoff(base_delay, attempt, max_delay=None):
+    delay = base_delay * (2 ** attempt)
+    if max_delay is not None:
+        delay = min(max_delay, delay)
+    return random.uniform(delay / 2, delay)
+
+
+# Classes of Last.fm errors returned by classify_lastfm_error()
+ERROR_CLASS_SERVER = "server"  # HTTP 50x, Last.fm 'operation failed', 'service offline', 'temporarily unavailable'
+ERROR_CLASS_NETWORK = "network"  # Timeouts, DNS and connection failures
+ERROR_CLASS_RATE_LIMIT = "rate_limit"  # HTTP 429, Last.fm 'rate limit exceeded'
+ERROR_CLASS_AUTH = "auth"  # Invalid or suspended API key
+ERROR_CLASS_OTHER = "other"
+
+# Error classes which mean the endpoint is (temporarily) unusable, they are counted by circuit breakers
+TRANSIENT_ERROR_CLASSES = (ERROR_CLASS_SERVER, ERROR_CLASS_NETWORK, ERROR_CLASS_RATE_LIMIT)
+
+
+# Classifies exception raised while talking to Last.fm by its type and status code; the string matching is a fallback for unknown exception types
+def classify_lastfm_error(e):
+    if isinstance(e, pylast.WSError):
+        status = str(e.status)
+        if status in ("500", "502", "503", "504", str(pylast.STATUS_OPERATION_FAILED), str(pylast.STATUS_OFFLINE), str(pylast.STATUS_TEMPORARILY_UNAVAILABLE)):
+            return ERROR_CLASS_SERVER
+        if status in ("429", str(pylast.STATUS_RATE_LIMIT_EXCEEDED)):
+            return ERROR_CLASS_RATE_LIMIT
+        if status in (str(pylast.STATUS_INVALID_API_KEY), str(pylast.STATUS_API_KEY_SUSPENDED), str(pylast.STATUS_AUTH_FAILED)):
+            return ERROR_CLASS_AUTH
+        return ERROR_CLASS_OTHER
+    if isinstance(e, pylast.MalformedResponseError):
+        # Truncated responses and HTML error pages served by proxies during outages
+        return ERROR_CLASS_SERVER
+    if isinstance(e, pylast.NetworkError):
+        return ERROR_CLASS_NETWORK
+    if isinstance(e, req.HTTPError) and e.response is not None:
+        if e.response.status_code == 429:
+            return ERROR_CLASS_RATE_LIMIT
+        if e.response.status_code >= 500:
+            return ERROR_CLASS_SERVER
+        return ERROR_CLASS_OTHER
+    if isinstance(e, (req.Timeout, req.ConnectionError, TimeoutError, ConnectionError)):
+        return ERROR_CLASS_NETWORK
+
+    msg = str(e).lower()
+    if 'invalid api key' in msg or 'api key suspended' in msg:
+        return ERROR_CLASS_AUTH
+    if any(x in msg for x in ["http code 500", "http code 504", "http code 503", "http code 502", "http 50"]):
+        return ERROR_CLASS_SERVER
+    if any(x in msg for x in ["429 client", "http 429", "rate limit"]):
+        return ERROR_CLASS_RATE_LIMIT
+    if any(x in msg for x in ["timed out", "timeout", "name resolution", "failed to resolve", "family not supported", "aborted"]) or msg == '':
+        return ERROR_CLASS_NETWORK
+    return ERROR_CLASS_OTHER
+
+
+# Circuit breaker guarding a single endpoint (closed -> open -> half-open -> closed)
+# Closed: requests go through, consecutive transient failures are counted
+# Open: requests are rejected until the jittered backoff delay elapses
+# Half-open: one probe request goes through, its success closes the circuit, its failure reopens it with doubled delay
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold, base_delay, max_delay):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.opened_ts = 0.0
+        self.probe_ts = 0.0
+
+    # Returns True if a request may be sent now; in half-open state only one probe is let through at a time
+    def allow(self):
+        with self.lock:
+            if self.failure_threshold <= 0 or self.state == self.CLOSED:
+                return True
+            now = time.time()
+            if self.state == self.OPEN and now >= self.open_until:
+                self.state = self.HALF_OPEN
+                self.probe_ts = now
+                return True
+            # A probe which never reported back (e.g. failed with an unrelated error) does not block the circuit forever
+            if self.state == self.HALF_OPEN and now - self.probe_ts >= self.base_delay:
+                self.probe_ts = now
+                return True
+            return False
+
+    # Returns number of seconds until the next request is allowed (0 if allowed now)
+    def retry_in(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                return max(0.0, self.open_until - time.time())
+            if self.state == self.HALF_OPEN:
+                return max(0.0, self.probe_ts + self.base_delay - time.time())
+            return 0.0
+
+    # Records a successful request, returns the outage duration in seconds if it closed an open circuit, otherwise 0
+    def record_success(self):
+        with self.lock:
+            outage = 0
+            if self.state != self.CLOSED:
+                outage = max(1, int(time.time() - self.opened_ts))
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+            return outage
+
+    # Records a failed request, returns the backoff delay in seconds if the circuit was just opened from closed state, otherwise 0
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failure_threshold <= 0:
+                return 0
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                was_closed = self.state == self.CLOSED
+                delay = jittered_backoff(self.base_delay, self.trips, self.max_delay)
+                self.trips += 1
+                self.state = self.OPEN
+                now = time.time()
+                self.open_until = now + delay
+                if was_closed:
+                    self.opened_ts = now
+                    return delay
+            return 0
+
+    # Records outcome of a request which raised exception e: transient errors count as failures, any other Last.fm error
+    # response proves the endpoint is up; returns the same as record_failure() / record_success()
+    def record_error(self, e):
+        if classify_lastfm_error(e) in TRANSIENT_ERROR_CLASSES:
+            return self.record_failure()
+        if isinstance(e, pylast.WSError):
+            self.record_success()
+        return 0
+
+
+# Circuit breakers shared per endpoint by all monitored users in the process, see get_circuit_breaker()
+CIRCUIT_BREAKERS = {}
+CIRCUIT_BREAKERS_LOCK = threading.Lock()
+
+
+# Returns the circuit breaker for the endpoint ('lastfm_api' or 'lastfm_web'), creating it on first use
+def get_circuit_breaker(endpoint):
+    with CIRCUIT_BREAKERS_LOCK:
+        breaker = CIRCUIT_BREAKERS.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(endpoint, CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_BASE_DELAY, CIRCUIT_BREAKER_MAX_DELAY)
+            CIRCUIT_BREAKERS[endpoint] = breaker
+        return breaker
+
+
+# Pool of Last.fm API keys shared by the users monitored in this process
+# Users are assigned to healthy keys by smooth weighted round-robin; every key counts its requests (total and per minute)
+# and a key failing with an invalid/suspended API key error is taken out of the pool for API_KEY_RETRY_INTERVAL seconds
+class ApiKeyPool:
+    def __init__(self, keys):
+        # keys: list of (api_key, api_secret, weight)
+        self.lock = threading.Lock()
+        self.keys = {}
+        for api_key, api_secret, weight in keys:
+            if api_key not in self.keys:
+                self.keys[api_key] = {"secret": api_secret, "weight": max(1, int(weight)), "current": 0, "users": set(), "requests": 0, "minute": 0, "minute_requests": 0, "last_minute_requests": 0, "failed_until": 0, "failures": 0}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def healthy(self, now=None):
+        now = now or time.time()
+        return [k for k, v in self.keys.items() if v["failed_until"] <= now]
+
+    # Assigns a key to the user and returns (api_key, api_secret); a user keeps its key until it fails
+    def assign(self, username, exclude=None):
+        with self.lock:
+            for entry in self.keys.values():
+                entry["users"].discard(username)
+            candidates = [k for k in self.healthy() if k != exclude] or [k for k in self.keys if k != exclude] or list(self.keys)
+            total = 0
+            for k in candidates:
+                entry = self.keys[k]
+                entry["current"] += entry["weight"]
+                total += entry["weight"]
+            chosen = max(candidates, key=lambda k: self.keys[k]["current"])
+            entry = self.keys[chosen]
+            entry["current"] -= total
+            entry["users"].add(username)
+            return chosen, entry["secret"]
+
+    def record_request(self, api_key, count=1):
+        entry = self.keys.get(api_key)
+        if entry is None:
+            return
+        minute = int(time.time() // 60)
+        with self.lock:
+            if entry["minute"] != minute:
+                entry["last_minute_requests"] = entry["minute_requests"] if entry["minute"] == minute - 1 else 0
+                entry["minute"] = minute
+                entry["minute_requests"] = 0
+            entry["minute_requests"] += count
+            entry["requests"] += count
+
+    # Takes the failed key out of the pool, its users get other keys when they report the failure via reassign()
+    def record_failure(self, api_key):
+        entry = self.keys.get(api_key)
+        if entry is None:
+            return
+        with self.lock:
+            entry["failures"] += 1
+            entry["failed_until"] = time.time() + API_KEY_RETRY_INTERVAL
+
+    # Returns per-key statistics, keys are shortened so they can be printed
+    def stats(self):
+        now = time.time()
+        minute = int(now // 60)
+        with self.lock:
+            return {api_key_label(k): {"users": len(v["users"]), "requests": v["requests"], "requests_per_min": v["last_minute_requests"] if v["minute"] == minute else (v["minute_requests"] if v["minute"] == minute - 1 else 0), "healthy": v["failed_until"] <= now, "failures": v["failures"]} for k, v in self.keys.items()}
+
+
+API_KEY_POOL = None
+
+
+# Returns shortened API key, safe to be printed
+def api_key_label(api_key):
+    return f"{api_key[:6]}..." if api_key else "-"
+
+
+# Returns the list of (api_key, api_secret, weight) entries from LASTFM_API_KEY and LASTFM_API_KEYS
+# LASTFM_API_KEYS entries are (api_key, api_secret[, weight]) tuples or 'api_key:api_secret[:weight]' strings (also as one comma separated string)
+def parse_api_keys(primary_key, primary_secret, keys):
+    entries = []
+    if primary_key and primary_key != "your_lastfm_api_key":
+        entries.append((primary_key, primary_secret, 1))
+    if isinstance(keys, str):
+        keys = [k for k in keys.split(",") if k.strip()]
+    for item in keys or []:
+        parts = item.strip().split(":") if isinstance(item, str) else list(item)
+        if len(parts) not in (2, 3) or not parts[0] or not parts[1]:
+            raise ValueError(f"invalid LASTFM_API_KEYS entry '{item}', expected (api_key, api_secret[, weight])")
+        try:
+            weight = int(parts[2]) if len(parts) == 3 else 1
+        except ValueError:
+            raise ValueError(f"invalid weight in LASTFM_API_KEYS entry '{item}'")
+        entries.append((str(parts[0]).strip(), str(parts[1]).strip(), weight))
+    return entries
+
+
+# Sets the API key of the user's network object from the API key pool (if enabled)
+def lastfm_assign_api_key(network, username, exclude=None):
+    if API_KEY_POOL:
+        network.api_key, network.api_secret = API_KEY_POOL.assign(username, exclude)
+
+
+# Counts requests made with the network's API key in the API key pool (if enabled)
+def lastfm_count_request(network, count=1):
+    if API_KEY_POOL:
+        API_KEY_POOL.record_request(network.api_key, count)
+
+
+# Moves the user to another API key after an invalid/suspended API key error, returns True if the key was changed
+def lastfm_reassign_api_key(network, username):
+    if not API_KEY_POOL or len(API_KEY_POOL) < 2:
+        return False
+    failed_key = network.api_key
+    API_KEY_POOL.record_failure(failed_key)
+    lastfm_assign_api_key(network, username, exclude=failed_key)
+    return network.api_key != failed_key
+
+
 # Fetches a URL with short retry/backoff on transient failures (Timeout, ConnectionError, 429, 5xx) and raises RuntimeError on any final failure
-def _lastfm_http_get_with_retry(url, attempts=3, base_delay=2.0):
+# If budget (RetryBudget) is given, every retry also has to be granted by it
+# Requests go through the shared 'lastfm_web' circuit breaker, so no request is sent while Last.fm web pages are known to be down
+def _lastfm_http_get_with_retry(url, attempts=3, base_delay=2.0, budget=None):
+    breaker = get_circuit_breaker("lastfm_web")
     last_exc = None
     for i in range(attempts):
+        if not breaker.allow():
+            raise RuntimeError(f"Last.fm web pages unavailable, circuit breaker open (next attempt in {display_time(int(breaker.retry_in()) or 1)}){': ' + str(last_exc) if last_exc else ''}")
         try:
             response = req.get(url, headers=_lastfm_scrape_headers(), timeout=FUNCTION_TIMEOUT * 2)
             if response.status_code in (429, 500, 502, 503, 504):
                 last_exc = RuntimeError(f"HTTP {response.status_code} from Last.fm")
+                breaker.record_failure()
             else:
                 response.raise_for_status()
+                breaker.record_success()
                 return response
         except (req.Timeout, req.ConnectionError) as e:
             last_exc = e
+            breaker.record_failure()
         except req.HTTPError as e:
             # Non-retryable 4xx (except 429 handled above) propagates immediately
+            breaker.record_success()
             raise RuntimeError(f"Failed to fetch from Last.fm: {e}")
         if i < attempts - 1:
-            time.sleep(base_delay * (2 ** i))
+            if budget is not None and not budget.take():
+                raise RuntimeError(f"Failed to fetch from Last.fm after {i + 1} attempts (shared retry budget exhausted): {last_exc}")
+            time.sleep(jittered_backoff(base_delay, i))
     raise RuntimeError(f"Failed to fetch from Last.fm after {attempts} attempts: {last_exc}")
 
 
@@ -1209,7 +2278,7 @@ def _lastfm_parse_count_from_h1(soup):
 
 
 # Scrapes a user's followers or following list from Last.fm using structural selectors and cross-checks the parsed count against the page's own header count to avoid silent empty returns; kind must be 'followers' or 'following'
-def _lastfm_scrape_user_list(username, kind):
+def _lastfm_scrape_user_list(username, kind, budget=None):
     from bs4 import BeautifulSoup  # type: ignore
 
     if kind not in ('followers', 'following'):
@@ -1217,7 +2286,7 @@ def _lastfm_scrape_user_list(username, kind):
 
     url = f"https://www.last.fm/user/{quote_plus(username)}/{kind}"
     try:
-        response = _lastfm_http_get_with_retry(url)
+        response = _lastfm_http_get_with_retry(url, budget=budget)
         soup = BeautifulSoup(response.content, 'html.parser')
 
         # Authoritative count from the page's h1 (e.g. "Followers (1)" / "Following (1)")
@@ -1263,96 +2332,250 @@ def _lastfm_scrape_user_list(username, kind):
 
 
 # Returns a set of usernames that the user is following (friends) - scraped from web
-def lastfm_get_friends(username):
-    return _lastfm_scrape_user_list(username, 'following')
+def lastfm_get_friends(username, budget=None):
+    return _lastfm_scrape_user_list(username, 'following', budget)
 
 
 # Returns a set of usernames that are following the user (scraped from web)
-def lastfm_get_followers(username):
-    return _lastfm_scrape_user_list(username, 'followers')
+def lastfm_get_followers(username, budget=None):
+    return _lastfm_scrape_user_list(username, 'followers', budget)
+
+
+# Embedded per-user state store kept in a SQLite database in WAL mode
+# Values are JSON-serialized; writes are buffered in memory and committed in one transaction every flush_interval seconds
+class StateStore:
+    def __init__(self, path, flush_interval=30):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS state (username TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_ts INTEGER NOT NULL, PRIMARY KEY (username, key))")
+        self.conn.commit()
+        self.stop_event = threading.Event()
+        self.flush_thread = threading.Thread(target=self._flush_loop, name="state_store_flush", daemon=True)
+        self.flush_thread.start()
+        atexit.register(self.close)
+
+    # Returns (value, updated_ts) for the key or (default, 0) if it does not exist
+    def get_with_ts(self, username, key, default=None):
+        with self.lock:
+            if (username, key) in self.pending:
+                value_json, updated_ts = self.pending[(username, key)]
+            else:
+                row = self.conn.execute("SELECT value, updated_ts FROM state WHERE username = ? AND key = ?", (username, key)).fetchone()
+                if not row:
+                    return default, 0
+                value_json, updated_ts = row
+        return json.loads(value_json), updated_ts
+
+    def get(self, username, key, default=None):
+        return self.get_with_ts(username, key, default)[0]
+
+    def contains(self, username, key):
+        return self.get_with_ts(username, key, None)[1] > 0
+
+    # Queues the value to be written with the next flush; later writes of the same key replace earlier ones
+    def set(self, username, key, value):
+        value_json = json.dumps(value, ensure_ascii=False)
+        with self.lock:
+            self.pending[(username, key)] = (value_json, int(time.time()))
+
+    # Commits all pending writes in a single transaction
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            rows = [(username, key, value_json, updated_ts) for (username, key), (value_json, updated_ts) in self.pending.items()]
+            try:
+                with self.conn:
+                    self.conn.executemany("INSERT INTO state (username, key, value, updated_ts) VALUES (?, ?, ?, ?) ON CONFLICT(username, key) DO UPDATE SET value = excluded.value, updated_ts = excluded.updated_ts", rows)
+                self.pending = {}
+            except Exception as e:
+                print(f"* Warning: Cannot commit state to '{self.path}': {e}")
+                return
+        debug_print(f"State store: committed {len(rows)} pending writes")
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+
+# Reads a JSON file used for per-user state, returns None if it does not exist
+def _read_state_json_file(filename):
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, 'r', encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Loads the last activity entry ([timestamp, artist, track, album]) of the user
+# Returns (entry, source description, modification timestamp), entry is an empty list if nothing has been saved yet
+def load_last_activity(username):
+    filename = f"lastfm_{username}_last_activity.json"
+    if STATE_STORE:
+        entry, updated_ts = STATE_STORE.get_with_ts(username, "last_activity")
+        if entry:
+            return entry, f"state DB '{STATE_STORE.path}'", updated_ts
+    try:
+        entry = _read_state_json_file(filename)
+    except Exception as e:
+        print(f"* Cannot load last status from '{filename}' file: {e}")
+        entry = None
+    if not entry:
+        return [], "", 0
+    return entry, f"file '{filename}'", int(os.path.getmtime(filename))
+
+
+# Saves the last activity entry ([timestamp, artist, track, album]) of the user
+def save_last_activity(username, entry):
+    if STATE_STORE:
+        STATE_STORE.set(username, "last_activity", entry)
+        return
+    filename = f"lastfm_{username}_last_activity.json"
+    try:
+        with open(filename, 'w', encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+    except Exception as e:
+        print(f"* Cannot save last status to '{filename}' file: {e}")
+
+
+# Returns True if a friends/followers baseline has already been saved for the user
+def friends_state_exists(username, friends_type):
+    if STATE_STORE and STATE_STORE.contains(username, f"friends_{friends_type}"):
+        return True
+    return os.path.isfile(f"lastfm_{username}_{friends_type}.json")
 
 
-# Loads previous friends/followers state from JSON file
+# Returns a human readable location of the friends/followers state, used in console messages
+def friends_state_location(username, friends_type):
+    if STATE_STORE:
+        return f"state DB {STATE_STORE.path}"
+    return f"file lastfm_{username}_{friends_type}.json"
+
+
+# Loads previous friends/followers state from the state DB or JSON file
 def load_friends_state(username, friends_type):
     filename = f"lastfm_{username}_{friends_type}.json"
-    if os.path.isfile(filename):
+    data = None
+    if STATE_STORE:
+        data = STATE_STORE.get(username, f"friends_{friends_type}")
+    if data is None:
         try:
-            with open(filename, 'r', encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return set(data)
-                elif isinstance(data, dict) and 'users' in data:
-                    return set(data['users'])
-                else:
-                    return set()
+            data = _read_state_json_file(filename)
         except Exception as e:
             print(f"* Warning: Cannot load {friends_type} state from '{filename}': {e}")
             return set()
+    if isinstance(data, list):
+        return set(data)
+    elif isinstance(data, dict) and 'users' in data:
+        return set(data['users'])
     return set()
 
 
-# Saves current friends/followers state to JSON file
+# Saves current friends/followers state to the state DB or JSON file
 def save_friends_state(username, friends_type, users_set):
+    data = {
+        'users': sorted(list(users_set)),
+        'count': len(users_set),
+        'last_updated': int(time.time())
+    }
+    if STATE_STORE:
+        STATE_STORE.set(username, f"friends_{friends_type}", data)
+        return
     filename = f"lastfm_{username}_{friends_type}.json"
     try:
-        data = {
-            'users': sorted(list(users_set)),
-            'count': len(users_set),
-            'last_updated': int(time.time())
-        }
         with open(filename, 'w', encoding="utf-8") as f:
             json.dump(data, f, indent=2)
     except Exception as e:
         print(f"* Warning: Cannot save {friends_type} state to '{filename}': {e}")
 
 
+# Loads the monitor checkpoint of the user, returns None if there is none or it is too old to be resumed
+def load_monitor_checkpoint(username):
+    if CHECKPOINT_INTERVAL <= 0:
+        return None
+    filename = f"lastfm_{username}_checkpoint.json"
+    try:
+        if STATE_STORE:
+            checkpoint = STATE_STORE.get(username, "checkpoint")
+        else:
+            checkpoint = _read_state_json_file(filename)
+    except Exception as e:
+        print(f"* Warning: Cannot load checkpoint from '{filename}': {e}")
+        return None
+    if not checkpoint or checkpoint.get('version') != CHECKPOINT_VERSION:
+        return None
+    age = int(time.time()) - int(checkpoint.get('saved_ts', 0))
+    if age < 0 or age > CHECKPOINT_MAX_AGE:
+        debug_print(f"Ignoring checkpoint saved {display_time(age)} ago")
+        return None
+    return checkpoint
+
+
+# Saves the monitor checkpoint of the user; the JSON file is replaced atomically so a crash never leaves it truncated
+def save_monitor_checkpoint(username, state):
+    checkpoint = {'version': CHECKPOINT_VERSION, 'saved_ts': int(time.time()), 'state': state}
+    if STATE_STORE:
+        STATE_STORE.set(username, "checkpoint", checkpoint)
+        return
+    filename = f"lastfm_{username}_checkpoint.json"
+    try:
+        with open(f"{filename}.tmp", 'w', encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(f"{filename}.tmp", filename)
+    except Exception as e:
+        print(f"* Warning: Cannot save checkpoint to '{filename}': {e}")
+
+
 # Checks for changes in friends/followers and returns (changes dict, current sets dict) so callers can persist the exact scraped sets without re-fetching
+# Followings and followers are scraped concurrently and share one retry budget (FRIENDS_SCRAPE_RETRY_BUDGET)
 def check_friends_changes(username, track_followings, track_followers, save_state=True, raise_on_error=False):
     changes = {}
     current_sets = {}
 
+    fetchers = []
     if track_followings:
-        try:
-            previous_friends = load_friends_state(username, 'followings')
-            current_friends = lastfm_get_friends(username)
-            current_sets['followings'] = current_friends
-
-            added_friends = current_friends - previous_friends
-            removed_friends = previous_friends - current_friends
-
-            if added_friends or removed_friends:
-                changes['followings'] = {
-                    'added': sorted(list(added_friends)),
-                    'removed': sorted(list(removed_friends)),
-                    'current_count': len(current_friends),
-                    'previous_count': len(previous_friends)
-                }
+        fetchers.append(('followings', lastfm_get_friends))
+    if track_followers:
+        fetchers.append(('followers', lastfm_get_followers))
 
-            if save_state:
-                save_friends_state(username, 'followings', current_friends)
-        except Exception as e:
-            if raise_on_error:
-                raise e
+    if not fetchers:
+        return changes, current_sets
 
-    if track_followers:
+    budget = RetryBudget(FRIENDS_SCRAPE_RETRY_BUDGET)
+    with ThreadPoolExecutor(max_workers=len(fetchers), thread_name_prefix="friends_scrape") as executor:
+        futures = [(friends_type, executor.submit(fetch, username, budget)) for friends_type, fetch in fetchers]
+
+    for friends_type, future in futures:
         try:
-            previous_followers = load_friends_state(username, 'followers')
-            current_followers = lastfm_get_followers(username)
-            current_sets['followers'] = current_followers
-
-            added_followers = current_followers - previous_followers
-            removed_followers = previous_followers - current_followers
-
-            if added_followers or removed_followers:
-                changes['followers'] = {
-                    'added': sorted(list(added_followers)),
-                    'removed': sorted(list(removed_followers)),
-                    'current_count': len(current_followers),
-                    'previous_count': len(previous_followers)
+            previous_users = load_friends_state(username, friends_type)
+            current_users = future.result()
+            current_sets[friends_type] = current_users
+
+            added_users = current_users - previous_users
+            removed_users = previous_users - current_users
+
+            if added_users or removed_users:
+                changes[friends_type] = {
+                    'added': sorted(list(added_users)),
+                    'removed': sorted(list(removed_users)),
+                    'current_count': len(current_users),
+                    'previous_count': len(previous_users)
                 }
 
             if save_state:
-                save_friends_state(username, 'followers', current_followers)
+                save_friends_state(username, friends_type, current_users)
         except Exception as e:
             if raise_on_error:
                 raise e
@@ -1562,120 +2785,49 @@ def notify_friends_changes(username, changes, skip_initial_line=False):
         print_cur_ts("Timestamp:\t\t\t")
 
 
-# Displays the list of recently played Last.fm tracks
-def lastfm_list_tracks(username, user, network, number, csv_file_name):
-
-    list_operation = "* Listing & saving" if csv_file_name else "* Listing"
-
-    print(f"{list_operation} {number} tracks recently listened by {username} ...\n")
-
+# Shortens the string in the middle, so it fits in max_len characters
+def shorten_middle(s, max_len, ellipsis="..."):
+    if s is None:
+        return ""
+    s = str(s)
+    if len(s) <= max_len:
+        return s
+    keep = max_len - len(ellipsis)
+    if keep <= 0:
+        return ellipsis[:max_len]
+    left = keep // 2
+    right = keep - left
+    return f"{s[:left]}{ellipsis}{s[-right:]}"
+
+
+# Returns the column widths (#, day, date, artist, title, album) of the recent tracks table and its total row width,
+# fitting the longest artist, title and album into the terminal width
+def lastfm_list_column_widths(max_artist_len, max_title_len, max_album_len):
+    # Calculate column widths based on terminal size
     try:
-        new_track = user.get_now_playing()
-        recent_tracks = lastfm_get_recent_tracks(username, network, number)
-    except Exception as e:
-        print(f"* Error: Cannot display recent tracks for the user: {e}")
-        sys.exit(1)
+        term_width = shutil.get_terminal_size(fallback=(100, 24)).columns
+    except Exception:
+        term_width = 100
 
-    try:
-        if csv_file_name:
-            init_csv_file(csv_file_name)
-    except Exception as e:
-        print(f"* Error: {e}")
+    w_num = 4
+    w_day = 4
+    w_date = 24
 
-    # Helper function to shorten strings in the middle
-    def _shorten_middle(s, max_len, ellipsis="..."):
-        if s is None:
-            return ""
-        s = str(s)
-        if len(s) <= max_len:
-            return s
-        keep = max_len - len(ellipsis)
-        if keep <= 0:
-            return ellipsis[:max_len]
-        left = keep // 2
-        right = keep - left
-        return f"{s[:left]}{ellipsis}{s[-right:]}"
+    # Calculate spacing and fixed widths for table width calculation
+    # Format: "#  Day  Date/Time  Artist  Title  Album"
+    # Total spacing: 2 + 2 + 2 + 2 + 2 = 10 spaces
+    spacing_between_cols = 2
+    total_spacing = 5 * spacing_between_cols  # 5 gaps between 6 columns
+    fixed_cols_width = w_num + w_day + w_date
 
-    # Collect track data and identify duplicates
-    track_entries = []
-    last_played = 0
-    p = 0
-    duplicate_entries = False
+    # Calculate available width for variable columns (artist, title, album)
+    available_width = term_width - fixed_cols_width - total_spacing
 
-    for previous, t, nxt in previous_and_next(reversed(recent_tracks)):
-        i = len(track_entries) + 1
-        if i == len(recent_tracks):
-            last_played = int(t.timestamp)
-
-        artist = str(t.track.artist) if t.track.artist else ""
-        title = str(t.track.title) if t.track.title else ""
-        album = str(t.album) if t.album else ""
-        timestamp = int(t.timestamp)
-        date_str = datetime.fromtimestamp(timestamp).strftime("%d %b %Y, %H:%M:%S")
-        day_str = calendar.day_abbr[datetime.fromtimestamp(timestamp).weekday()]
-
-        is_duplicate = False
-        if previous and previous.timestamp == t.timestamp:
-            p += 1
-            duplicate_entries = True
-            is_duplicate = True
-
-        track_entries.append({
-            'num': i,
-            'artist': artist,
-            'title': title,
-            'album': album,
-            'date': date_str,
-            'day': day_str,
-            'is_duplicate': is_duplicate
-        })
-
-        try:
-            if csv_file_name:
-                write_csv_entry(csv_file_name, datetime.fromtimestamp(timestamp), artist, title, album)
-        except Exception as e:
-            print(f"* Error: {e}")
-
-    # Calculate column widths based on terminal size
-    try:
-        term_width = shutil.get_terminal_size(fallback=(100, 24)).columns
-    except Exception:
-        term_width = 100
-
-    w_num = 4
-    w_day = 4
-    w_date = 24
-
-    # Find the maximum lengths needed for artist, title, and album
-    max_artist_len = 0
-    max_title_len = 0
-    max_album_len = 0
-    for entry in track_entries:
-        artist_len = len(str(entry['artist'])) if entry['artist'] else 0
-        title_len = len(str(entry['title'])) if entry['title'] else 0
-        album_len = len(str(entry['album'])) if entry['album'] else 0
-        if artist_len > max_artist_len:
-            max_artist_len = artist_len
-        if title_len > max_title_len:
-            max_title_len = title_len
-        if album_len > max_album_len:
-            max_album_len = album_len
-
-    # Calculate spacing and fixed widths for table width calculation
-    # Format: "#  Day  Date/Time  Artist  Title  Album"
-    # Total spacing: 2 + 2 + 2 + 2 + 2 = 10 spaces
-    spacing_between_cols = 2
-    total_spacing = 5 * spacing_between_cols  # 5 gaps between 6 columns
-    fixed_cols_width = w_num + w_day + w_date
-
-    # Calculate available width for variable columns (artist, title, album)
-    available_width = term_width - fixed_cols_width - total_spacing
-
-    # Allocate space: prioritize artist and title, but always ensure album is visible
-    # Ensure minimum widths
-    w_artist_min = 15
-    w_title_min = 15
-    w_album_min = 20  # Album must always be visible with at least this width
+    # Allocate space: prioritize artist and title, but always ensure album is visible
+    # Ensure minimum widths
+    w_artist_min = 15
+    w_title_min = 15
+    w_album_min = 20  # Album must always be visible with at least this width
 
     # Calculate ideal widths (what we'd like if we had unlimited space)
     ideal_artist = max(w_artist_min, max_artist_len)
@@ -1770,59 +2922,68 @@ def lastfm_list_tracks(username, user, network, number, csv_file_name):
                     # Ensure album is at minimum
                     w_album = w_album_min
 
-    # Print table header
-    if track_entries:
-        print()
-        hdr = (
-            f"{'#'.ljust(w_num)}  "
-            f"{'Day'.ljust(w_day)}  "
-            f"{'Date/Time'.ljust(w_date)}  "
-            f"{'Artist'.ljust(w_artist)}  "
-            f"{'Title'.ljust(w_title)}  "
-            f"{'Album'.ljust(w_album)}"
-        )
-        sep = (
-            f"{'-' * w_num}  "
-            f"{'-' * w_day}  "
-            f"{'-' * w_date}  "
-            f"{'-' * w_artist}  "
-            f"{'-' * w_title}  "
-            f"{'-' * w_album}"
-        )
-        print(hdr)
-        print(sep)
+    return (w_num, w_day, w_date, w_artist, w_title, w_album), total_row_width
 
-        # Print table rows
-        for entry in track_entries:
-            # For duplicates, reserve space for [DUP] prefix
-            dup_prefix_len = 6  # "[DUP] "
-            if entry['is_duplicate']:
-                artist_fmt = _shorten_middle(entry['artist'], w_artist - dup_prefix_len)
-                title_fmt = _shorten_middle(entry['title'], w_title - dup_prefix_len)
-                artist_fmt = f"[DUP] {artist_fmt}"
-                title_fmt = f"[DUP] {title_fmt}"
-            else:
-                artist_fmt = _shorten_middle(entry['artist'], w_artist)
-                title_fmt = _shorten_middle(entry['title'], w_title)
-            album_fmt = _shorten_middle(entry['album'], w_album)
-
-            row = (
-                f"{str(entry['num']).ljust(w_num)}  "
-                f"{entry['day'].ljust(w_day)}  "
-                f"{entry['date'].ljust(w_date)}  "
-                f"{artist_fmt.ljust(w_artist)}  "
-                f"{title_fmt.ljust(w_title)}  "
-                f"{album_fmt.ljust(w_album)}"
-            )
-            print(row)
 
+# Prints the header of the recent tracks table
+def lastfm_list_print_header(widths):
+    w_num, w_day, w_date, w_artist, w_title, w_album = widths
+    print()
+    hdr = (
+        f"{'#'.ljust(w_num)}  "
+        f"{'Day'.ljust(w_day)}  "
+        f"{'Date/Time'.ljust(w_date)}  "
+        f"{'Artist'.ljust(w_artist)}  "
+        f"{'Title'.ljust(w_title)}  "
+        f"{'Album'.ljust(w_album)}"
+    )
+    sep = (
+        f"{'-' * w_num}  "
+        f"{'-' * w_day}  "
+        f"{'-' * w_date}  "
+        f"{'-' * w_artist}  "
+        f"{'-' * w_title}  "
+        f"{'-' * w_album}"
+    )
+    print(hdr)
+    print(sep)
+
+
+# Returns the row of the recent tracks table for the entry
+def lastfm_list_format_row(entry, widths):
+    w_num, w_day, w_date, w_artist, w_title, w_album = widths
+    # For duplicates, reserve space for [DUP] prefix
+    dup_prefix_len = 6  # "[DUP] "
+    if entry['is_duplicate']:
+        artist_fmt = shorten_middle(entry['artist'], w_artist - dup_prefix_len)
+        title_fmt = shorten_middle(entry['title'], w_title - dup_prefix_len)
+        artist_fmt = f"[DUP] {artist_fmt}"
+        title_fmt = f"[DUP] {title_fmt}"
+    else:
+        artist_fmt = shorten_middle(entry['artist'], w_artist)
+        title_fmt = shorten_middle(entry['title'], w_title)
+    album_fmt = shorten_middle(entry['album'], w_album)
+
+    row = (
+        f"{str(entry['num']).ljust(w_num)}  "
+        f"{entry['day'].ljust(w_day)}  "
+        f"{entry['date'].ljust(w_date)}  "
+        f"{artist_fmt.ljust(w_artist)}  "
+        f"{title_fmt.ljust(w_title)}  "
+        f"{album_fmt.ljust(w_album)}"
+    )
+    return row
+
+
+# Prints the summary below the recent tracks table: last activity, duplicate entries (possible private mode) and the current track
+def lastfm_list_print_summary(total_row_width, last_played, new_track, duplicates):
     # Use the calculated table width for the horizontal line
     print("─" * total_row_width)
     if last_played > 0 and not new_track:
         print(f"*** User played last time {calculate_timespan(int(time.time()), last_played, show_seconds=True)} ago! ({get_date_from_ts(last_played)})")
 
-    if duplicate_entries:
-        print(f"*** Duplicate entries ({p}) found, possible PRIVATE MODE")
+    if duplicates:
+        print(f"*** Duplicate entries ({duplicates}) found, possible PRIVATE MODE")
 
     if new_track:
         artist = str(new_track.artist)
@@ -1834,10 +2995,508 @@ def lastfm_list_tracks(username, user, network, number, csv_file_name):
             print(f"Album:\t\t{album}")
 
 
+# Displays the list of recently played Last.fm tracks
+def lastfm_list_tracks(username, user, network, number, csv_file_name):
+
+    list_operation = "* Listing & saving" if csv_file_name else "* Listing"
+
+    print(f"{list_operation} {number} tracks recently listened by {username} ...\n")
+
+    try:
+        recent_tracks, new_track = lastfm_get_recent_tracks_and_now_playing(username, user, network, number)
+    except Exception as e:
+        print(f"* Error: Cannot display recent tracks for the user: {e}")
+        sys.exit(1)
+
+    try:
+        if csv_file_name:
+            init_csv_file(csv_file_name)
+    except Exception as e:
+        print(f"* Error: {e}")
+
+    # Collect track data and identify duplicates
+    track_entries = []
+    last_played = 0
+    p = 0
+    duplicate_entries = False
+
+    for previous, t, nxt in previous_and_next(reversed(recent_tracks)):
+        i = len(track_entries) + 1
+        if i == len(recent_tracks):
+            last_played = int(t.timestamp)
+
+        artist = str(t.track.artist) if t.track.artist else ""
+        title = str(t.track.title) if t.track.title else ""
+        album = str(t.album) if t.album else ""
+        timestamp = int(t.timestamp)
+        date_str = datetime.fromtimestamp(timestamp).strftime("%d %b %Y, %H:%M:%S")
+        day_str = calendar.day_abbr[datetime.fromtimestamp(timestamp).weekday()]
+
+        is_duplicate = False
+        if previous and previous.timestamp == t.timestamp:
+            p += 1
+            duplicate_entries = True
+            is_duplicate = True
+
+        track_entries.append({
+            'num': i,
+            'artist': artist,
+            'title': title,
+            'album': album,
+            'date': date_str,
+            'day': day_str,
+            'is_duplicate': is_duplicate
+        })
+
+        try:
+            if csv_file_name:
+                write_csv_entry(csv_file_name, datetime.fromtimestamp(timestamp), artist, title, album)
+        except Exception as e:
+            print(f"* Error: {e}")
+
+    # Find the maximum lengths needed for artist, title, and album
+    max_artist_len = 0
+    max_title_len = 0
+    max_album_len = 0
+    for entry in track_entries:
+        artist_len = len(str(entry['artist'])) if entry['artist'] else 0
+        title_len = len(str(entry['title'])) if entry['title'] else 0
+        album_len = len(str(entry['album'])) if entry['album'] else 0
+        if artist_len > max_artist_len:
+            max_artist_len = artist_len
+        if title_len > max_title_len:
+            max_title_len = title_len
+        if album_len > max_album_len:
+            max_album_len = album_len
+
+    widths, total_row_width = lastfm_list_column_widths(max_artist_len, max_title_len, max_album_len)
+
+    if track_entries:
+        lastfm_list_print_header(widths)
+
+        # Print table rows
+        for entry in track_entries:
+            print(lastfm_list_format_row(entry, widths))
+
+    lastfm_list_print_summary(total_row_width, last_played, new_track, p if duplicate_entries else 0)
+
+
+# Displays the list of recently played Last.fm tracks while they are being fetched (-l with --stream), newest first
+# Rows are printed and saved to the CSV file page by page with column widths sampled from the first page, so the output
+# starts after a single request and memory use does not grow with the number of listed tracks
+def lastfm_list_tracks_stream(username, user, network, number, csv_file_name):
+
+    list_operation = "* Listing & saving" if csv_file_name else "* Listing"
+
+    print(f"{list_operation} {number} tracks recently listened by {username} (newest first) ...\n")
+
+    to_ts = int(time.time())
+    now_playing_future = get_startup_executor().submit(lastfm_get_now_playing, username, user, network)
+    recent_tracks = lastfm_stream_recent_tracks(username, network, number, to_ts)
+
+    csv_file = None
+    csvwriter = None
+    try:
+        if csv_file_name:
+            init_csv_file(csv_file_name)
+            # CSV rows go through a single open writer, other export formats are buffered by write_csv_entry() itself
+            if export_format(csv_file_name) == "csv":
+                csv_file = open(csv_file_name, 'a', newline='', encoding="utf-8")
+                csvwriter = csv.DictWriter(csv_file, fieldnames=csvfieldnames, quoting=csv.QUOTE_NONNUMERIC)
+    except Exception as e:
+        print(f"* Error: {e}")
+        csv_file_name = None
+
+    try:
+        sample = list(islice(recent_tracks, LastfmJsonClient.PAGE_LIMIT))
+
+        # Column widths are based on the first page, longer values in later pages are shortened in the middle
+        max_artist_len = max((len(str(t.track.artist)) for t in sample if t.track.artist), default=0)
+        max_title_len = max((len(str(t.track.title)) for t in sample if t.track.title), default=0)
+        max_album_len = max((len(str(t.album)) for t in sample if t.album), default=0)
+        widths, total_row_width = lastfm_list_column_widths(max_artist_len, max_title_len, max_album_len)
+
+        if sample:
+            lastfm_list_print_header(widths)
+
+        num = 0
+        p = 0
+        last_played = 0
+        for _, t, older in previous_and_next(chain(sample, recent_tracks)):
+            num += 1
+            timestamp = int(t.timestamp)
+            if num == 1:
+                last_played = timestamp
+
+            artist = str(t.track.artist) if t.track.artist else ""
+            title = str(t.track.title) if t.track.title else ""
+            album = str(t.album) if t.album else ""
+            played_at = datetime.fromtimestamp(timestamp)
+
+            # Rows come newest first, so the newer entry of the same timestamp pair is marked like in the regular listing
+            is_duplicate = older is not None and older.timestamp == t.timestamp
+            if is_duplicate:
+                p += 1
+
+            print(lastfm_list_format_row({
+                'num': num,
+                'artist': artist,
+                'title': title,
+                'album': album,
+                'date': played_at.strftime("%d %b %Y, %H:%M:%S"),
+                'day': calendar.day_abbr[played_at.weekday()],
+                'is_duplicate': is_duplicate
+            }, widths))
+
+            if csv_file_name:
+                try:
+                    if csvwriter:
+                        csvwriter.writerow({'Date': played_at, 'Artist': artist, 'Track': title, 'Album': album})
+                    else:
+                        write_csv_entry(csv_file_name, played_at, artist, title, album)
+                except Exception as e:
+                    print(f"* Error: {e}")
+                    csv_file_name = None
+
+            if num % LastfmJsonClient.PAGE_LIMIT == 0:
+                sys.stdout.flush()
+    except Exception as e:
+        print(f"* Error: Cannot display recent tracks for the user: {e}")
+        sys.exit(1)
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    try:
+        new_track = now_playing_future.result()
+    except Exception as e:
+        debug_print(f"Cannot get the currently playing track: {e}")
+        new_track = None
+
+    lastfm_list_print_summary(total_row_width, last_played, new_track, p)
+
+
+# Shared cache daemon (--cache-daemon) keeping lookup results (track durations, Spotify track IDs, Spotify access tokens)
+# for all monitor processes on the host; the protocol is one JSON request and one JSON response per line over a Unix socket
+class SharedCacheDaemon:
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or SHARED_CACHE_MAX_ENTRIES
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.claims = {}
+        self.stats = {"hits": 0, "misses": 0, "sets": 0, "pending": 0, "refreshed": 0}
+        self.last_request_ts = 0
+
+    # Handles a single request: get (optionally claiming the lookup of a missing key), set, release or stats
+    def handle(self, request):
+        op = request.get("op")
+        key = request.get("key")
+        now = time.time()
+        if op != "stats":
+            self.last_request_ts = now
+        with self.lock:
+            if op == "get":
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return {"value": entry[0]}
+                if entry is not None:
+                    del self.entries[key]
+                if not request.get("claim"):
+                    self.stats["misses"] += 1
+                    return {"value": None}
+                # Only the first process missing the key does the lookup, the others wait for its result
+                claim_until = self.claims.get(key, 0)
+                if claim_until > now:
+                    self.stats["pending"] += 1
+                    return {"value": None, "pending": claim_until - now}
+                self.claims[key] = now + request.get("lease", 30)
+                self.stats["misses"] += 1
+                return {"value": None, "claimed": True}
+            if op == "set":
+                self.entries[key] = (request.get("value"), now + request.get("ttl", SHARED_CACHE_TTL), now)
+                self.entries.move_to_end(key)
+                self.claims.pop(key, None)
+                self.stats["sets"] += 1
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                return {"ok": True}
+            if op == "release":
+                self.claims.pop(key, None)
+                return {"ok": True}
+            if op == "stats":
+                return dict(self.stats, entries=len(self.entries))
+        return {"error": f"unknown op: {op}"}
+
+    # Returns up to limit (key, value) track lookups with a Spotify track ID, stored or refreshed before stale_ts
+    def stale_track_info(self, stale_ts, limit):
+        stale = []
+        now = time.time()
+        with self.lock:
+            for key, (value, expires_ts, stored_ts) in self.entries.items():
+                if stored_ts < stale_ts and expires_ts > now and key.startswith("track_info:") and isinstance(value, list) and len(value) == 3 and value[1]:
+                    stale.append((key, value))
+                    if len(stale) >= limit:
+                        break
+        return stale
+
+    # Applies the current Spotify track (or None if it is not available anymore) to the track lookup of the key, returns True if applied
+    def refresh_track_info(self, key, value, sp_track):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            # The entry was updated or evicted in the meantime
+            if entry is None or entry[0] != value:
+                return False
+            if not sp_track or not sp_track.get("id"):
+                # Removed from Spotify, the next lookup searches for it again
+                del self.entries[key]
+            else:
+                track_duration, sp_track_uri_id, duration_mark = value
+                # The first flag of the key is USE_TRACK_DURATION_FROM_SPOTIFY, otherwise the duration comes from Last.fm
+                if key.split(":", 2)[1][:1] == "1" and sp_track.get("duration_ms"):
+                    track_duration = int(sp_track["duration_ms"] / 1000)
+                # Relinked tracks are returned with their current ID
+                self.entries[key] = ([track_duration, sp_track["id"], duration_mark], now + SHARED_CACHE_TTL, now)
+            self.stats["refreshed"] += 1
+            return True
+
+
+# Re-validates Spotify track IDs and durations of track lookups kept by the shared cache daemon, in batches of up to
+# SPOTIFY_TRACKS_BATCH_SIZE tracks per request; runs only while the daemon is idle and never uses more than half of SPOTIFY_RATE_LIMIT
+def shared_cache_refresher(daemon):
+    limiter = get_spotify_rate_limiter()
+    while True:
+        time.sleep(SHARED_CACHE_REFRESH_CHECK_INTERVAL)
+        while time.time() - daemon.last_request_ts >= SHARED_CACHE_REFRESH_IDLE:
+            batch = daemon.stale_track_info(time.time() - SHARED_CACHE_REFRESH_AGE, SPOTIFY_TRACKS_BATCH_SIZE)
+            if not batch:
+                break
+            if limiter and not limiter.try_acquire(reserve=limiter.capacity / 2):
+                break
+            try:
+                access_token = spotify_get_access_token(SP_CLIENT_ID, SP_CLIENT_SECRET)
+                if not access_token:
+                    break
+                ids = list(dict.fromkeys(value[1] for _, value in batch))
+                response = req.get(f"{SPOTIFY_API_URL}/v1/tracks?ids={','.join(ids)}", headers={"Authorization": "Bearer " + access_token}, timeout=FUNCTION_TIMEOUT)
+                response.raise_for_status()
+                tracks = dict(zip(ids, response.json().get("tracks", [])))
+            except Exception as e:
+                print(f"* Error: Refresh of shared cache entries failed: {e}")
+                print_cur_ts("Timestamp:\t\t\t")
+                break
+
+            # Stop if nothing could be refreshed, so the same entries are not requested again and again
+            if not sum(daemon.refresh_track_info(key, value, tracks[value[1]]) for key, value in batch if value[1] in tracks):
+                break
+
+
+# Runs the shared cache daemon on the Unix socket until interrupted
+def run_cache_daemon(socket_path):
+    global SHARED_CACHE
+    import socketserver
+
+    # Spotify requests of the daemon itself (shared cache refresh) do not go through the shared cache
+    SHARED_CACHE = False
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("* Error: Shared cache daemon requires Unix sockets, which are not available on this platform")
+        sys.exit(1)
+
+    daemon = SharedCacheDaemon()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    response = daemon.handle(json.loads(line))
+                except Exception as e:
+                    response = {"error": str(e)}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(socket_path):
+        # Refuse to take over the socket of a running daemon, remove a stale one
+        try:
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            probe.connect(socket_path)
+            probe.close()
+            print(f"* Error: Shared cache daemon is already running on {socket_path}")
+            sys.exit(1)
+        except OSError:
+            os.unlink(socket_path)
+
+    # The cache holds Spotify access tokens, so the socket is accessible to the owner only
+    old_umask = os.umask(0o177)
+    try:
+        server = Server(socket_path, Handler)
+    finally:
+        os.umask(old_umask)
+
+    print(f"Shared cache daemon listening on {socket_path} (max entries: {SHARED_CACHE_MAX_ENTRIES}, TTL: {display_time(SHARED_CACHE_TTL)})")
+    print("─" * HORIZONTAL_LINE)
+
+    thread = threading.Thread(target=server.serve_forever, name="shared_cache_daemon", daemon=True)
+    thread.start()
+
+    if SHARED_CACHE_REFRESH_AGE > 0:
+        if SP_CLIENT_ID and SP_CLIENT_SECRET and SP_CLIENT_ID != "your_spotify_app_client_id" and SP_CLIENT_SECRET != "your_spotify_app_client_secret":
+            threading.Thread(target=shared_cache_refresher, args=(daemon,), name="shared_cache_refresher", daemon=True).start()
+        else:
+            print("* Spotify credentials (SP_CLIENT_ID, SP_CLIENT_SECRET) not set, cached Spotify track IDs and durations will not be refreshed")
+    try:
+        while True:
+            time.sleep(3600)
+            stats = daemon.handle({"op": "stats"})
+            print(f"* Shared cache: {stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses, {stats['pending']} waits for lookups in progress, {stats['refreshed']} refreshed")
+            print_cur_ts("Timestamp:\t\t\t")
+    finally:
+        server.shutdown()
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+
+# Client of the shared cache daemon; every thread keeps its own connection
+# All errors are swallowed (the monitor falls back to its own lookups) and reconnects are throttled while the daemon is down
+class SharedCache:
+    RECONNECT_INTERVAL = 30
+
+    def __init__(self, socket_path, timeout=2):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.local = threading.local()
+        self.down_until = 0
+
+    def _request(self, request):
+        if time.time() < self.down_until:
+            return None
+        conn = getattr(self.local, "conn", None)
+        try:
+            if conn is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                conn = (sock, sock.makefile("rb"))
+                self.local.conn = conn
+            conn[0].sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            line = conn[1].readline()
+            if not line:
+                raise ConnectionError("connection closed by shared cache daemon")
+            return json.loads(line)
+        except (OSError, ValueError, ConnectionError) as e:
+            debug_print(f"Shared cache not available: {e}")
+            if conn is not None:
+                try:
+                    conn[0].close()
+                except OSError:
+                    pass
+            self.local.conn = None
+            self.down_until = time.time() + self.RECONNECT_INTERVAL
+            return None
+
+    def get(self, key):
+        response = self._request({"op": "get", "key": key})
+        return response.get("value") if response else None
+
+    def set(self, key, value, ttl=None):
+        self._request({"op": "set", "key": key, "value": value, "ttl": ttl or SHARED_CACHE_TTL})
+
+    def release(self, key):
+        self._request({"op": "release", "key": key})
+
+    # Returns cached value, or None if the caller should do the lookup itself and store the result with set() or release()
+    # If another process is already looking the key up, waits up to lease seconds for its result
+    def get_or_claim(self, key, lease=30):
+        deadline = time.time() + lease
+        while True:
+            response = self._request({"op": "get", "key": key, "claim": True, "lease": lease})
+            if not response or response.get("value") is not None or not response.get("pending"):
+                return response.get("value") if response else None
+            if time.time() >= deadline:
+                return None
+            time.sleep(min(0.2, response["pending"]))
+
+
+# Shared cache client created on first use if SHARED_CACHE_SOCKET is set
+SHARED_CACHE = None
+
+
+def get_shared_cache():
+    global SHARED_CACHE
+    if SHARED_CACHE is None and SHARED_CACHE_SOCKET and hasattr(socket, "AF_UNIX"):
+        SHARED_CACHE = SharedCache(os.path.expanduser(SHARED_CACHE_SOCKET))
+    return SHARED_CACHE
+
+
+# Token bucket rate limiter: rate tokens per minute, at most capacity of them saved up for bursts
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate / 60
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated_ts = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_ts) * self.rate)
+        self.updated_ts = now
+
+    # Takes a token without waiting if more than reserve tokens are left, so low priority callers leave the reserve to others
+    def try_acquire(self, reserve=0):
+        with self.lock:
+            self._refill()
+            if self.tokens - 1 >= reserve:
+                self.tokens -= 1
+                return True
+            return False
+
+    # Takes a token, waiting for it if needed
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Rate limiter shared by all Spotify Web API requests of the process, created on first use if SPOTIFY_RATE_LIMIT is set
+SPOTIFY_RATE_LIMITER = None
+SPOTIFY_RATE_LIMITER_LOCK = threading.Lock()
+
+
+def get_spotify_rate_limiter():
+    global SPOTIFY_RATE_LIMITER
+    if SPOTIFY_RATE_LIMIT <= 0:
+        return None
+    with SPOTIFY_RATE_LIMITER_LOCK:
+        if SPOTIFY_RATE_LIMITER is None:
+            SPOTIFY_RATE_LIMITER = TokenBucket(SPOTIFY_RATE_LIMIT)
+        return SPOTIFY_RATE_LIMITER
+
+
+# Sends GET request to the Spotify Web API, waiting for the rate limiter first
+def spotify_api_get(url, headers):
+    limiter = get_spotify_rate_limiter()
+    if limiter:
+        limiter.acquire()
+    return req.get(url, headers=headers, timeout=FUNCTION_TIMEOUT)
+
+
 # Sends a lightweight request to check token validity since Spotipy deprecates as_dict=True and there is no
 # get_cached_token() method implemented yet for Client Credentials OAuth Flow
 def check_token_validity(token):
-    url = "https://api.spotify.com/v1/browse/categories?limit=1&fields=categories.items(id)"
+    url = f"{SPOTIFY_API_URL}/v1/browse/categories?limit=1&fields=categories.items(id)"
     pylast_version = getattr(pylast, '__version__', 'unknown')
     headers = {"Authorization": f"Bearer {token}", "User-Agent": f"pylast/{pylast_version}"}
 
@@ -1862,16 +3521,31 @@ def spotify_get_access_token(sp_client_id, sp_client_secret):
         debug_print("Using cached Spotify access token")
         return SP_CACHED_ACCESS_TOKEN
 
+    # Token obtained by another monitor process on this host
+    shared_cache = get_shared_cache()
+    shared_key = f"spotify_token:{sp_client_id}"
+    if shared_cache:
+        token = shared_cache.get(shared_key)
+        if token and token != SP_CACHED_ACCESS_TOKEN and check_token_validity(token):
+            debug_print("Using Spotify access token from shared cache")
+            SP_CACHED_ACCESS_TOKEN = token
+            return SP_CACHED_ACCESS_TOKEN
+
     if SP_TOKENS_FILE:
         cache_handler = CacheFileHandler(cache_path=SP_TOKENS_FILE)
     else:
         cache_handler = MemoryCacheHandler()
 
     auth_manager = SpotifyClientCredentials(client_id=sp_client_id, client_secret=sp_client_secret, cache_handler=cache_handler)
+    auth_manager.OAUTH_TOKEN_URL = f"{SPOTIFY_ACCOUNTS_URL}/api/token"
 
     SP_CACHED_ACCESS_TOKEN = auth_manager.get_access_token(as_dict=False)
     debug_print("Successfully obtained new Spotify access token")
 
+    # Client credentials tokens are valid for 1 hour
+    if shared_cache and SP_CACHED_ACCESS_TOKEN:
+        shared_cache.set(shared_key, SP_CACHED_ACCESS_TOKEN, 3000)
+
     return SP_CACHED_ACCESS_TOKEN
 
 
@@ -1901,7 +3575,10 @@ def spotify_convert_uri_to_url(uri):
     return url
 
 
-# Processes track items returned by Spotify search Web API
+# Processes track items returned by Spotify search Web API and returns ID, duration & album ID of the best matching one
+# Items are scored by fuzzy similarity of normalized names: the artist has to match one of the item's artists, the track score
+# is the similarity of the names or (weighted by SPOTIFY_MATCH_CLEANED_WEIGHT) of the names with remaster, remix etc. suffixes removed,
+# results from the same album get SPOTIFY_MATCH_ALBUM_BONUS
 def spotify_search_process_track_items(track_items, original_artist, original_track, cleaned_track=None, original_album=None):
     sp_track_uri_id = None
     sp_track_duration = 0
@@ -1909,6 +3586,10 @@ def spotify_search_process_track_items(track_items, original_artist, original_tr
     best_item = None
     best_score = -1
 
+    original_artist_n, original_track_n, original_album_n = normalize(original_artist, original_track, original_album)
+    original_cleaned_n = normalize_text(cleaned_track or clean_title(original_track))
+    max_score = 100 + (SPOTIFY_MATCH_ALBUM_BONUS if original_album_n else 0)
+
     for item in track_items:
         item_name = str(item.get("name"))
         item_artists_list = [a.get("name") for a in item.get("artists", [])]
@@ -1918,37 +3599,111 @@ def spotify_search_process_track_items(track_items, original_artist, original_tr
 
         debug_print(f"  Found item: {item_artists_str} - {item_name} [{item_album_name}] ({item_duration}s)")
 
-        # Artist match check
-        artist_match = any(original_artist.lower() in a.lower() for a in item_artists_list)
+        # Artist match check, the Last.fm artist may also be a part of the Spotify one (e.g. 'Nick Cave' vs 'Nick Cave & The Bad Seeds')
+        artist_match = False
+        for a in item_artists_list:
+            a_n = normalize_text(a)
+            if original_artist_n in a_n or similarity(original_artist_n, a_n, SPOTIFY_MATCH_ARTIST_MIN_SCORE):
+                artist_match = True
+                break
         if not artist_match:
             debug_print("    Skipping item (artist mismatch)")
             continue
 
-        score = 0
-        if item_name.lower() == original_track.lower():
-            score = 100  # Perfect match with original name
-        elif cleaned_track and item_name.lower() == cleaned_track.lower():
-            score = 80   # Match with cleaned name
-        elif original_track.lower() in item_name.lower() or item_name.lower() in original_track.lower():
-            score = 50   # Partial match
+        item_name_n = normalize_text(item_name)
+        score = similarity(original_track_n, item_name_n)
+        if score < 100:
+            item_cleaned_n = normalize_text(clean_title(item_name))
+            # In short titles a single character makes a different song ('One' vs 'Once'), so only exact (cleaned) names match
+            if min(len(original_cleaned_n), len(item_cleaned_n)) < SPOTIFY_MATCH_SHORT_TITLE_LENGTH:
+                score = 100 * SPOTIFY_MATCH_CLEANED_WEIGHT if item_cleaned_n == original_cleaned_n else 0
+            else:
+                score = max(score, similarity(original_cleaned_n, item_cleaned_n) * SPOTIFY_MATCH_CLEANED_WEIGHT)
+        if score < SPOTIFY_MATCH_MIN_SCORE:
+            debug_print(f"    Skipping item (track name mismatch, score={score:.0f})")
+            continue
 
-        # Album match bonus (+20 points)
-        if original_album and item_album_name and item_album_name.lower() == original_album.lower():
-            score += 20
-            debug_print(f"    Album match! (+20 bonus)")
+        # Album match bonus
+        if original_album_n and item_album_name and similarity(original_album_n, normalize_text(item_album_name), SPOTIFY_MATCH_ALBUM_MIN_SCORE):
+            score += SPOTIFY_MATCH_ALBUM_BONUS
+            debug_print(f"    Album match! (+{SPOTIFY_MATCH_ALBUM_BONUS} bonus)")
 
         if score > best_score:
             best_score = score
             best_item = item
-            debug_print(f"    => New best match! (score={score})")
+            debug_print(f"    => New best match! (score={score:.0f})")
+            if score >= max_score:
+                break
         else:
-            debug_print(f"    => Match not better than current best (score={score})")
+            debug_print(f"    => Match not better than current best (score={score:.0f})")
 
-    if best_item and best_score > 0:
+    sp_album_id = None
+    if best_item:
         sp_track_uri_id = best_item.get("id")
         sp_track_duration = int(best_item.get("duration_ms") / 1000)
+        sp_album_id = best_item.get("album", {}).get("id")
 
-    return sp_track_uri_id, sp_track_duration
+    return sp_track_uri_id, sp_track_duration, sp_album_id
+
+
+# Tracklists of Spotify albums prefetched when a track of the album is matched (see SPOTIFY_ALBUM_PREFETCH), keyed by normalized Last.fm artist and album
+# Next tracks of the same album are matched against the tracklist without any search requests
+SPOTIFY_ALBUM_TRACKS = OrderedDict()
+SPOTIFY_ALBUM_PREFETCHING = set()
+SPOTIFY_ALBUM_LOCK = threading.Lock()
+
+
+# Returns the prefetched Spotify tracklist of the Last.fm artist's album or None
+def spotify_get_prefetched_album(artist, album):
+    key = normalize(artist, "", album)
+    with SPOTIFY_ALBUM_LOCK:
+        items = SPOTIFY_ALBUM_TRACKS.get(key)
+        if items is not None:
+            SPOTIFY_ALBUM_TRACKS.move_to_end(key)
+        return items
+
+
+# Fetches the full tracklist (IDs and durations) of the Spotify album and stores it for the Last.fm artist and album
+def spotify_fetch_album_tracks(access_token, album_id, artist, album):
+    key = normalize(artist, "", album)
+    headers = {"Authorization": "Bearer " + access_token}
+    items = []
+    url = f"{SPOTIFY_API_URL}/v1/albums/{quote(album_id)}/tracks?limit=50"
+    try:
+        while url:
+            response = spotify_api_get(url, headers)
+            response.raise_for_status()
+            json_response = response.json()
+            for item in json_response.get("items", []):
+                if item.get("id") and item.get("duration_ms"):
+                    # Album tracks come without the album, it is added so the album bonus applies when matching
+                    items.append(dict(item, album={"id": album_id, "name": album}))
+            url = json_response.get("next")
+            # Tracks are paged relative to the real API, follow the pages via SPOTIFY_API_URL (e.g. the replay tool)
+            if url and not url.startswith(SPOTIFY_API_URL):
+                url = SPOTIFY_API_URL + urlparse(url)._replace(scheme="", netloc="").geturl()
+        debug_print(f"Prefetched {len(items)} tracks of Spotify album '{album}' ({album_id})")
+        if items:
+            with SPOTIFY_ALBUM_LOCK:
+                SPOTIFY_ALBUM_TRACKS[key] = items
+                SPOTIFY_ALBUM_TRACKS.move_to_end(key)
+                while len(SPOTIFY_ALBUM_TRACKS) > SPOTIFY_ALBUM_CACHE_SIZE:
+                    SPOTIFY_ALBUM_TRACKS.popitem(last=False)
+    except Exception as e:
+        debug_print(f"Spotify album prefetch error: {e}")
+    finally:
+        with SPOTIFY_ALBUM_LOCK:
+            SPOTIFY_ALBUM_PREFETCHING.discard(key)
+
+
+# Starts the background prefetch of the album's tracklist, unless it is already prefetched or in progress
+def spotify_prefetch_album(access_token, album_id, artist, album):
+    key = normalize(artist, "", album)
+    with SPOTIFY_ALBUM_LOCK:
+        if key in SPOTIFY_ALBUM_TRACKS or key in SPOTIFY_ALBUM_PREFETCHING:
+            return
+        SPOTIFY_ALBUM_PREFETCHING.add(key)
+    get_enrichment_executor(batch=True).submit(spotify_fetch_album_tracks, access_token, album_id, artist, album)
 
 
 # Returns Spotify track ID & duration for specific artist, track and optionally album
@@ -1956,16 +3711,15 @@ def spotify_search_song_trackid_duration(access_token, artist, track, album=""):
     artist, track = map(str, (artist, track))
     album = str(album) if album else ""
 
-    re_chars_to_remove = r'([\"\'])'
-    artist_sanitized = re.sub(re_chars_to_remove, '', artist, flags=re.IGNORECASE)
-    track_sanitized = re.sub(re_chars_to_remove, '', track, flags=re.IGNORECASE)
-    album_sanitized = re.sub(re_chars_to_remove, '', album, flags=re.IGNORECASE)
+    artist_sanitized = strip_quotes(artist)
+    track_sanitized = strip_quotes(track)
+    album_sanitized = strip_quotes(album)
 
     debug_print(f"Checking Spotify for track duration. Strategy: URL_SPECIFIC_FULL -> URL_SPECIFIC_FIELD -> URL_SPECIFIC_PHRASE -> URL_CLEANED_FIELD -> URL_BROAD")
 
-    url_specific_full = f'https://api.spotify.com/v1/search?q={quote(f"artist:\"{artist_sanitized}\" track:\"{track_sanitized}\" album:\"{album_sanitized}\"")}&type=track&limit=5'
-    url_specific_field = f'https://api.spotify.com/v1/search?q={quote(f"artist:\"{artist_sanitized}\" track:\"{track_sanitized}\"")}&type=track&limit=5'
-    url_specific_phrase = f'https://api.spotify.com/v1/search?q={quote(f"\"{artist_sanitized}\" \"{track_sanitized}\"")}&type=track&limit=5'
+    url_specific_full = f'{SPOTIFY_API_URL}/v1/search?q={quote(f"artist:\"{artist_sanitized}\" track:\"{track_sanitized}\" album:\"{album_sanitized}\"")}&type=track&limit={SPOTIFY_SEARCH_LIMIT}'
+    url_specific_field = f'{SPOTIFY_API_URL}/v1/search?q={quote(f"artist:\"{artist_sanitized}\" track:\"{track_sanitized}\"")}&type=track&limit={SPOTIFY_SEARCH_LIMIT}'
+    url_specific_phrase = f'{SPOTIFY_API_URL}/v1/search?q={quote(f"\"{artist_sanitized}\" \"{track_sanitized}\"")}&type=track&limit={SPOTIFY_SEARCH_LIMIT}'
 
     debug_print(f"Spotify search URL_SPECIFIC_FULL: {url_specific_full}")
     debug_print(f"Spotify search URL_SPECIFIC_FIELD: {url_specific_field}")
@@ -1978,17 +3732,33 @@ def spotify_search_song_trackid_duration(access_token, artist, track, album=""):
 
     sp_track_uri_id = None
     sp_track_duration = 0
+    sp_album_id = None
+
+    # Next tracks of an album whose tracklist was prefetched are matched without search requests
+    # Only tracks with the same (or same cleaned) title are accepted, as fuzzy matching would pick a sibling track
+    # (e.g. 'Song 3' for 'Song 2') when the played one is not on the Spotify album; otherwise the search below is used
+    if album and SPOTIFY_ALBUM_PREFETCH:
+        album_items = spotify_get_prefetched_album(artist, album)
+        if album_items:
+            track_n = normalize_text(track)
+            cleaned_n = normalize_text(clean_title(track))
+            album_items = [item for item in album_items if normalize_text(str(item.get("name"))) == track_n or normalize_text(clean_title(str(item.get("name")))) == cleaned_n]
+        if album_items:
+            sp_track_uri_id, sp_track_duration, sp_album_id = spotify_search_process_track_items(album_items, artist, track, original_album=album)
+            if sp_track_uri_id:
+                debug_print(f"Match found in prefetched album tracklist")
+                return sp_track_uri_id, sp_track_duration
 
     if album:
         try:
-            response = req.get(url_specific_full, headers=headers, timeout=FUNCTION_TIMEOUT)
+            response = spotify_api_get(url_specific_full, headers)
             response.raise_for_status()
             json_response = response.json()
             if json_response.get("tracks"):
                 total = json_response["tracks"].get("total", 0)
                 debug_print(f"URL_SPECIFIC_FULL found {total} tracks")
                 if total > 0:
-                    sp_track_uri_id, sp_track_duration = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, original_album=album)
+                    sp_track_uri_id, sp_track_duration, sp_album_id = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, original_album=album)
                     if sp_track_uri_id:
                         debug_print(f"Match found via URL_SPECIFIC_FULL")
         except Exception:
@@ -1996,14 +3766,14 @@ def spotify_search_song_trackid_duration(access_token, artist, track, album=""):
 
     if not sp_track_uri_id:
         try:
-            response = req.get(url_specific_field, headers=headers, timeout=FUNCTION_TIMEOUT)
+            response = spotify_api_get(url_specific_field, headers)
             response.raise_for_status()
             json_response = response.json()
             if json_response.get("tracks"):
                 total = json_response["tracks"].get("total", 0)
                 debug_print(f"URL_SPECIFIC_FIELD found {total} tracks")
                 if total > 0:
-                    sp_track_uri_id, sp_track_duration = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, original_album=album)
+                    sp_track_uri_id, sp_track_duration, sp_album_id = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, original_album=album)
                     if sp_track_uri_id:
                         debug_print(f"Match found via URL_SPECIFIC_FIELD")
         except Exception:
@@ -2011,14 +3781,14 @@ def spotify_search_song_trackid_duration(access_token, artist, track, album=""):
 
     if not sp_track_uri_id:
         try:
-            response = req.get(url_specific_phrase, headers=headers, timeout=FUNCTION_TIMEOUT)
+            response = spotify_api_get(url_specific_phrase, headers)
             response.raise_for_status()
             json_response = response.json()
             if json_response.get("tracks"):
                 total = json_response["tracks"].get("total", 0)
                 debug_print(f"URL_SPECIFIC_PHRASE found {total} tracks")
                 if total > 0:
-                    sp_track_uri_id, sp_track_duration = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, original_album=album)
+                    sp_track_uri_id, sp_track_duration, sp_album_id = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, original_album=album)
                     if sp_track_uri_id:
                         debug_print(f"Match found via URL_SPECIFIC_PHRASE")
         except Exception:
@@ -2026,22 +3796,21 @@ def spotify_search_song_trackid_duration(access_token, artist, track, album=""):
 
     # If still not found, try a broader search by cleaning the track name
     track_cleaned = ""
-    if not sp_track_uri_id and re.search(re_search_str, track, re.IGNORECASE):
-        track_cleaned = re.sub(re_replace_str, '', track, flags=re.IGNORECASE).strip()
+    if not sp_track_uri_id and re_search_pattern.search(track):
         # Sanitize track_cleaned to remove quotes that might break the search query
-        track_cleaned = re.sub(re_chars_to_remove, '', track_cleaned, flags=re.IGNORECASE)
-        if track_cleaned and track_cleaned.lower() != track.lower():
-            url_cleaned_field = f'https://api.spotify.com/v1/search?q={quote(f"artist:\"{artist_sanitized}\" track:\"{track_cleaned}\"")}&type=track&limit=5'
+        track_cleaned = strip_quotes(clean_title(track))
+        if track_cleaned and normalize_text(track_cleaned) != normalize_text(track):
+            url_cleaned_field = f'{SPOTIFY_API_URL}/v1/search?q={quote(f"artist:\"{artist_sanitized}\" track:\"{track_cleaned}\"")}&type=track&limit={SPOTIFY_SEARCH_LIMIT}'
             debug_print(f"Spotify search URL_CLEANED_FIELD (fallback): {url_cleaned_field}")
             try:
-                response = req.get(url_cleaned_field, headers=headers, timeout=FUNCTION_TIMEOUT)
+                response = spotify_api_get(url_cleaned_field, headers)
                 response.raise_for_status()
                 json_response = response.json()
                 if json_response.get("tracks"):
                     total = json_response["tracks"].get("total", 0)
                     debug_print(f"URL_CLEANED_FIELD found {total} tracks")
                     if total > 0:
-                        sp_track_uri_id, sp_track_duration = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, cleaned_track=track_cleaned, original_album=album)
+                        sp_track_uri_id, sp_track_duration, sp_album_id = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, cleaned_track=track_cleaned, original_album=album)
                         if sp_track_uri_id:
                             debug_print(f"Match found via URL_CLEANED_FIELD")
             except Exception:
@@ -2050,22 +3819,26 @@ def spotify_search_song_trackid_duration(access_token, artist, track, album=""):
     # Final fallback: broad search without field qualifiers
     if not sp_track_uri_id:
         search_query = f"\"{artist_sanitized}\" \"{track_cleaned if track_cleaned else track_sanitized}\""
-        url_broad = f'https://api.spotify.com/v1/search?q={quote(search_query)}&type=track&limit=5'
+        url_broad = f'{SPOTIFY_API_URL}/v1/search?q={quote(search_query)}&type=track&limit={SPOTIFY_SEARCH_LIMIT}'
         debug_print(f"Spotify search URL_BROAD (fallback): {url_broad}")
         try:
-            response = req.get(url_broad, headers=headers, timeout=FUNCTION_TIMEOUT)
+            response = spotify_api_get(url_broad, headers)
             response.raise_for_status()
             json_response = response.json()
             if json_response.get("tracks"):
                 total = json_response["tracks"].get("total", 0)
                 debug_print(f"URL_BROAD found {total} tracks")
                 if total > 0:
-                    sp_track_uri_id, sp_track_duration = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, cleaned_track=track_cleaned if track_cleaned else None, original_album=album)
+                    sp_track_uri_id, sp_track_duration, sp_album_id = spotify_search_process_track_items(json_response["tracks"]["items"], artist, track, cleaned_track=track_cleaned if track_cleaned else None, original_album=album)
                     if sp_track_uri_id:
                         debug_print(f"Match found via URL_BROAD")
         except Exception:
             pass
 
+    # Users often play whole albums, so the tracklist of the matched track's album is fetched in the background
+    if sp_track_uri_id and sp_album_id and album and SPOTIFY_ALBUM_PREFETCH:
+        spotify_prefetch_album(access_token, sp_album_id, artist, album)
+
     return sp_track_uri_id, sp_track_duration
 
 
@@ -2161,7 +3934,30 @@ def resolve_executable(path):
     raise FileNotFoundError(f"Could not find executable '{path}'")
 
 
+# Returns (track_duration, sp_track_uri_id, duration_mark) for the track, shared with other monitor processes on the host via the shared cache daemon if enabled
 def get_track_info(artist, track, album, network):
+    shared_cache = get_shared_cache()
+    if not shared_cache:
+        return lookup_track_info(artist, track, album, network)
+
+    # Settings changing the result are part of the key, so processes with different settings do not mix their results
+    key = f"track_info:{int(bool(USE_TRACK_DURATION_FROM_SPOTIFY))}{int(bool(TRACK_SONGS))}{int(bool(DO_NOT_SHOW_DURATION_MARKS))}:{normalize_key(artist, track, album)}"
+    cached = shared_cache.get_or_claim(key)
+    if cached is not None:
+        debug_print(f"get_track_info(): shared cache hit for '{artist} - {track}'")
+        return tuple(cached)
+
+    track_duration, sp_track_uri_id, duration_mark = lookup_track_info(artist, track, album, network)
+    if track_duration > 0 or sp_track_uri_id:
+        shared_cache.set(key, [track_duration, sp_track_uri_id, duration_mark])
+    else:
+        # Failed lookups are not cached, so they are retried next time
+        shared_cache.release(key)
+    return track_duration, sp_track_uri_id, duration_mark
+
+
+# Looks up track duration (Spotify or Last.fm) and Spotify track ID
+def lookup_track_info(artist, track, album, network):
     sp_track_uri_id = None
     sp_track_duration = 0
     track_duration = 0
@@ -2187,8 +3983,11 @@ def get_track_info(artist, track, album, network):
             duration_mark = " S*"
     else:
         try:
-            lf_track = pylast.Track(artist, track, network)
-            lf_duration = lf_track.get_duration()
+            if LASTFM_JSON_API:
+                lf_duration = get_lastfm_json_client().track_duration(network, artist, track)
+            else:
+                lastfm_count_request(network)
+                lf_duration = pylast.Track(artist, track, network).get_duration()
             debug_print(f"Last.fm fallback: raw duration={lf_duration}ms")
             if lf_duration and lf_duration > 0:
                 if USE_TRACK_DURATION_FROM_SPOTIFY and not DO_NOT_SHOW_DURATION_MARKS:
@@ -2204,6 +4003,113 @@ def get_track_info(artist, track, album, network):
     return track_duration, sp_track_uri_id, duration_mark
 
 
+# Track details lookups (duration, Spotify track ID) run in a thread pool shared by all monitored users in the process,
+# so detection of track changes never waits longer than ENRICHMENT_DEADLINE for slow Spotify/Last.fm responses
+ENRICHMENT_EXECUTOR = None
+ENRICHMENT_PENDING = {}
+ENRICHMENT_LOCK = threading.Lock()
+
+# Batches of lookups (offline entries, album prefetches) use a separate pool of the same size, so they do not hold up lookups of the currently played tracks
+ENRICHMENT_BATCH_EXECUTOR = None
+ENRICHMENT_EXECUTOR_LOCK = threading.Lock()
+
+# Notification emails are sent in the background by a single thread, so they go out in order without blocking the monitoring loop
+EMAIL_EXECUTOR = None
+
+
+# Returns the enrichment thread pool (or the one for batches), creating it on first use
+def get_enrichment_executor(batch=False):
+    global ENRICHMENT_EXECUTOR, ENRICHMENT_BATCH_EXECUTOR
+    with ENRICHMENT_EXECUTOR_LOCK:
+        if batch:
+            if ENRICHMENT_BATCH_EXECUTOR is None:
+                ENRICHMENT_BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, ENRICHMENT_WORKERS), thread_name_prefix="enrichment_batch")
+            return ENRICHMENT_BATCH_EXECUTOR
+        if ENRICHMENT_EXECUTOR is None:
+            ENRICHMENT_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, ENRICHMENT_WORKERS), thread_name_prefix="enrichment")
+        return ENRICHMENT_EXECUTOR
+
+
+# Starts get_track_info() for the track in the enrichment thread pool and returns its future, lookups of a track already in progress are shared
+def submit_track_info(artist, track, album, network, batch=False):
+    key = normalize_key(artist, track, album)
+    with ENRICHMENT_LOCK:
+        future = ENRICHMENT_PENDING.get(key)
+        if future is not None:
+            return future
+        future = get_enrichment_executor(batch).submit(get_track_info, artist, track, album, network)
+        ENRICHMENT_PENDING[key] = future
+
+    def done(_):
+        with ENRICHMENT_LOCK:
+            if ENRICHMENT_PENDING.get(key) is future:
+                del ENRICHMENT_PENDING[key]
+
+    future.add_done_callback(done)
+    return future
+
+
+# Returns (track_duration, sp_track_uri_id, duration_mark) of the lookup if it finishes within deadline seconds, None otherwise
+def wait_track_info(future, deadline):
+    try:
+        return future.result(timeout=max(0, deadline))
+    except FuturesTimeoutError:
+        return None
+    except Exception as e:
+        debug_print(f"get_track_info() error: {e}")
+        return 0, None, ""
+
+
+# Queues the email notification to be sent in the background
+def send_email_async(subject, body, body_html, use_ssl):
+    global EMAIL_EXECUTOR
+    with ENRICHMENT_EXECUTOR_LOCK:
+        if EMAIL_EXECUTOR is None:
+            EMAIL_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email")
+    # send_email() is looked up now, as supervisor workers replace it
+    return EMAIL_EXECUTOR.submit(send_email, subject, body, body_html, use_ssl)
+
+
+# Track details of the entries which showed up while the user was offline, looked up concurrently in the enrichment thread pool
+# entries: list of (timestamp, artist, track, album) tuples; the batch is ready when all lookups finished or OFFLINE_ENTRIES_ENRICHMENT_DEADLINE passed
+class OfflineEntriesBatch:
+    def __init__(self, entries, network):
+        self.entries = entries
+        self.network = network
+        self.deadline_ts = time.time() + OFFLINE_ENTRIES_ENRICHMENT_DEADLINE
+        self.futures = [submit_track_info(artist, track, album, network, batch=True) for _, artist, track, album in entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def ready(self):
+        return time.time() >= self.deadline_ts or all(future.done() for future in self.futures)
+
+    # Returns (m_subject, m_body, m_body_html) of the notification, with whatever track details are ready
+    def notification(self, username):
+        lines = []
+        lines_html = []
+        for (ts, artist, track, album), future in zip(self.entries, self.futures):
+            track_duration, sp_track_uri_id, duration_mark = wait_track_info(future, 0) or (0, None, "")
+            links = get_spotify_apple_genius_search_urls(artist, track, album, self.network)
+            lastfm_url, lastfm_album_url = links[11], links[12]
+            track_url = spotify_convert_uri_to_url(f"spotify:track:{sp_track_uri_id}") if sp_track_uri_id else links[0]
+            date_str = f'{datetime.fromtimestamp(ts).strftime("%d %b %Y, %H:%M:%S")}, {calendar.day_abbr[datetime.fromtimestamp(ts).weekday()]}'
+            duration_str = f" [{display_time(track_duration)}{duration_mark}]" if track_duration > 0 else ""
+            album_str = f" ({album})" if album else ""
+            album_html = ""
+            if album:
+                album_html = f' (<a href="{lastfm_album_url}">{escape(album)}</a>)' if (ENABLE_LASTFM_ALBUM_URL and lastfm_album_url) else f" ({escape(album)})"
+            lines.append(f"{date_str}: {artist} - {track}{album_str}{duration_str}\n{track_url}")
+            lines_html.append(f'{date_str}: <a href="{track_url}">{escape(artist)} - {escape(track)}</a>{album_html}{escape(duration_str)}'
+                              + (f' (<a href="{lastfm_url}">Last.fm</a>)' if ENABLE_LASTFM_URL and lastfm_url else ""))
+
+        m_subject = f"Last.fm user {username}: new entries showed up while user was offline"
+        m_body = "New last.fm entries showed up while user was offline!\n\n" + "\n\n".join(lines) + f"\n{get_cur_ts(nl_ch + 'Timestamp: ')}"
+        m_body_html = "<html><head></head><body>New last.fm entries showed up while user was offline!<br><br>" + "<br>".join(lines_html) + f"{get_cur_ts('<br><br>Timestamp: ')}</body></html>"
+        return m_subject, m_body, m_body_html
+
+
 # Returns the hex salt and PBKDF2 iteration count used for key derivation
 def _get_kdf_params() -> Tuple[str, int]:
     salt_hex = "10368003bf43b4c3230602b970a37e95"
@@ -2251,6 +4157,600 @@ def decode(password: str) -> str:
         raise ValueError("decrypted bytes are not valid UTF-8") from exc
 
 
+# Returns the normalized (artist, title) identity used to compare tracks, case-insensitive like pylast's Track equality
+# Accepts pylast Track objects as well as plain (artist, title[, album]) tuples
+def track_identity(t):
+    if t is None:
+        return None
+    if isinstance(t, tuple):
+        return normalize(t[0], t[1])[:2]
+    return normalize(str(t.artist), str(t.title))[:2]
+
+
+# Returns (artist, title, album) of a pylast Track object or a plain (artist, title[, album]) tuple
+def track_fields(t):
+    if isinstance(t, tuple):
+        return t[0], t[1], (t[2] if len(t) > 2 and t[2] else "")
+    album = t.info.get('album') if t.info else None
+    return str(t.artist), str(t.title), str(album) if album else ""
+
+
+# Pure detection logic of the monitoring loop: track changes, pauses/resumes, skipped/CONT/LONGER songs, songs on loop and activity sessions
+# It never reads the clock nor does any I/O; observe() is driven with explicit timestamps and returns a list of events (dicts with a 'type' key)
+# which the caller turns into console output, emails, CSV entries etc., so it can be run under virtual time in benchmarks and by a scheduler
+class MonitorStateMachine:
+
+    # Config options the machine depends on, taken from the globals unless overridden
+    SETTINGS = ("LASTFM_ACTIVE_CHECK_INTERVAL", "LASTFM_INACTIVITY_CHECK", "LASTFM_BREAK_CHECK_MULTIPLIER", "LIVENESS_CHECK_COUNTER", "SONG_ON_LOOP_VALUE", "SKIPPED_SONG_THRESHOLD1", "SKIPPED_SONG_THRESHOLD2", "LONGER_SONG_THRESHOLD1", "LONGER_SONG_THRESHOLD2", "INACTIVE_EMAIL_RECENT_SONGS_COUNT")
+
+    # State persisted in checkpoints (in addition to playing_track)
+    STATE_FIELDS = ("lf_active_ts_start", "lf_active_ts_last", "lf_track_ts_start", "lf_track_ts_start_old", "lf_track_ts_start_after_resume", "lf_user_online", "alive_counter", "track_duration", "playing_paused", "playing_paused_ts", "playing_resumed_ts", "paused_counter", "listened_songs", "looped_songs", "skipped_songs", "signal_previous_the_same", "artist", "track", "album", "artist_old", "track_old", "song_on_loop", "recent_songs_session", "sp_track_uri_id", "duration_mark", "pauses_number", "last_track_start_ts_old", "last_track_start_ts_old2", "app_started_and_user_offline")
+
+    def __init__(self, **settings):
+        self.settings = {}
+        self.configure(**settings)
+        self.lf_active_ts_start = 0
+        self.lf_active_ts_last = 0
+        self.lf_track_ts_start = 0
+        self.lf_track_ts_start_old = 0
+        self.lf_track_ts_start_after_resume = 0
+        self.lf_user_online = False
+        self.alive_counter = 0
+        self.track_duration = 0
+        self.playing_paused = False
+        self.playing_paused_ts = 0
+        self.playing_resumed_ts = 0
+        self.paused_counter = 0
+        self.listened_songs = 0
+        self.looped_songs = 0
+        self.skipped_songs = 0
+        self.signal_previous_the_same = False
+        self.artist = ""
+        self.track = ""
+        self.album = ""
+        self.artist_old = ""
+        self.track_old = ""
+        self.song_on_loop = 0
+        self.recent_songs_session = []
+        self.sp_track_uri_id = None
+        self.duration_mark = ""
+        self.pauses_number = 0
+        self.last_track_start_ts_old = 0
+        self.last_track_start_ts_old2 = 0
+        self.app_started_and_user_offline = False
+        self.playing_track = None
+        self.playing_key = None
+
+    # (Re)reads the config options, keyword arguments override the global values
+    def configure(self, **settings):
+        for name in self.SETTINGS:
+            self.settings[name] = settings.get(name, self.settings.get(name, globals()[name]))
+
+    # Returns a JSON-serializable copy of the state
+    def snapshot(self):
+        state = {name: getattr(self, name) for name in self.STATE_FIELDS}
+        state['recent_songs_session'] = [dict(song) for song in self.recent_songs_session]
+        state['playing_track'] = list(track_fields(self.playing_track)) if self.playing_track is not None else None
+        return state
+
+    # Restores the state from snapshot(); playing_track may be a pylast Track object or a [artist, title, album] list
+    def restore(self, state):
+        for name in self.STATE_FIELDS:
+            setattr(self, name, state[name])
+        playing_track = state.get('playing_track')
+        if isinstance(playing_track, list):
+            playing_track = tuple(playing_track)
+        self.playing_track = playing_track
+        self.playing_key = track_identity(playing_track)
+
+    # Stores the duration and Spotify details of the current track, reported by the caller after the track_changed event
+    def set_track_info(self, track_duration, sp_track_uri_id, duration_mark):
+        self.track_duration = track_duration
+        self.sp_track_uri_id = sp_track_uri_id
+        self.duration_mark = duration_mark
+
+    # Processes one observation: now is the current timestamp, last_track_start_ts the timestamp of the most recent scrobble
+    # and now_playing the currently played track (or None); returns the list of resulting events
+    def observe(self, now, last_track_start_ts, now_playing):
+        s = self.settings
+        events = []
+        lf_current_ts = now - s['LASTFM_ACTIVE_CHECK_INTERVAL']
+
+        # Detecting new Last.fm entries when user is offline
+        if not self.lf_user_online:
+            if self.last_track_start_ts_old2 == 0:
+                events.append({'type': 'first_track'})
+                self.last_track_start_ts_old2 = last_track_start_ts
+                self.lf_track_ts_start_old = last_track_start_ts
+            if last_track_start_ts > self.last_track_start_ts_old2:
+                events.append({'type': 'offline_entries', 'since_ts': self.last_track_start_ts_old2, 'skip_ref_ts': self.lf_track_ts_start + s['LASTFM_ACTIVE_CHECK_INTERVAL']})
+                self.lf_track_ts_start_old = last_track_start_ts
+
+        new_key = track_identity(now_playing)
+
+        # User is online (plays music at the moment)
+        if new_key is not None:
+
+            # User paused music earlier
+            if self.playing_paused and self.lf_user_online:
+                self.playing_resumed_ts = lf_current_ts
+                self.lf_track_ts_start_after_resume += (self.playing_resumed_ts - self.playing_paused_ts)
+                self.paused_counter += (int(self.playing_resumed_ts) - int(self.playing_paused_ts))
+                events.append({'type': 'resumed', 'resumed_ts': self.playing_resumed_ts, 'paused_ts': self.playing_paused_ts})
+
+            self.playing_paused = False
+
+            same_track = new_key == self.playing_key
+
+            # Trying to overcome the issue with Last.fm API reporting newly played song (but still continues the same)
+            if (lf_current_ts <= (self.lf_track_ts_start + 20)) and (last_track_start_ts > self.last_track_start_ts_old) and same_track:
+                self.last_track_start_ts_old = last_track_start_ts
+
+            if not same_track or (last_track_start_ts > self.last_track_start_ts_old and last_track_start_ts > self.lf_track_ts_start_old - 20):
+                self._track_changed(events, now, lf_current_ts, last_track_start_ts, now_playing, new_key, same_track)
+            # Track has not changed, user is online and continues playing
+            else:
+                self.lf_active_ts_last = now
+                if self.lf_user_online:
+                    events.append({'type': 'playing', 'elapsed': now - self.lf_track_ts_start_after_resume})
+
+        # User is offline (does not play music at the moment)
+        else:
+            self.alive_counter += 1
+            break_interval = s['LASTFM_ACTIVE_CHECK_INTERVAL'] * s['LASTFM_BREAK_CHECK_MULTIPLIER']
+
+            # User paused playing the music
+            if (now - self.lf_active_ts_last) > break_interval and self.lf_user_online and self.lf_active_ts_last > 0 and self.lf_active_ts_start > 0 and break_interval < s['LASTFM_INACTIVITY_CHECK'] and s['LASTFM_BREAK_CHECK_MULTIPLIER'] > 0 and not self.playing_paused:
+                self.playing_paused = True
+                self.playing_paused_ts = self.lf_active_ts_last
+                self.pauses_number += 1
+                events.append({'type': 'paused', 'paused_ts': self.playing_paused_ts, 'resumed_ts': self.playing_resumed_ts, 'break_interval': break_interval})
+
+            # User got inactive
+            if (now - self.lf_active_ts_last) > s['LASTFM_INACTIVITY_CHECK'] and self.lf_user_online and self.lf_active_ts_last > 0 and self.lf_active_ts_start > 0:
+                self._got_inactive(events, now)
+                last_track_start_ts = 0
+
+            if s['LIVENESS_CHECK_COUNTER'] and self.alive_counter >= s['LIVENESS_CHECK_COUNTER']:
+                events.append({'type': 'liveness'})
+                self.alive_counter = 0
+
+        if last_track_start_ts > 0:
+            self.last_track_start_ts_old2 = last_track_start_ts
+
+        return events
+
+    # Marks the previous track as skipped or as CONT (continuation of the track played before the user got inactive), returns the verdict
+    def _mark_previous_skipped(self):
+        if self.signal_previous_the_same:
+            self.signal_previous_the_same = False
+            verdict = 'CONT'
+        else:
+            self.skipped_songs += 1
+            verdict = 'SKIPPED'
+        if self.recent_songs_session and self.recent_songs_session[-1]['artist'] == self.artist_old and self.recent_songs_session[-1]['track'] == self.track_old:
+            self.recent_songs_session[-1]['cont' if verdict == 'CONT' else 'skipped'] = True
+        return verdict
+
+    def _track_changed(self, events, now, lf_current_ts, last_track_start_ts, now_playing, new_key, same_track):
+        s = self.settings
+        self.alive_counter = 0
+
+        if same_track:
+            self.song_on_loop += 1
+            if self.song_on_loop == s['SONG_ON_LOOP_VALUE']:
+                self.looped_songs += 1
+        else:
+            self.song_on_loop = 1
+
+        self.playing_track = now_playing
+        self.playing_key = new_key
+        self.artist, self.track, self.album = track_fields(now_playing)
+
+        # How long user played the previous track, if skipped it etc.
+        previous = None
+        if self.lf_track_ts_start_after_resume > 0 and self.lf_user_online:
+            played_for_time = lf_current_ts - self.lf_track_ts_start_after_resume
+            track_duration = self.track_duration
+            previous = {'artist': self.artist_old, 'track': self.track_old, 'played_for_time': played_for_time, 'track_duration': track_duration, 'listened_percentage': None, 'complete': False, 'verdict': None}
+            if track_duration > 0:
+                listened_percentage = played_for_time / (track_duration - 1)
+                previous['listened_percentage'] = listened_percentage
+                if played_for_time < (track_duration - s['LASTFM_ACTIVE_CHECK_INTERVAL'] - 1):
+                    if listened_percentage <= s['SKIPPED_SONG_THRESHOLD2']:
+                        previous['verdict'] = self._mark_previous_skipped()
+                else:
+                    previous['complete'] = True
+                    if listened_percentage >= s['LONGER_SONG_THRESHOLD1'] or (played_for_time - track_duration >= s['LONGER_SONG_THRESHOLD2']):
+                        previous['verdict'] = 'LONGER'
+                    else:
+                        previous = None
+            elif played_for_time <= s['SKIPPED_SONG_THRESHOLD1']:
+                previous['verdict'] = self._mark_previous_skipped()
+
+        self.listened_songs += 1
+
+        # Clearing the flag used to indicate CONT songs (continued from previous playing session)
+        if self.listened_songs == 2:
+            self.signal_previous_the_same = False
+
+        if self.lf_track_ts_start > 0:
+            self.lf_track_ts_start_old = self.lf_track_ts_start
+        self.lf_track_ts_start = lf_current_ts
+        self.lf_track_ts_start_after_resume = lf_current_ts
+        self.last_track_start_ts_old = last_track_start_ts
+
+        self.recent_songs_session.append({'artist': self.artist, 'track': self.track, 'timestamp': lf_current_ts, 'skipped': False, 'cont': False})
+        # Keep only last INACTIVE_EMAIL_RECENT_SONGS_COUNT songs (or 5 if not set)
+        max_songs = s['INACTIVE_EMAIL_RECENT_SONGS_COUNT'] if s['INACTIVE_EMAIL_RECENT_SONGS_COUNT'] > 0 else 5
+        if len(self.recent_songs_session) > max_songs:
+            self.recent_songs_session.pop(0)
+
+        events.append({'type': 'track_changed', 'track': now_playing, 'previous': previous})
+
+        # User was offline and got active (also when the user had no tracks at all before)
+        if not self.lf_user_online and (self.lf_active_ts_start == 0 or ((self.lf_track_ts_start - self.lf_active_ts_last) > s['LASTFM_INACTIVITY_CHECK'] and self.lf_active_ts_last > 0) or (self.lf_active_ts_last > 0 and self.app_started_and_user_offline)):
+            self.app_started_and_user_offline = False
+            active_ts_last_old = self.lf_active_ts_last
+            last_track_start_changed_from = 0
+            if self.lf_active_ts_last > 0 and last_track_start_ts > (self.lf_active_ts_last + 60) and (now - last_track_start_ts > 240):
+                last_track_start_changed_from = self.lf_active_ts_last
+                self.lf_active_ts_last = last_track_start_ts
+            events.append({'type': 'active', 'active_ts_last': self.lf_active_ts_last, 'active_ts_last_old': active_ts_last_old, 'last_track_start_changed_from': last_track_start_changed_from, 'last_track_start_ts': last_track_start_ts})
+            # We signal that the currently played song is the same as previous one before user got inactive, so might be continuation of previous track
+            self.signal_previous_the_same = self.artist_old == self.artist and self.track_old == self.track
+            self.paused_counter = 0
+            self.listened_songs = 1
+            self.skipped_songs = 0
+            self.looped_songs = 0
+            self.pauses_number = 0
+            self.lf_active_ts_start = self.lf_track_ts_start
+            self.playing_resumed_ts = self.lf_track_ts_start
+            self.recent_songs_session = [{'artist': self.artist, 'track': self.track, 'timestamp': self.lf_track_ts_start, 'skipped': False, 'cont': False}]
+
+        if self.song_on_loop == s['SONG_ON_LOOP_VALUE']:
+            events.append({'type': 'loop', 'count': self.song_on_loop})
+
+        self.lf_user_online = True
+        self.lf_active_ts_last = now
+        self.artist_old = self.artist
+        self.track_old = self.track
+
+    def _got_inactive(self, events, now):
+        self.lf_user_online = False
+        played_for_time = None
+        if self.lf_track_ts_start_after_resume > 0:
+            played_for_time = self.lf_active_ts_last - self.lf_track_ts_start_after_resume
+        self.playing_resumed_ts = now
+        self.pauses_number -= 1
+        events.append({'type': 'inactive', 'artist': self.artist, 'track': self.track, 'album': self.album, 'track_duration': self.track_duration, 'duration_mark': self.duration_mark, 'played_for_time': played_for_time, 'active_ts_start': self.lf_active_ts_start, 'active_ts_last': self.lf_active_ts_last, 'paused_counter': self.paused_counter, 'pauses_number': self.pauses_number, 'listened_songs': self.listened_songs, 'skipped_songs': self.skipped_songs, 'looped_songs': self.looped_songs, 'recent_songs': self.recent_songs_session})
+        self.paused_counter = 0
+        self.lf_active_ts_start = 0
+        self.playing_track = None
+        self.playing_key = None
+        self.listened_songs = 0
+        self.looped_songs = 0
+        self.skipped_songs = 0
+        self.pauses_number = 0
+        self.recent_songs_session = []
+
+
+# Returns console line, email text and email HTML describing how long the user played the previous track, from the 'previous' part of a track_changed event
+def format_played_for_previous(previous):
+    artist_old = previous['artist']
+    track_old = previous['track']
+    played_for_time = previous['played_for_time']
+    track_duration = previous['track_duration']
+    verdict = previous['verdict']
+
+    # Track duration is NOT available
+    if track_duration <= 0:
+        played_for = display_time(played_for_time)
+        played_for_html = f"<b>{played_for}</b>"
+        if verdict == 'CONT':
+            return f"User CONT the previous track for {played_for}", f"\n\nUser CONT the previous track ({artist_old} - {track_old}) for: {played_for}", f"<br><br>User <b>CONT</b> the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) for: {played_for_html}"
+        if verdict == 'SKIPPED':
+            return f"User SKIPPED the previous track after {played_for}", f"\n\nUser SKIPPED the previous track ({artist_old} - {track_old}) after: {played_for}", f"<br><br>User <b>SKIPPED</b> the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) after: {played_for_html}"
+        return f"User played the previous track for: {played_for}", f"\n\nUser played the previous track ({artist_old} - {track_old}) for: {played_for}", f"<br><br>User played the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) for: {played_for_html}"
+
+    percentage = int(previous['listened_percentage'] * 100)
+    if previous['complete']:
+        played_for = display_time(played_for_time)
+        played_for_html = played_for
+        played_for += f" - LONGER than track duration (+ {display_time(played_for_time - track_duration)}, {percentage}%)"
+        played_for_html += f" - <b>LONGER</b> than track duration (+ {display_time(played_for_time - track_duration)}, {percentage}%)"
+    else:
+        played_for = f"{display_time(played_for_time)} (out of {display_time(track_duration)})"
+        played_for_html = f"<b>{display_time(played_for_time)}</b> (out of {display_time(track_duration)})"
+        if verdict:
+            played_for += f" - {verdict} ({percentage}%)"
+            played_for_html += f" - <b>{verdict}</b> ({percentage}%)"
+        else:
+            played_for += f" ({percentage}%)"
+            played_for_html += f" ({percentage}%)"
+    return f"User played the previous track for: {played_for}", f"\n\nUser played the previous track ({artist_old} - {track_old}) for: {played_for}", f"<br><br>User played the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) for: {played_for_html}"
+
+
+# Aho-Corasick automaton finding which of many substrings occur in a text in a single pass over the text
+class SubstringIndex:
+    def __init__(self, patterns):
+        # patterns: {substring: value}; every state has its transitions, fail link and values of patterns ending in it
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern, value in patterns.items():
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(value)
+
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    # Returns the value of the first pattern found in the text or None
+    def search(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return out[state][0]
+        return None
+
+
+# Compiled matcher of MONITOR_LIST_FILE entries against artist, track and album of played tracks
+# Entry format: [artist:|track:|album:]value, entries without a field prefix match the track or the album name
+# The value is matched as a whole name, or as a substring when prefixed with ~, or as a case-insensitive regular expression
+# (applied to the normalized name) when written as /regex/
+# Names are compared in normalized form (see normalize_text()), exact names are looked up in a hash index, substrings
+# in an Aho-Corasick automaton and regular expressions are combined into a single pattern per field (except the ones with
+# groups or inline flags), so the cost of a match does not depend on the number of entries
+class WatchlistMatcher:
+
+    FIELDS = ("artist", "track", "album")
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        exact = {field: {} for field in self.FIELDS}
+        substrings = {field: {} for field in self.FIELDS}
+        patterns = {field: [] for field in self.FIELDS}
+
+        for entry in self.entries:
+            fields, value = ("track", "album"), entry.strip()
+            prefix, sep, rest = value.partition(":")
+            if sep and prefix.strip().lower() in self.FIELDS:
+                fields, value = (prefix.strip().lower(),), rest.strip()
+            if len(value) > 2 and value.startswith("/") and value.endswith("/"):
+                try:
+                    re.compile(value[1:-1])
+                except re.error as e:
+                    raise ValueError(f"invalid regular expression in entry '{entry}': {e}")
+                for field in fields:
+                    patterns[field].append((value[1:-1], entry))
+            elif value.startswith("~") and normalize_text(value[1:]):
+                for field in fields:
+                    substrings[field].setdefault(normalize_text(value[1:]), entry)
+            elif value:
+                for field in fields:
+                    exact[field].setdefault(normalize_text(value), entry)
+
+        self.exact = exact
+        self.substrings = {field: SubstringIndex(s) for field, s in substrings.items() if s}
+        # Expressions with groups (named groups, backreferences) or inline global flags (e.g. (?i)) would break or change
+        # the meaning of the combined pattern, they are compiled and matched separately
+        self.patterns = {}
+        self.pattern_entries = {}
+        self.separate_patterns = {}
+        for field, field_patterns in patterns.items():
+            combined = []
+            for p, e in field_patterns:
+                try:
+                    combinable = re.compile(f"(?:{p})").groups == 0
+                except re.error:
+                    combinable = False
+                if combinable:
+                    combined.append((p, e))
+                else:
+                    try:
+                        self.separate_patterns.setdefault(field, []).append((re.compile(p, re.IGNORECASE), e))
+                    except re.error as err:
+                        raise ValueError(f"invalid regular expression in entry '{e}': {err}")
+            if combined:
+                try:
+                    self.patterns[field] = re.compile("|".join(f"(?P<p{i}>{p})" for i, (p, _) in enumerate(combined)), re.IGNORECASE)
+                except re.error as err:
+                    raise ValueError(f"invalid regular expressions in {field} entries: {err}")
+                self.pattern_entries[field] = {f"p{i}": e for i, (_, e) in enumerate(combined)}
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    # Returns the watchlist entry matching the track or None
+    def match(self, artist, track, album=""):
+        if not self.entries:
+            return None
+        key = normalize(str(artist), str(track), str(album) if album else "")
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        result = None
+        for field, value in zip(self.FIELDS, key):
+            if not value:
+                continue
+            result = self.exact[field].get(value)
+            if result is None and field in self.substrings:
+                result = self.substrings[field].search(value)
+            if result is None and field in self.patterns:
+                m = self.patterns[field].search(value)
+                if m:
+                    result = self.pattern_entries[field][m.lastgroup]
+            if result is None:
+                for pattern, entry in self.separate_patterns.get(field, ()):
+                    if pattern.search(value):
+                        result = entry
+                        break
+            if result is not None:
+                break
+
+        with self.lock:
+            self.cache[key] = result
+            if len(self.cache) > WATCHLIST_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return result
+
+
+WATCHLIST_MATCHERS = {}
+WATCHLIST_MATCHERS_LOCK = threading.Lock()
+
+
+# Returns the compiled matcher for the watchlist entries, built once per process and shared by all monitored users
+def get_watchlist_matcher(entries):
+    key = tuple(entries)
+    with WATCHLIST_MATCHERS_LOCK:
+        matcher = WATCHLIST_MATCHERS.get(key)
+        if matcher is None:
+            matcher = WatchlistMatcher(key)
+            WATCHLIST_MATCHERS[key] = matcher
+        return matcher
+
+
+# Reads MONITOR_LIST_FILE entries (one per line, lines starting with # are skipped)
+def read_watchlist_file(path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            lines = file.read().splitlines()
+    except UnicodeDecodeError:
+        with open(path, encoding="cp1252") as file:
+            lines = file.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+# Returns values of the reloadable settings assigned in the config file
+def read_config_values(path):
+    namespace = {}
+    with open(path, "r") as cf:
+        exec(cf.read(), namespace)
+    return {name: namespace[name] for name in RELOADABLE_SETTINGS if name in namespace}
+
+
+# Checks the new value of a reloadable setting against its current value, raises ValueError if it is not acceptable
+def validate_setting(name, value, current):
+    if isinstance(current, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f"{name} must be True or False")
+    elif isinstance(current, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number")
+        if value < 0 or (value == 0 and name in ("LASTFM_CHECK_INTERVAL", "LASTFM_ACTIVE_CHECK_INTERVAL", "LASTFM_INACTIVITY_CHECK")):
+            raise ValueError(f"{name} must be a positive number")
+    elif isinstance(current, str) and not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+
+
+# Watches the config file and MONITOR_LIST_FILE (by mtime) and applies changes while the monitoring keeps running
+# Only RELOADABLE_SETTINGS are reloaded, and only those whose value in the config file changed, so settings overridden
+# by command line flags stay in effect until they are changed in the file; the watchlist index is rebuilt and swapped at once
+class ConfigReloader:
+    def __init__(self, config_path, quiet=False):
+        self.config_path = config_path
+        self.quiet = quiet
+        self.config_mtime = None
+        self.watchlist_path = MONITOR_LIST_FILE
+        self.watchlist_mtime = None
+        self.lock = threading.Lock()
+
+    # Checks both files and applies the changes, returns the list of change descriptions
+    def check(self):
+        global CONFIG_FILE_VALUES, LIVENESS_CHECK_COUNTER, MONITOR_LIST_FILE, WATCHLIST, SETTINGS_GENERATION
+        with self.lock:
+            changes = []
+            mtime = self.mtime(self.config_path)
+            if mtime is not None and mtime != self.config_mtime:
+                self.config_mtime = mtime
+                try:
+                    values = read_config_values(self.config_path)
+                    previous = dict(CONFIG_FILE_VALUES)
+                    changed = {name: value for name, value in values.items() if name not in previous or previous[name] != value}
+                    for name, value in changed.items():
+                        validate_setting(name, value, globals()[name])
+                except Exception as e:
+                    print(f"* Error reloading config file '{self.config_path}', keeping current settings: {e}")
+                else:
+                    for name, value in changed.items():
+                        if globals()[name] != value:
+                            changes.append(f"{name}: {globals()[name]!r} -> {value!r}")
+                            globals()[name] = value
+                    CONFIG_FILE_VALUES = tuple(values.items())
+                    if "LASTFM_CHECK_INTERVAL" in changed:
+                        LIVENESS_CHECK_COUNTER = LIVENESS_CHECK_INTERVAL / LASTFM_CHECK_INTERVAL
+
+            if MONITOR_LIST_FILE:
+                MONITOR_LIST_FILE = os.path.expanduser(MONITOR_LIST_FILE)
+            mtime = self.mtime(MONITOR_LIST_FILE)
+            if MONITOR_LIST_FILE != self.watchlist_path or (mtime is not None and mtime != self.watchlist_mtime):
+                self.watchlist_path = MONITOR_LIST_FILE
+                self.watchlist_mtime = mtime
+                try:
+                    entries = read_watchlist_file(MONITOR_LIST_FILE) if MONITOR_LIST_FILE else []
+                    matcher = WatchlistMatcher(entries)
+                except Exception as e:
+                    print(f"* Error reloading file with Last.fm tracks '{MONITOR_LIST_FILE}', keeping current list: {e}")
+                else:
+                    old_entries = WATCHLIST.entries if WATCHLIST is not None else []
+                    if entries != old_entries:
+                        added = len(set(entries) - set(old_entries))
+                        removed = len(set(old_entries) - set(entries))
+                        changes.append(f"tracks/albums to monitor: {len(entries)} entries (+{added}, -{removed})")
+                    WATCHLIST = matcher
+
+            if changes:
+                SETTINGS_GENERATION += 1
+                if not self.quiet:
+                    print(f"* Configuration reloaded: {', '.join(changes)}")
+                    print_cur_ts("Timestamp:\t\t\t")
+            return changes
+
+    @staticmethod
+    def mtime(path):
+        try:
+            return os.path.getmtime(path) if path else None
+        except OSError:
+            return None
+
+    def run(self):
+        while True:
+            time.sleep(CONFIG_RELOAD_INTERVAL)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"* Error reloading configuration: {e}")
+
+    # Starts watching in a daemon thread
+    def start(self):
+        threading.Thread(target=self.run, name="config_reloader", daemon=True).start()
+        return self
+
+
 # Main function that monitors activity of the specified Last.fm user
 def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
 
@@ -2274,6 +4774,7 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
     signal_previous_the_same = False
     artist = ""
     track = ""
+    album = ""
     artist_old = ""
     track_old = ""
     song_on_loop = 0
@@ -2287,6 +4788,24 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
     error_network_issue_counter = 0
     error_network_issue_start_ts = 0
     friends_check_last_ts = 0
+    lastfm_breaker = get_circuit_breaker("lastfm_api")
+    startup_ts = time.time()
+    startup_deadline_ts = startup_ts + STARTUP_TIMEOUT
+
+    # Track details lookup which missed the notification deadline: (future, artist, track)
+    pending_track_info = None
+
+    # Returns the track details looked up within the startup time budget; a lookup which misses it is left pending,
+    # so its late result is applied by the main loop the same way as for tracks detected there
+    def startup_track_info(artist, track, album):
+        nonlocal pending_track_info
+        track_info_future = submit_track_info(artist, track, album, network)
+        track_info = wait_track_info(track_info_future, startup_deadline_ts - time.time())
+        if track_info is None:
+            debug_print(f"Track details not ready within the startup time budget, continuing without them")
+            pending_track_info = (track_info_future, str(artist), str(track))
+            return 0, None, ""
+        return track_info
 
     debug_print(f"Starting monitor loop for user: {username}")
     try:
@@ -2295,571 +4814,743 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
     except Exception as e:
         print(f"* Error: {e}")
 
-    lastfm_last_activity_file = f"lastfm_{username}_last_activity.json"
-    last_activity_read = []
     last_activity_ts = 0
     last_activity_artist = ""
     last_activity_track = ""
     last_activity_album = ""
 
-    if os.path.isfile(lastfm_last_activity_file):
-        try:
-            with open(lastfm_last_activity_file, 'r', encoding="utf-8") as f:
-                last_activity_read = json.load(f)
-        except Exception as e:
-            print(f"* Cannot load last status from '{lastfm_last_activity_file}' file: {e}")
-        if last_activity_read:
-            last_activity_ts = last_activity_read[0]
-            last_activity_artist = last_activity_read[1]
-            last_activity_track = last_activity_read[2]
-            # Album is stored at index 3 if available
-            if len(last_activity_read) > 3:
-                last_activity_album = last_activity_read[3]
-            lastfm_last_activity_file_mdate_dt = datetime.fromtimestamp(int(os.path.getmtime(lastfm_last_activity_file)))
-            lastfm_last_activity_file_mdate = lastfm_last_activity_file_mdate_dt.strftime("%d %b %Y, %H:%M:%S")
-            lastfm_last_activity_file_mdate_weekday = str(calendar.day_abbr[(lastfm_last_activity_file_mdate_dt).weekday()])
-            print(f"* Last activity loaded from file '{lastfm_last_activity_file}' ({lastfm_last_activity_file_mdate_weekday} {lastfm_last_activity_file_mdate})")
+    last_activity_read, last_activity_source, last_activity_saved_ts = load_last_activity(username)
+    if last_activity_read:
+        last_activity_ts = last_activity_read[0]
+        last_activity_artist = last_activity_read[1]
+        last_activity_track = last_activity_read[2]
+        # Album is stored at index 3 if available
+        if len(last_activity_read) > 3:
+            last_activity_album = last_activity_read[3]
+        print(f"* Last activity loaded from {last_activity_source} ({get_date_from_ts(last_activity_saved_ts)})")
 
-    try:
-        new_track = user.get_now_playing()
-        recent_tracks = lastfm_get_recent_tracks(username, network, RECENT_TRACKS_NUMBER)
-    except Exception as e:
-        print(f"* Error: {e}")
-        sys.exit(1)
-
-    # Handle case where user has no tracks yet (fresh account)
-    if not recent_tracks or len(recent_tracks) == 0:
-        print("\n*** User has no tracks yet (fresh account). Waiting for first track to appear...\n")
-        last_track_start_ts_old2 = 0
-        lf_track_ts_start_old = 0
-        last_track_start_ts_old = 0
-
-        # If user is currently playing music but has no history yet, handle it
-        if new_track is not None:
-            app_started_and_user_offline = False
-            lf_active_ts_start = int(time.time())
-            lf_active_ts_last = lf_active_ts_start
-            lf_track_ts_start = lf_active_ts_start
-            lf_track_ts_start_after_resume = lf_active_ts_start
-            playing_resumed_ts = lf_active_ts_start
-            song_on_loop = 1
-            artist = str(new_track.artist)
-            track = str(new_track.title)
-            album = str(new_track.info.get('album', '')) if new_track.info.get('album') else ""
-            artist_old = artist
-            track_old = track
-            last_activity_artist = artist
-            last_activity_track = track
-            playing_track = new_track
-            lf_user_online = True
-            debug_print(f"{username} is now ONLINE (initial track)")
-            print(f"\nTrack:\t\t\t\t{artist} - {track}")
-            if album:
-                print(f"Album:\t\t\t\t{album}")
-
-            track_duration, sp_track_uri_id, duration_mark = get_track_info(artist, track, album, network)
-
-            if track_duration > 0:
-                print(f"Duration:\t\t\t{display_time(track_duration)}{duration_mark}")
-
-            spotify_search_url, apple_search_url, genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, lastfm_url, lastfm_album_url = get_spotify_apple_genius_search_urls(str(artist), str(track), album, network, playing_track)
-
-            music_urls_output = format_music_urls_console(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
-            lyrics_output = format_lyrics_urls_console(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
-            if music_urls_output or lyrics_output:
-                print()  # Always add newline before first section (music URLs or lyrics)
-            if music_urls_output:
-                print(music_urls_output)
-            if lyrics_output:
-                print(lyrics_output)
+    email_sent = False
 
-            print("\n*** User is currently ACTIVE (first track) !")
+    watchlist = get_watchlist_matcher(tracks)
 
-            listened_songs = 1
-            recent_songs_session = [{'artist': artist, 'track': track, 'timestamp': lf_track_ts_start, 'skipped': False, 'cont': False}]
+    friends_pending_changes = None
+    friends_streak = 0
+    friends_next_check_ts = 0
 
-            last_activity_to_save = []
-            last_activity_to_save.append(lf_track_ts_start)
-            last_activity_to_save.append(artist)
-            last_activity_to_save.append(track)
-            last_activity_to_save.append(album)
+    machine = MonitorStateMachine()
 
-            try:
-                with open(lastfm_last_activity_file, 'w', encoding="utf-8") as f:
-                    json.dump(last_activity_to_save, f, indent=2)
-            except Exception as e:
-                print(f"* Cannot save last status to '{lastfm_last_activity_file}' file: {e}")
+    checkpoint = load_monitor_checkpoint(username)
 
-            try:
-                if csv_file_name:
-                    write_csv_entry(csv_file_name, datetime.fromtimestamp(int(lf_track_ts_start)), artist, track, album)
-            except Exception as e:
-                print(f"* Error: {e}")
+    # Resume the monitoring session from the checkpoint without any extra API calls
+    if checkpoint:
+        if not connectivity_ok():
+            sys.exit(1)
 
-            duration_m_body = ""
-            duration_m_body_html = ""
-            if track_duration > 0:
-                duration_m_body = f"\nDuration: {display_time(track_duration)}{duration_mark}"
-                duration_m_body_html = f"<br>Duration: {display_time(track_duration)}{duration_mark}"
-
-            m_subject = f"Last.fm user {username} is active: '{artist} - {track}'"
-            lyrics_urls_text = format_lyrics_urls_email_text(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
-            lyrics_urls_html = format_lyrics_urls_email_html(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, artist, track)
-            lyrics_section_text = f"\n{lyrics_urls_text}\n\n" if lyrics_urls_text else "\n\n"
-            lyrics_section_html = f"<br>{lyrics_urls_html}<br><br>" if lyrics_urls_html else "<br><br>"
-            # Determine URLs for "Track:" and secondary URL field based on configuration
-            if USE_LASTFM_URL_IN_LAST_PLAYED:
-                track_url = lastfm_url
-                secondary_url = spotify_search_url
-                secondary_url_label = "Spotify URL"
-            else:
-                track_url = spotify_search_url
-                secondary_url = lastfm_url
-                secondary_url_label = "Last.fm URL"
-            music_urls_text = format_music_urls_email_text(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
-            music_urls_html = format_music_urls_email_html(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, artist, track, secondary_url, secondary_url_label)
-            music_section_text = f"\n\n{music_urls_text}\n" if music_urls_text else "\n"
-            music_section_html = f"<br><br>{music_urls_html}" if music_urls_html else ""
-            # When both music and lyrics are empty, use single <br><br> instead of <br> + <br><br>
-            if not music_urls_html and not lyrics_urls_html:
-                music_section_html = "<br><br>"
-                lyrics_section_html = ""
-            elif not music_urls_html:
-                music_section_html = "<br>"
-            album_line = f"Album: {album}" if album else ""
-            m_body = f"Track: {artist} - {track}{duration_m_body}\n{album_line}{music_section_text}{lyrics_section_text}Last activity: {get_date_from_ts(lf_active_ts_last)}{get_cur_ts(nl_ch + 'Timestamp: ')}"
-            album_html = f'<a href="{lastfm_album_url}">{escape(album)}</a>' if (ENABLE_LASTFM_ALBUM_URL and lastfm_album_url) else escape(album)
-            album_html_line = f"<br>Album: {album_html}" if album else ""
-            m_body_html = f"<html><head></head><body>Track: <b><a href=\"{track_url}\">{escape(artist)} - {escape(track)}</a></b>{duration_m_body_html}{album_html_line}{music_section_html}{lyrics_section_html}Last activity: <b>{get_date_from_ts(lf_active_ts_last)}</b>{get_cur_ts('<br>Timestamp: ')}</body></html>"
-
-            if ACTIVE_NOTIFICATION:
-                print(f"Sending email notification to {RECEIVER_EMAIL}")
-                send_email(m_subject, m_body, m_body_html, SMTP_SSL)
-
-            # If tracking functionality is enabled then play the current song via Spotify client
-            if TRACK_SONGS and sp_track_uri_id:
-                if platform.system() == 'Darwin':       # macOS
-                    spotify_macos_play_song(sp_track_uri_id)
-                elif platform.system() == 'Windows':    # Windows
-                    spotify_win_play_song(sp_track_uri_id)
-                else:                                   # Linux variants
-                    spotify_linux_play_song(sp_track_uri_id)
+        cp = checkpoint['state']
+        machine.restore(cp)
+        friends_check_last_ts = cp['friends_check_last_ts']
+        friends_pending_changes = cp['friends_pending_changes']
+        friends_streak = cp['friends_streak']
+        friends_next_check_ts = cp['friends_next_check_ts']
+
+        print(f"* Monitoring session resumed from checkpoint ({get_date_from_ts(checkpoint['saved_ts'])})")
+
+        if machine.lf_user_online:
+            print(f"\nTrack:\t\t\t\t{machine.artist} - {machine.track}")
+            if machine.album:
+                print(f"Album:\t\t\t\t{machine.album}")
+            if machine.track_duration > 0:
+                print(f"Duration:\t\t\t{display_time(machine.track_duration)}{machine.duration_mark}")
+            print(f"\n*** User is currently ACTIVE ! (since {get_date_from_ts(machine.lf_active_ts_start)}, songs played: {machine.listened_songs})")
+        elif machine.lf_active_ts_last > 0:
+            print(f"* Last activity:\t\t{get_date_from_ts(machine.lf_active_ts_last)}")
+            print(f"* Last track:\t\t\t{machine.artist_old} - {machine.track_old}")
+            print(f"\n*** User is OFFLINE for {calculate_timespan(int(time.time()), machine.lf_active_ts_last, show_seconds=False)} !")
         else:
-            app_started_and_user_offline = True
-            playing_track = None
-            lf_user_online = False
-            lf_active_ts_last = 0
-            last_activity_artist = ""
-            last_activity_track = ""
-            artist_old = ""
-            track_old = ""
-            print(f"* Last activity:\t\tNo tracks yet")
-            print(f"* Last track:\t\t\tNo tracks yet")
             print(f"\n*** User is OFFLINE (no tracks yet) !")
-    else:
-        last_track_start_ts_old2 = int(recent_tracks[0].timestamp)
-        lf_track_ts_start_old = last_track_start_ts_old2
 
-        # User is offline (does not play music at the moment)
-        if new_track is None:
-            app_started_and_user_offline = True
-            playing_track = None
-            last_track_start_ts_old = 0
-            lf_user_online = False
-            lf_active_ts_last = int(recent_tracks[0].timestamp)
-            if lf_active_ts_last >= last_activity_ts:
-                last_activity_artist = recent_tracks[0].track.artist
-                last_activity_track = recent_tracks[0].track.title
-                if recent_tracks[0].album:
-                    last_activity_album = str(recent_tracks[0].album)
-            elif lf_active_ts_last < last_activity_ts and last_activity_ts > 0:
-                lf_active_ts_last = last_activity_ts
-
-            last_activity_dt = datetime.fromtimestamp(lf_active_ts_last).strftime("%d %b %Y, %H:%M:%S")
-            last_activity_ts_weekday = str(calendar.day_abbr[(datetime.fromtimestamp(lf_active_ts_last)).weekday()])
-
-            artist_old = str(last_activity_artist)
-            track_old = str(last_activity_track)
-
-            print(f"* Last activity:\t\t{last_activity_ts_weekday} {last_activity_dt}")
-            print(f"* Last track:\t\t\t{last_activity_artist} - {last_activity_track}")
-            if last_activity_album:
-                print(f"* Last album:\t\t\t{last_activity_album}")
-
-            track_duration, sp_track_uri_id, duration_mark = get_track_info(last_activity_artist, last_activity_track, last_activity_album, network)
+        print(f"\nTracks/albums to monitor: {tracks}")
 
-            if track_duration > 0:
-                print(f"* Last track duration:\t\t{display_time(track_duration)}{duration_mark}")
-
-            spotify_search_url, apple_search_url, genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, lastfm_url, lastfm_album_url = get_spotify_apple_genius_search_urls(str(last_activity_artist), str(last_activity_track), last_activity_album, network)
-
-            music_urls_output = format_music_urls_console(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
-            lyrics_output = format_lyrics_urls_console(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
-            if music_urls_output or lyrics_output:
-                print()  # Always add newline before first section (music URLs or lyrics)
-            if music_urls_output:
-                print(music_urls_output)
-            if lyrics_output:
-                print(f"{lyrics_output}\n")
-            elif not music_urls_output:
-                print()  # Add newline before "User is OFFLINE" when both music and lyrics are disabled
-            elif music_urls_output:
-                print()  # Add newline after music URLs when lyrics are disabled
+        print_cur_ts("\nTimestamp:\t\t\t")
 
-            print(f"*** User is OFFLINE for {calculate_timespan(int(time.time()), lf_active_ts_last, show_seconds=False)} !")
-
-        # User is online (plays music at the moment)
+    else:
+        # Independent startup requests are sent at once, so the startup takes about one round trip
+        startup_executor = get_startup_executor()
+        if LASTFM_JSON_API:
+            recent_tracks_future = startup_executor.submit(lastfm_get_recent_tracks_and_now_playing, username, user, network, RECENT_TRACKS_NUMBER)
+            now_playing_future = None
         else:
-            app_started_and_user_offline = False
-            lf_active_ts_start = int(time.time())
-            lf_active_ts_last = lf_active_ts_start
-            lf_track_ts_start = lf_active_ts_start
-            lf_track_ts_start_after_resume = lf_active_ts_start
-            playing_resumed_ts = lf_active_ts_start
-            song_on_loop = 1
-            artist = str(new_track.artist)
-            track = str(new_track.title)
-            album = str(new_track.info.get('album', '')) if new_track.info.get('album') else ""
-            artist_old = artist
-            track_old = track
-            print(f"\nTrack:\t\t\t\t{artist} - {track}")
-            if album:
-                print(f"Album:\t\t\t\t{album}")
-
-            track_duration, sp_track_uri_id, duration_mark = get_track_info(artist, track, album, network)
-
-            if track_duration > 0:
-                print(f"Duration:\t\t\t{display_time(track_duration)}{duration_mark}")
-
-            spotify_search_url, apple_search_url, genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, lastfm_url, lastfm_album_url = get_spotify_apple_genius_search_urls(str(artist), str(track), album, network, new_track)
+            recent_tracks_future = startup_executor.submit(lastfm_get_recent_tracks, username, network, RECENT_TRACKS_NUMBER)
+            now_playing_future = startup_executor.submit(user.get_now_playing)
+
+        friends_startup_future = None
+        if TRACK_FOLLOWINGS or TRACK_FOLLOWERS:
+            # Existing state is loaded before the initial check saves the new one
+            followings_file_exists = friends_state_exists(username, 'followings')
+            followers_file_exists = friends_state_exists(username, 'followers')
+            followings_count = len(load_friends_state(username, 'followings')) if TRACK_FOLLOWINGS and followings_file_exists else 0
+            followers_count = len(load_friends_state(username, 'followers')) if TRACK_FOLLOWERS and followers_file_exists else 0
+            # We use raise_on_error=True so initialization failures (e.g. scraping issues) are visible
+            friends_startup_future = startup_executor.submit(check_friends_changes, username, TRACK_FOLLOWINGS, TRACK_FOLLOWERS, save_state=True, raise_on_error=True)
 
-            music_urls_output = format_music_urls_console(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
-            lyrics_output = format_lyrics_urls_console(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
-            if music_urls_output or lyrics_output:
-                print()  # Always add newline before first section (music URLs or lyrics)
-            if music_urls_output:
-                print(music_urls_output)
-            if lyrics_output:
-                print(lyrics_output)
+        if not connectivity_ok():
+            sys.exit(1)
 
-            print("\n*** User is currently ACTIVE !")
+        try:
+            if now_playing_future is None:
+                recent_tracks, new_track = recent_tracks_future.result(timeout=max(0, startup_deadline_ts - time.time()))
+            else:
+                recent_tracks = recent_tracks_future.result(timeout=max(0, startup_deadline_ts - time.time()))
+                new_track = now_playing_future.result(timeout=max(0, startup_deadline_ts - time.time()))
+        except FuturesTimeoutError:
+            print(f"* Error: Last.fm did not respond within {display_time(STARTUP_TIMEOUT)}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"* Error: {e}")
+            sys.exit(1)
 
-            listened_songs = 1
-            recent_songs_session = [{'artist': artist, 'track': track, 'timestamp': lf_track_ts_start, 'skipped': False, 'cont': False}]
+        # Handle case where user has no tracks yet (fresh account)
+        if not recent_tracks or len(recent_tracks) == 0:
+            print("\n*** User has no tracks yet (fresh account). Waiting for first track to appear...\n")
+            last_track_start_ts_old2 = 0
+            lf_track_ts_start_old = 0
+            last_track_start_ts_old = 0
 
-            last_activity_to_save = []
-            last_activity_to_save.append(lf_track_ts_start)
-            last_activity_to_save.append(artist)
-            last_activity_to_save.append(track)
-            last_activity_to_save.append(album)
+            # If user is currently playing music but has no history yet, handle it
+            if new_track is not None:
+                app_started_and_user_offline = False
+                lf_active_ts_start = int(time.time())
+                lf_active_ts_last = lf_active_ts_start
+                lf_track_ts_start = lf_active_ts_start
+                lf_track_ts_start_after_resume = lf_active_ts_start
+                playing_resumed_ts = lf_active_ts_start
+                song_on_loop = 1
+                artist = str(new_track.artist)
+                track = str(new_track.title)
+                album = str(new_track.info.get('album', '')) if new_track.info.get('album') else ""
+                artist_old = artist
+                track_old = track
+                last_activity_artist = artist
+                last_activity_track = track
+                playing_track = new_track
+                lf_user_online = True
+                debug_print(f"{username} is now ONLINE (initial track)")
+                print(f"\nTrack:\t\t\t\t{artist} - {track}")
+                if album:
+                    print(f"Album:\t\t\t\t{album}")
+
+                track_duration, sp_track_uri_id, duration_mark = startup_track_info(artist, track, album)
+
+                if track_duration > 0:
+                    print(f"Duration:\t\t\t{display_time(track_duration)}{duration_mark}")
+
+                spotify_search_url, apple_search_url, genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, lastfm_url, lastfm_album_url = get_spotify_apple_genius_search_urls(str(artist), str(track), album, network, playing_track)
+
+                music_urls_output = format_music_urls_console(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
+                lyrics_output = format_lyrics_urls_console(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
+                if music_urls_output or lyrics_output:
+                    print()  # Always add newline before first section (music URLs or lyrics)
+                if music_urls_output:
+                    print(music_urls_output)
+                if lyrics_output:
+                    print(lyrics_output)
+
+                print("\n*** User is currently ACTIVE (first track) !")
+
+                listened_songs = 1
+                recent_songs_session = [{'artist': artist, 'track': track, 'timestamp': lf_track_ts_start, 'skipped': False, 'cont': False}]
+
+                last_activity_to_save = []
+                last_activity_to_save.append(lf_track_ts_start)
+                last_activity_to_save.append(artist)
+                last_activity_to_save.append(track)
+                last_activity_to_save.append(album)
+
+                save_last_activity(username, last_activity_to_save)
 
-            try:
-                with open(lastfm_last_activity_file, 'w', encoding="utf-8") as f:
-                    json.dump(last_activity_to_save, f, indent=2)
-            except Exception as e:
-                print(f"* Cannot save last status to '{lastfm_last_activity_file}' file: {e}")
+                try:
+                    if csv_file_name:
+                        write_csv_entry(csv_file_name, datetime.fromtimestamp(int(lf_track_ts_start)), artist, track, album)
+                except Exception as e:
+                    print(f"* Error: {e}")
+
+                duration_m_body = ""
+                duration_m_body_html = ""
+                if track_duration > 0:
+                    duration_m_body = f"\nDuration: {display_time(track_duration)}{duration_mark}"
+                    duration_m_body_html = f"<br>Duration: {display_time(track_duration)}{duration_mark}"
+
+                m_subject = f"Last.fm user {username} is active: '{artist} - {track}'"
+                lyrics_urls_text = format_lyrics_urls_email_text(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
+                lyrics_urls_html = format_lyrics_urls_email_html(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, artist, track)
+                lyrics_section_text = f"\n{lyrics_urls_text}\n\n" if lyrics_urls_text else "\n\n"
+                lyrics_section_html = f"<br>{lyrics_urls_html}<br><br>" if lyrics_urls_html else "<br><br>"
+                # Determine URLs for "Track:" and secondary URL field based on configuration
+                if USE_LASTFM_URL_IN_LAST_PLAYED:
+                    track_url = lastfm_url
+                    secondary_url = spotify_search_url
+                    secondary_url_label = "Spotify URL"
+                else:
+                    track_url = spotify_search_url
+                    secondary_url = lastfm_url
+                    secondary_url_label = "Last.fm URL"
+                music_urls_text = format_music_urls_email_text(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
+                music_urls_html = format_music_urls_email_html(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, artist, track, secondary_url, secondary_url_label)
+                music_section_text = f"\n\n{music_urls_text}\n" if music_urls_text else "\n"
+                music_section_html = f"<br><br>{music_urls_html}" if music_urls_html else ""
+                # When both music and lyrics are empty, use single <br><br> instead of <br> + <br><br>
+                if not music_urls_html and not lyrics_urls_html:
+                    music_section_html = "<br><br>"
+                    lyrics_section_html = ""
+                elif not music_urls_html:
+                    music_section_html = "<br>"
+                album_line = f"Album: {album}" if album else ""
+                m_body = f"Track: {artist} - {track}{duration_m_body}\n{album_line}{music_section_text}{lyrics_section_text}Last activity: {get_date_from_ts(lf_active_ts_last)}{get_cur_ts(nl_ch + 'Timestamp: ')}"
+                album_html = f'<a href="{lastfm_album_url}">{escape(album)}</a>' if (ENABLE_LASTFM_ALBUM_URL and lastfm_album_url) else escape(album)
+                album_html_line = f"<br>Album: {album_html}" if album else ""
+                m_body_html = f"<html><head></head><body>Track: <b><a href=\"{track_url}\">{escape(artist)} - {escape(track)}</a></b>{duration_m_body_html}{album_html_line}{music_section_html}{lyrics_section_html}Last activity: <b>{get_date_from_ts(lf_active_ts_last)}</b>{get_cur_ts('<br>Timestamp: ')}</body></html>"
+
+                if ACTIVE_NOTIFICATION:
+                    print(f"Sending email notification to {RECEIVER_EMAIL}")
+                    send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
+
+                # If tracking functionality is enabled then play the current song via Spotify client
+                if TRACK_SONGS and sp_track_uri_id:
+                    if platform.system() == 'Darwin':       # macOS
+                        spotify_macos_play_song(sp_track_uri_id)
+                    elif platform.system() == 'Windows':    # Windows
+                        spotify_win_play_song(sp_track_uri_id)
+                    else:                                   # Linux variants
+                        spotify_linux_play_song(sp_track_uri_id)
+            else:
+                app_started_and_user_offline = True
+                playing_track = None
+                lf_user_online = False
+                lf_active_ts_last = 0
+                last_activity_artist = ""
+                last_activity_track = ""
+                artist_old = ""
+                track_old = ""
+                print(f"* Last activity:\t\tNo tracks yet")
+                print(f"* Last track:\t\t\tNo tracks yet")
+                print(f"\n*** User is OFFLINE (no tracks yet) !")
+        else:
+            last_track_start_ts_old2 = int(recent_tracks[0].timestamp)
+            lf_track_ts_start_old = last_track_start_ts_old2
 
-            try:
-                if csv_file_name:
-                    write_csv_entry(csv_file_name, datetime.fromtimestamp(int(lf_track_ts_start)), artist, track, album)
-            except Exception as e:
-                print(f"* Error: {e}")
+            # User is offline (does not play music at the moment)
+            if new_track is None:
+                app_started_and_user_offline = True
+                playing_track = None
+                last_track_start_ts_old = 0
+                lf_user_online = False
+                lf_active_ts_last = int(recent_tracks[0].timestamp)
+                if lf_active_ts_last >= last_activity_ts:
+                    last_activity_artist = recent_tracks[0].track.artist
+                    last_activity_track = recent_tracks[0].track.title
+                    if recent_tracks[0].album:
+                        last_activity_album = str(recent_tracks[0].album)
+                elif lf_active_ts_last < last_activity_ts and last_activity_ts > 0:
+                    lf_active_ts_last = last_activity_ts
+
+                last_activity_dt = datetime.fromtimestamp(lf_active_ts_last).strftime("%d %b %Y, %H:%M:%S")
+                last_activity_ts_weekday = str(calendar.day_abbr[(datetime.fromtimestamp(lf_active_ts_last)).weekday()])
+
+                artist_old = str(last_activity_artist)
+                track_old = str(last_activity_track)
+
+                print(f"* Last activity:\t\t{last_activity_ts_weekday} {last_activity_dt}")
+                print(f"* Last track:\t\t\t{last_activity_artist} - {last_activity_track}")
+                if last_activity_album:
+                    print(f"* Last album:\t\t\t{last_activity_album}")
+
+                track_duration, sp_track_uri_id, duration_mark = startup_track_info(last_activity_artist, last_activity_track, last_activity_album)
+
+                if track_duration > 0:
+                    print(f"* Last track duration:\t\t{display_time(track_duration)}{duration_mark}")
+
+                spotify_search_url, apple_search_url, genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, lastfm_url, lastfm_album_url = get_spotify_apple_genius_search_urls(str(last_activity_artist), str(last_activity_track), last_activity_album, network)
+
+                music_urls_output = format_music_urls_console(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
+                lyrics_output = format_lyrics_urls_console(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
+                if music_urls_output or lyrics_output:
+                    print()  # Always add newline before first section (music URLs or lyrics)
+                if music_urls_output:
+                    print(music_urls_output)
+                if lyrics_output:
+                    print(f"{lyrics_output}\n")
+                elif not music_urls_output:
+                    print()  # Add newline before "User is OFFLINE" when both music and lyrics are disabled
+                elif music_urls_output:
+                    print()  # Add newline after music URLs when lyrics are disabled
+
+                print(f"*** User is OFFLINE for {calculate_timespan(int(time.time()), lf_active_ts_last, show_seconds=False)} !")
 
-            duration_m_body = ""
-            duration_m_body_html = ""
-            if track_duration > 0:
-                duration_m_body = f"\nDuration: {display_time(track_duration)}{duration_mark}"
-                duration_m_body_html = f"<br>Duration: {display_time(track_duration)}{duration_mark}"
-
-            m_subject = f"Last.fm user {username} is active: '{artist} - {track}'"
-            lyrics_urls_text = format_lyrics_urls_email_text(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
-            lyrics_urls_html = format_lyrics_urls_email_html(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, artist, track)
-            lyrics_section_text = f"\n{lyrics_urls_text}\n\n" if lyrics_urls_text else "\n\n"
-            lyrics_section_html = f"<br>{lyrics_urls_html}<br><br>" if lyrics_urls_html else "<br><br>"
-            # Determine URLs for "Track:" and secondary URL field based on configuration
-            if USE_LASTFM_URL_IN_LAST_PLAYED:
-                track_url = lastfm_url
-                secondary_url = spotify_search_url
-                secondary_url_label = "Spotify URL"
-            else:
-                track_url = spotify_search_url
-                secondary_url = lastfm_url
-                secondary_url_label = "Last.fm URL"
-            music_urls_text = format_music_urls_email_text(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
-            music_urls_html = format_music_urls_email_html(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, artist, track, secondary_url, secondary_url_label)
-            music_section_text = f"\n\n{music_urls_text}\n" if music_urls_text else "\n"
-            music_section_html = f"<br><br>{music_urls_html}" if music_urls_html else ""
-            # When both music and lyrics are empty, use single <br><br> instead of <br> + <br><br>
-            if not music_urls_html and not lyrics_urls_html:
-                music_section_html = "<br><br>"
-                lyrics_section_html = ""
-            elif not music_urls_html:
-                music_section_html = "<br>"
-            album_line = f"Album: {album}" if album else ""
-            m_body = f"Track: {artist} - {track}{duration_m_body}\n{album_line}{music_section_text}{lyrics_section_text}Last activity: {get_date_from_ts(lf_active_ts_last)}{get_cur_ts(nl_ch + 'Timestamp: ')}"
-            album_html = f'<a href="{lastfm_album_url}">{escape(album)}</a>' if (ENABLE_LASTFM_ALBUM_URL and lastfm_album_url) else escape(album)
-            album_html_line = f"<br>Album: {album_html}" if album else ""
-            m_body_html = f"<html><head></head><body>Track: <b><a href=\"{track_url}\">{escape(artist)} - {escape(track)}</a></b>{duration_m_body_html}{album_html_line}{music_section_html}{lyrics_section_html}Last activity: <b>{get_date_from_ts(lf_active_ts_last)}</b>{get_cur_ts('<br>Timestamp: ')}</body></html>"
-
-            if ACTIVE_NOTIFICATION:
-                print(f"Sending email notification to {RECEIVER_EMAIL}")
-                send_email(m_subject, m_body, m_body_html, SMTP_SSL)
-
-            playing_track = new_track
-            # If user has tracks, use the first one's timestamp, otherwise use current time
-            if recent_tracks and len(recent_tracks) > 0:
-                last_track_start_ts_old = int(recent_tracks[0].timestamp)
+            # User is online (plays music at the moment)
             else:
-                last_track_start_ts_old = lf_active_ts_start
-            lf_user_online = True
-
-            # If tracking functionality is enabled then play the current song via Spotify client
-            # Only play when user is online and actively playing
-            if TRACK_SONGS and sp_track_uri_id:
-                if platform.system() == 'Darwin':       # macOS
-                    spotify_macos_play_song(sp_track_uri_id)
-                elif platform.system() == 'Windows':    # Windows
-                    spotify_win_play_song(sp_track_uri_id)
-                else:                                   # Linux variants
-                    spotify_linux_play_song(sp_track_uri_id)
-
-    i = 0
-    p = 0
-    duplicate_entries = False
-    print("\nList of recently listened tracks:\n")
-    if not recent_tracks or len(recent_tracks) == 0:
-        print("(No tracks yet)")
-    else:
-        for previous, t, nxt in previous_and_next(reversed(recent_tracks)):
-            i += 1
-            print(f'{i}\t{datetime.fromtimestamp(int(t.timestamp)).strftime("%d %b %Y, %H:%M:%S")}\t{calendar.day_abbr[(datetime.fromtimestamp(int(t.timestamp))).weekday()]}\t{t.track}')
-            if previous:
-                if previous.timestamp == t.timestamp:
-                    p += 1
-                    duplicate_entries = True
-                    print("DUPLICATE ENTRY")
+                app_started_and_user_offline = False
+                lf_active_ts_start = int(time.time())
+                lf_active_ts_last = lf_active_ts_start
+                lf_track_ts_start = lf_active_ts_start
+                lf_track_ts_start_after_resume = lf_active_ts_start
+                playing_resumed_ts = lf_active_ts_start
+                song_on_loop = 1
+                artist = str(new_track.artist)
+                track = str(new_track.title)
+                album = str(new_track.info.get('album', '')) if new_track.info.get('album') else ""
+                artist_old = artist
+                track_old = track
+                print(f"\nTrack:\t\t\t\t{artist} - {track}")
+                if album:
+                    print(f"Album:\t\t\t\t{album}")
+
+                track_duration, sp_track_uri_id, duration_mark = startup_track_info(artist, track, album)
+
+                if track_duration > 0:
+                    print(f"Duration:\t\t\t{display_time(track_duration)}{duration_mark}")
+
+                spotify_search_url, apple_search_url, genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, lastfm_url, lastfm_album_url = get_spotify_apple_genius_search_urls(str(artist), str(track), album, network, new_track)
+
+                music_urls_output = format_music_urls_console(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
+                lyrics_output = format_lyrics_urls_console(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
+                if music_urls_output or lyrics_output:
+                    print()  # Always add newline before first section (music URLs or lyrics)
+                if music_urls_output:
+                    print(music_urls_output)
+                if lyrics_output:
+                    print(lyrics_output)
+
+                print("\n*** User is currently ACTIVE !")
+
+                listened_songs = 1
+                recent_songs_session = [{'artist': artist, 'track': track, 'timestamp': lf_track_ts_start, 'skipped': False, 'cont': False}]
+
+                last_activity_to_save = []
+                last_activity_to_save.append(lf_track_ts_start)
+                last_activity_to_save.append(artist)
+                last_activity_to_save.append(track)
+                last_activity_to_save.append(album)
+
+                save_last_activity(username, last_activity_to_save)
+
+                try:
+                    if csv_file_name:
+                        write_csv_entry(csv_file_name, datetime.fromtimestamp(int(lf_track_ts_start)), artist, track, album)
+                except Exception as e:
+                    print(f"* Error: {e}")
+
+                duration_m_body = ""
+                duration_m_body_html = ""
+                if track_duration > 0:
+                    duration_m_body = f"\nDuration: {display_time(track_duration)}{duration_mark}"
+                    duration_m_body_html = f"<br>Duration: {display_time(track_duration)}{duration_mark}"
+
+                m_subject = f"Last.fm user {username} is active: '{artist} - {track}'"
+                lyrics_urls_text = format_lyrics_urls_email_text(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url)
+                lyrics_urls_html = format_lyrics_urls_email_html(genius_search_url, azlyrics_search_url, tekstowo_search_url, musixmatch_search_url, lyrics_com_search_url, artist, track)
+                lyrics_section_text = f"\n{lyrics_urls_text}\n\n" if lyrics_urls_text else "\n\n"
+                lyrics_section_html = f"<br>{lyrics_urls_html}<br><br>" if lyrics_urls_html else "<br><br>"
+                # Determine URLs for "Track:" and secondary URL field based on configuration
+                if USE_LASTFM_URL_IN_LAST_PLAYED:
+                    track_url = lastfm_url
+                    secondary_url = spotify_search_url
+                    secondary_url_label = "Spotify URL"
+                else:
+                    track_url = spotify_search_url
+                    secondary_url = lastfm_url
+                    secondary_url_label = "Last.fm URL"
+                music_urls_text = format_music_urls_email_text(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url)
+                music_urls_html = format_music_urls_email_html(spotify_search_url, lastfm_url, lastfm_album_url, apple_search_url, youtube_music_search_url, amazon_music_search_url, deezer_search_url, tidal_search_url, artist, track, secondary_url, secondary_url_label)
+                music_section_text = f"\n\n{music_urls_text}\n" if music_urls_text else "\n"
+                music_section_html = f"<br><br>{music_urls_html}" if music_urls_html else ""
+                # When both music and lyrics are empty, use single <br><br> instead of <br> + <br><br>
+                if not music_urls_html and not lyrics_urls_html:
+                    music_section_html = "<br><br>"
+                    lyrics_section_html = ""
+                elif not music_urls_html:
+                    music_section_html = "<br>"
+                album_line = f"Album: {album}" if album else ""
+                m_body = f"Track: {artist} - {track}{duration_m_body}\n{album_line}{music_section_text}{lyrics_section_text}Last activity: {get_date_from_ts(lf_active_ts_last)}{get_cur_ts(nl_ch + 'Timestamp: ')}"
+                album_html = f'<a href="{lastfm_album_url}">{escape(album)}</a>' if (ENABLE_LASTFM_ALBUM_URL and lastfm_album_url) else escape(album)
+                album_html_line = f"<br>Album: {album_html}" if album else ""
+                m_body_html = f"<html><head></head><body>Track: <b><a href=\"{track_url}\">{escape(artist)} - {escape(track)}</a></b>{duration_m_body_html}{album_html_line}{music_section_html}{lyrics_section_html}Last activity: <b>{get_date_from_ts(lf_active_ts_last)}</b>{get_cur_ts('<br>Timestamp: ')}</body></html>"
+
+                if ACTIVE_NOTIFICATION:
+                    print(f"Sending email notification to {RECEIVER_EMAIL}")
+                    send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
+
+                playing_track = new_track
+                # If user has tracks, use the first one's timestamp, otherwise use current time
+                if recent_tracks and len(recent_tracks) > 0:
+                    last_track_start_ts_old = int(recent_tracks[0].timestamp)
+                else:
+                    last_track_start_ts_old = lf_active_ts_start
+                lf_user_online = True
+
+                # If tracking functionality is enabled then play the current song via Spotify client
+                # Only play when user is online and actively playing
+                if TRACK_SONGS and sp_track_uri_id:
+                    if platform.system() == 'Darwin':       # macOS
+                        spotify_macos_play_song(sp_track_uri_id)
+                    elif platform.system() == 'Windows':    # Windows
+                        spotify_win_play_song(sp_track_uri_id)
+                    else:                                   # Linux variants
+                        spotify_linux_play_song(sp_track_uri_id)
+
+        i = 0
+        p = 0
+        duplicate_entries = False
+        print("\nList of recently listened tracks:\n")
+        if not recent_tracks or len(recent_tracks) == 0:
+            print("(No tracks yet)")
+        else:
+            for previous, t, nxt in previous_and_next(reversed(recent_tracks)):
+                i += 1
+                print(f'{i}\t{datetime.fromtimestamp(int(t.timestamp)).strftime("%d %b %Y, %H:%M:%S")}\t{calendar.day_abbr[(datetime.fromtimestamp(int(t.timestamp))).weekday()]}\t{t.track}')
+                if previous:
+                    if previous.timestamp == t.timestamp:
+                        p += 1
+                        duplicate_entries = True
+                        print("DUPLICATE ENTRY")
 
-    if duplicate_entries:
-        print(f"*** Duplicate entries ({p}) found, possible PRIVATE MODE")
+        if duplicate_entries:
+            print(f"*** Duplicate entries ({p}) found, possible PRIVATE MODE")
 
-    print(f"\nTracks/albums to monitor: {tracks}")
+        print(f"\nTracks/albums to monitor: {tracks}")
 
-    print_cur_ts("\nTimestamp:\t\t\t")
+        print_cur_ts("\nTimestamp:\t\t\t")
 
-    email_sent = False
+        # Initialize friends/followers tracking if enabled
+        if TRACK_FOLLOWINGS or TRACK_FOLLOWERS:
+            print(f"* Friends/followers tracking enabled")
+
+            # Initial check was started together with the first Last.fm requests
+            try:
+                if TRACK_FOLLOWINGS and followings_file_exists:
+                    print(f"* Loading followings for user {username} from {friends_state_location(username, 'followings')} ({followings_count})")
+
+                if TRACK_FOLLOWERS and followers_file_exists:
+                    print(f"* Loading followers for user {username} from {friends_state_location(username, 'followers')} ({followers_count})")
+
+                # Wait for the initial check building the baseline
+                initial_changes, _ = friends_startup_future.result(timeout=max(0, startup_deadline_ts - time.time()))
+
+                # Announce baseline creation for missing files
+                if TRACK_FOLLOWINGS and not followings_file_exists:
+                    if friends_state_exists(username, 'followings'):
+                        followings_count = len(load_friends_state(username, 'followings'))
+                        print(f"* Saving followings for user {username} to {friends_state_location(username, 'followings')} ({followings_count})")
+
+                if TRACK_FOLLOWERS and not followers_file_exists:
+                    if friends_state_exists(username, 'followers'):
+                        followers_count = len(load_friends_state(username, 'followers'))
+                        print(f"* Saving followers for user {username} to {friends_state_location(username, 'followers')} ({followers_count})")
+
+                # Only notify if there are real changes (not initial fetch/baseline build)
+                if initial_changes:
+                    # Filter out initial additions (baseline) from notification
+                    to_notify = {}
+                    if 'followings' in initial_changes and not followings_file_exists:
+                        pass # Handled by "Saving baseline" above
+                    elif 'followings' in initial_changes:
+                        to_notify['followings'] = initial_changes['followings']
+
+                    if 'followers' in initial_changes and not followers_file_exists:
+                        pass # Handled by "Saving baseline" above
+                    elif 'followers' in initial_changes:
+                        to_notify['followers'] = initial_changes['followers']
+
+                    if to_notify:
+                        notify_friends_changes(username, to_notify, skip_initial_line=True)
+                    else:
+                        # Baseline was built but no "real" changes to report
+                        print_cur_ts("\nTimestamp:\t\t\t")
+                else:
+                    # No changes detected during baseline build
+                    print_cur_ts("\nTimestamp:\t\t\t")
+            except FuturesTimeoutError:
+                print(f"* Warning: Initial friends check did not finish within {display_time(STARTUP_TIMEOUT)}")
+                print_cur_ts("\nTimestamp:\t\t\t")
+            except Exception as e:
+                print(f"* Warning: Initial friends check failed: {e}")
+                print_cur_ts("\nTimestamp:\t\t\t")
+
+            friends_check_last_ts = int(time.time())
+
+        # Hand the startup state over to the state machine
+        machine.restore({
+            'lf_active_ts_start': lf_active_ts_start,
+            'lf_active_ts_last': lf_active_ts_last,
+            'lf_track_ts_start': lf_track_ts_start,
+            'lf_track_ts_start_old': lf_track_ts_start_old,
+            'lf_track_ts_start_after_resume': lf_track_ts_start_after_resume,
+            'lf_user_online': lf_user_online,
+            'alive_counter': alive_counter,
+            'track_duration': track_duration,
+            'playing_paused': playing_paused,
+            'playing_paused_ts': playing_paused_ts,
+            'playing_resumed_ts': playing_resumed_ts,
+            'paused_counter': paused_counter,
+            'listened_songs': listened_songs,
+            'looped_songs': looped_songs,
+            'skipped_songs': skipped_songs,
+            'signal_previous_the_same': signal_previous_the_same,
+            'artist': artist,
+            'track': track,
+            'album': album,
+            'artist_old': artist_old,
+            'track_old': track_old,
+            'song_on_loop': song_on_loop,
+            'recent_songs_session': recent_songs_session,
+            'sp_track_uri_id': sp_track_uri_id,
+            'duration_mark': duration_mark,
+            'pauses_number': pauses_number,
+            'last_track_start_ts_old': last_track_start_ts_old,
+            'last_track_start_ts_old2': last_track_start_ts_old2,
+            'app_started_and_user_offline': app_started_and_user_offline,
+            'playing_track': playing_track,
+        })
+
+    # Returns the resumable part of the monitoring state, stored in checkpoints
+    def checkpoint_state():
+        state = machine.snapshot()
+        state['friends_check_last_ts'] = friends_check_last_ts
+        state['friends_pending_changes'] = friends_pending_changes
+        state['friends_streak'] = friends_streak
+        state['friends_next_check_ts'] = friends_next_check_ts
+        return state
+
+    checkpoint_saved_ts = int(time.time())
+    # Also checkpoint on exit (Ctrl+C, SIGTERM), so a restart continues exactly where we stopped
+    # The handler is replaced by a direct save when this monitoring session ends, so sessions restarted in the same process
+    # (supervisor mode) do not pile up handlers and an old session never overwrites the checkpoint of a newer one
+    def save_exit_checkpoint():
+        save_monitor_checkpoint(username, checkpoint_state())
+
+    if CHECKPOINT_INTERVAL > 0:
+        atexit.register(save_exit_checkpoint)
 
-    tracks_upper = {t.upper() for t in tracks}
+    # Main loop
 
-    # Initialize friends/followers tracking if enabled
+    # Friends checks run off the polling thread, so now-playing detection never waits for the (slow) scraping
+    friends_executor = None
+    friends_future = None
+    friends_check_ts = 0
+    friends_check_is_retry = False
     if TRACK_FOLLOWINGS or TRACK_FOLLOWERS:
-        print(f"* Friends/followers tracking enabled")
+        friends_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="friends_check")
 
-        # Do initial check
-        try:
-            followings_file_exists = os.path.isfile(f"lastfm_{username}_followings.json")
-            followers_file_exists = os.path.isfile(f"lastfm_{username}_followers.json")
+    settings_generation = SETTINGS_GENERATION
 
-            # Load existing state if available
-            if TRACK_FOLLOWINGS and followings_file_exists:
-                followings_loaded = load_friends_state(username, 'followings')
-                followings_count = len(followings_loaded)
-                print(f"* Loading followings for user {username} from file lastfm_{username}_followings.json ({followings_count})")
+    print(f"* Time to first poll:\t\t{time.time() - startup_ts:.2f}s")
+    print_cur_ts("Timestamp:\t\t\t")
 
-            if TRACK_FOLLOWERS and followers_file_exists:
-                followers_loaded = load_friends_state(username, 'followers')
-                followers_count = len(followers_loaded)
-                print(f"* Loading followers for user {username} from file lastfm_{username}_followers.json ({followers_count})")
+    # Offline entries waiting for their track details before the notification is sent
+    offline_batches = []
 
-            # Perform initial check to build baseline
-            # We use raise_on_error=True so initialization failures (e.g. scraping issues) are visible
-            initial_changes, _ = check_friends_changes(username, TRACK_FOLLOWINGS, TRACK_FOLLOWERS, save_state=True, raise_on_error=True)
-
-            # Announce baseline creation for missing files
-            if TRACK_FOLLOWINGS and not followings_file_exists:
-                if os.path.isfile(f"lastfm_{username}_followings.json"):
-                    followings_count = len(load_friends_state(username, 'followings'))
-                    print(f"* Saving followings for user {username} to file lastfm_{username}_followings.json ({followings_count})")
-
-            if TRACK_FOLLOWERS and not followers_file_exists:
-                if os.path.isfile(f"lastfm_{username}_followers.json"):
-                    followers_count = len(load_friends_state(username, 'followers'))
-                    print(f"* Saving followers for user {username} to file lastfm_{username}_followers.json ({followers_count})")
-
-            # Only notify if there are real changes (not initial fetch/baseline build)
-            if initial_changes:
-                # Filter out initial additions (baseline) from notification
-                to_notify = {}
-                if 'followings' in initial_changes and not followings_file_exists:
-                    pass # Handled by "Saving baseline" above
-                elif 'followings' in initial_changes:
-                    to_notify['followings'] = initial_changes['followings']
-
-                if 'followers' in initial_changes and not followers_file_exists:
-                    pass # Handled by "Saving baseline" above
-                elif 'followers' in initial_changes:
-                    to_notify['followers'] = initial_changes['followers']
-
-                if to_notify:
-                    notify_friends_changes(username, to_notify, skip_initial_line=True)
-                else:
-                    # Baseline was built but no "real" changes to report
-                    print_cur_ts("\nTimestamp:\t\t\t")
-            else:
-                # No changes detected during baseline build
-                print_cur_ts("\nTimestamp:\t\t\t")
-        except Exception as e:
-            print(f"* Warning: Initial friends check failed: {e}")
-            print_cur_ts("\nTimestamp:\t\t\t")
+    try:
+        while True:
+            # Time spent waiting for track details is taken from the sleep, so the polling cadence stays constant
+            enrichment_wait = 0
+            try:
+                # Settings changed at runtime (config reload, signals) are passed to the state machine
+                if settings_generation != SETTINGS_GENERATION:
+                    settings_generation = SETTINGS_GENERATION
+                    machine.configure(**{name: globals()[name] for name in MonitorStateMachine.SETTINGS})
+
+                # Offline entries notifications are sent once the track details are ready
+                for batch in [b for b in offline_batches if b.ready()]:
+                    offline_batches.remove(batch)
+                    m_subject, m_body, m_body_html = batch.notification(username)
+                    print(f"* Track details of {len(batch)} offline entries looked up")
+                    print(f"Sending email notification to {RECEIVER_EMAIL}")
+                    send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
+                    print_cur_ts("Timestamp:\t\t\t")
+
+                # Late track details are applied if the track is still playing
+                if pending_track_info and pending_track_info[0].done():
+                    track_info_future, pending_artist, pending_track = pending_track_info
+                    pending_track_info = None
+                    if machine.artist == pending_artist and machine.track == pending_track:
+                        track_duration, sp_track_uri_id, duration_mark = wait_track_info(track_info_future, 0)
+                        machine.set_track_info(track_duration, sp_track_uri_id, duration_mark)
+                        if track_duration > 0:
+                            print(f"* Duration of '{pending_artist} - {pending_track}':\t{display_time(track_duration)}{duration_mark}")
+                            print_cur_ts("Timestamp:\t\t\t")
 
-        friends_check_last_ts = int(time.time())
+                        # If tracking functionality is enabled then play the current song via Spotify client
+                        if TRACK_SONGS and sp_track_uri_id:
+                            if platform.system() == 'Darwin':       # macOS
+                                spotify_macos_play_song(sp_track_uri_id)
+                            elif platform.system() == 'Windows':    # Windows
+                                spotify_win_play_song(sp_track_uri_id)
+                            else:                                   # Linux variants
+                                spotify_linux_play_song(sp_track_uri_id)
+
+                # Check for friends/followers changes if enabled and interval has passed
+                if (TRACK_FOLLOWINGS or TRACK_FOLLOWERS) and FRIENDS_CHECK_INTERVAL > 0:
+                    current_ts = int(time.time())
+
+                    # Start a new check in the background if none is in progress
+                    if friends_future is None:
+                        # Determine if it's time for a regular check or a retry check
+                        do_check = False
+                        is_retry = False
+
+                        if friends_streak != 0:
+                            # We are in a confirmation/retry streak (change or error)
+                            if current_ts >= friends_next_check_ts:
+                                do_check = True
+                                is_retry = True
+                        elif (current_ts - friends_check_last_ts) >= FRIENDS_CHECK_INTERVAL:
+                            # Regular check interval reached
+                            do_check = True
+
+                        if do_check:
+                            debug_print(f"Starting background friends check (retry={is_retry})")
+                            # Use save_state=False by default to avoid saving to file during suspected transient changes
+                            # Use raise_on_error=True to detect check failures and avoid resetting streak
+                            friends_future = friends_executor.submit(check_friends_changes, username, TRACK_FOLLOWINGS, TRACK_FOLLOWERS, save_state=False, raise_on_error=True)
+                            friends_check_ts = current_ts
+                            friends_check_is_retry = is_retry
+
+                    # Process the result of a finished background check
+                    elif friends_future.done():
+                        friends_done_future = friends_future
+                        friends_future = None
+                        # Timestamps are relative to the moment the check was started
+                        current_ts = friends_check_ts
+                        is_retry = friends_check_is_retry
+                        try:
+                            # current_sets holds the exact sets we just scraped, so we can persist them without a second scrape (which could glitch and corrupt state)
+                            changes, current_sets = friends_done_future.result()
 
-    # Main loop
-    friends_pending_changes = None
-    friends_streak = 0
-    friends_next_check_ts = 0
+                            # Reset error streak on any successful check
+                            if friends_streak < 0:
+                                friends_streak = 0
 
-    while True:
-        try:
-            # Check for friends/followers changes if enabled and interval has passed
-            if (TRACK_FOLLOWINGS or TRACK_FOLLOWERS) and FRIENDS_CHECK_INTERVAL > 0:
-                current_ts = int(time.time())
-
-                # Determine if it's time for a regular check or a retry check
-                do_check = False
-                is_retry = False
-
-                if friends_streak != 0:
-                    # We are in a confirmation/retry streak (change or error)
-                    if current_ts >= friends_next_check_ts:
-                        do_check = True
-                        is_retry = True
-                elif (current_ts - friends_check_last_ts) >= FRIENDS_CHECK_INTERVAL:
-                    # Regular check interval reached
-                    do_check = True
-
-                if do_check:
-                    try:
-                        # Use save_state=False by default to avoid saving to file during suspected transient changes
-                        # Use raise_on_error=True to detect check failures and avoid resetting streak
-                        # current_sets holds the exact sets we just scraped, so we can persist them without a second scrape (which could glitch and corrupt state)
-                        changes, current_sets = check_friends_changes(username, TRACK_FOLLOWINGS, TRACK_FOLLOWERS,
-                                                     save_state=False, raise_on_error=True)
-
-                        # Reset error streak on any successful check
-                        if friends_streak < 0:
-                            friends_streak = 0
-
-                        if changes:
-                            if changes == friends_pending_changes:
-                                friends_streak += 1
+                            if changes:
+                                if changes == friends_pending_changes:
+                                    friends_streak += 1
+                                else:
+                                    friends_pending_changes = changes
+                                    friends_streak = 1
+
+                                if friends_streak >= FRIENDS_CHANGE_COUNTER:
+                                    # Final confirmation after enough checks; persist the exact sets we just scraped rather than re-fetching
+                                    for key in ('followings', 'followers'):
+                                        if key in current_sets:
+                                            save_friends_state(username, key, current_sets[key])
+                                    notify_friends_changes(username, changes, skip_initial_line=not PROGRESS_INDICATOR)
+                                    friends_streak = 0
+                                    friends_pending_changes = None
+                                    friends_check_last_ts = current_ts
+                                else:
+                                    # Suspected transient change, schedule retry
+                                    retry_interval = FRIENDS_RETRY_INTERVAL
+                                    friends_next_check_ts = current_ts + retry_interval
+
+                                    # Show streak info with details
+                                    change_details = []
+                                    for key in ['followings', 'followers']:
+                                        if key in changes:
+                                            c = changes[key]
+                                            diff = c['current_count'] - c['previous_count']
+                                            diff_str = f"{diff:+d}" if diff != 0 else "0"
+                                            change_details.append(f"{key}: {c['previous_count']} -> {c['current_count']} ({diff_str})")
+
+                                    detail_str = "; ".join(change_details)
+                                    print(f"* Suspected transient change ({detail_str}) (streak {friends_streak}/{FRIENDS_CHANGE_COUNTER}); will confirm in {display_time(retry_interval)}")
+                                    print_cur_ts("Timestamp:\t\t\t")
                             else:
-                                friends_pending_changes = changes
-                                friends_streak = 1
-
-                            if friends_streak >= FRIENDS_CHANGE_COUNTER:
-                                # Final confirmation after enough checks; persist the exact sets we just scraped rather than re-fetching
-                                for key in ('followings', 'followers'):
-                                    if key in current_sets:
-                                        save_friends_state(username, key, current_sets[key])
-                                notify_friends_changes(username, changes, skip_initial_line=not PROGRESS_INDICATOR)
+                                # No changes or back to baseline
+                                if friends_streak > 0:
+                                    # Recovered from a suspected change
+                                    print(f"* Friend/follower count recovered back to normal baseline after {friends_streak} suspected transient checks")
+                                    print_cur_ts("Timestamp:\t\t\t")
+
                                 friends_streak = 0
                                 friends_pending_changes = None
-                                friends_check_last_ts = current_ts
-                            else:
-                                # Suspected transient change, schedule retry
-                                retry_interval = FRIENDS_RETRY_INTERVAL
-                                friends_next_check_ts = current_ts + retry_interval
+                                if not is_retry:
+                                    friends_check_last_ts = current_ts
+                                    # Persist the scraped sets to refresh the baseline file timestamp; reuse what we just fetched instead of re-scraping (which could glitch and overwrite state)
+                                    for key in ('followings', 'followers'):
+                                        if key in current_sets:
+                                            save_friends_state(username, key, current_sets[key])
+                        except Exception as e:
+                            if friends_streak == 0:
+                                # Start measuring error streak (negative values)
+                                friends_streak = -1
+                            elif friends_streak < 0:
+                                # Continue error streak
+                                friends_streak -= 1
 
-                                # Show streak info with details
-                                change_details = []
-                                for key in ['followings', 'followers']:
-                                    if key in changes:
-                                        c = changes[key]
-                                        diff = c['current_count'] - c['previous_count']
-                                        diff_str = f"{diff:+d}" if diff != 0 else "0"
-                                        change_details.append(f"{key}: {c['previous_count']} -> {c['current_count']} ({diff_str})")
-
-                                detail_str = "; ".join(change_details)
-                                print(f"* Suspected transient change ({detail_str}) (streak {friends_streak}/{FRIENDS_CHANGE_COUNTER}); will confirm in {display_time(retry_interval)}")
-                                print_cur_ts("Timestamp:\t\t\t")
-                        else:
-                            # No changes or back to baseline
                             if friends_streak > 0:
-                                # Recovered from a suspected change
-                                print(f"* Friend/follower count recovered back to normal baseline after {friends_streak} suspected transient checks")
+                                # We were tracking a change but hit an error
+                                retry_interval = FRIENDS_RETRY_INTERVAL
+                                friends_next_check_ts = current_ts + retry_interval
+                                print(f"* Error during friends check: {e}")
+                                print(f"* Preserving confirmation streak ({friends_streak}/{FRIENDS_CHANGE_COUNTER}) despite error; will retry in {display_time(retry_interval)}")
                                 print_cur_ts("Timestamp:\t\t\t")
+                            else:
+                                # Error streak logic (negative streak)
+                                current_error_streak = abs(friends_streak)
 
-                            friends_streak = 0
-                            friends_pending_changes = None
-                            if not is_retry:
-                                friends_check_last_ts = current_ts
-                                # Persist the scraped sets to refresh the baseline file timestamp; reuse what we just fetched instead of re-scraping (which could glitch and overwrite state)
-                                for key in ('followings', 'followers'):
-                                    if key in current_sets:
-                                        save_friends_state(username, key, current_sets[key])
-                    except Exception as e:
-                        if friends_streak == 0:
-                            # Start measuring error streak (negative values)
-                            friends_streak = -1
-                        elif friends_streak < 0:
-                            # Continue error streak
-                            friends_streak -= 1
-
-                        if friends_streak > 0:
-                            # We were tracking a change but hit an error
-                            retry_interval = FRIENDS_RETRY_INTERVAL
-                            friends_next_check_ts = current_ts + retry_interval
-                            print(f"* Error during friends check: {e}")
-                            print(f"* Preserving confirmation streak ({friends_streak}/{FRIENDS_CHANGE_COUNTER}) despite error; will retry in {display_time(retry_interval)}")
-                            print_cur_ts("Timestamp:\t\t\t")
-                        else:
-                            # Error streak logic (negative streak)
-                            current_error_streak = abs(friends_streak)
+                                # Throttling: Alert on threshold, then every 10 attempts
+                                if current_error_streak == FRIENDS_CHANGE_COUNTER or (current_error_streak > FRIENDS_CHANGE_COUNTER and (current_error_streak - FRIENDS_CHANGE_COUNTER) % 10 == 0):
+                                    print(f"* Error confirming friends (attempt {current_error_streak}): {e}")
+                                    print_cur_ts("Timestamp:\t\t\t")
 
-                            # Throttling: Alert on threshold, then every 10 attempts
-                            if current_error_streak == FRIENDS_CHANGE_COUNTER or (current_error_streak > FRIENDS_CHANGE_COUNTER and (current_error_streak - FRIENDS_CHANGE_COUNTER) % 10 == 0):
-                                print(f"* Error confirming friends (attempt {current_error_streak}): {e}")
-                                print_cur_ts("Timestamp:\t\t\t")
+                                retry_interval = FRIENDS_RETRY_INTERVAL
+                                friends_next_check_ts = current_ts + retry_interval
 
-                            retry_interval = FRIENDS_RETRY_INTERVAL
-                            friends_next_check_ts = current_ts + retry_interval
+                # Do not send requests while the Last.fm API circuit breaker is open, wait for the next probe instead
+                if not lastfm_breaker.allow():
+                    breaker_wait = min(max(int(lastfm_breaker.retry_in()), 1), LASTFM_CHECK_INTERVAL)
+                    debug_print(f"Last.fm API circuit breaker is {lastfm_breaker.state}, skipping check for {breaker_wait}s")
+                    time.sleep(breaker_wait)
+                    continue
 
-            debug_print(f"Fetching now playing / recent tracks...")
-            recent_tracks = lastfm_get_recent_tracks(username, network, 1)
-            # Handle case where user still has no tracks
-            if not recent_tracks or len(recent_tracks) == 0:
-                # Wait for first track to appear
-                time.sleep(LASTFM_ACTIVE_CHECK_INTERVAL)
-                continue
-            last_track_start_ts = int(recent_tracks[0].timestamp)
-            new_track = user.get_now_playing()
-            email_sent = False
+                debug_print(f"Fetching now playing / recent tracks...")
+                recent_tracks, new_track = lastfm_get_recent_tracks_and_now_playing(username, user, network, 1)
+                # Handle case where user still has no tracks
+                if not recent_tracks or len(recent_tracks) == 0:
+                    lastfm_breaker.record_success()
+                    # Wait for first track to appear
+                    time.sleep(LASTFM_ACTIVE_CHECK_INTERVAL)
+                    continue
+                last_track_start_ts = int(recent_tracks[0].timestamp)
+                email_sent = False
+
+                outage = lastfm_breaker.record_success()
+                if outage:
+                    print(f"* Last.fm API is available again after {display_time(outage)}")
+                    print_cur_ts("Timestamp:\t\t\t")
 
-            lf_current_ts = int(time.time()) - LASTFM_ACTIVE_CHECK_INTERVAL
+                events = machine.observe(int(time.time()), last_track_start_ts, new_track)
+                ev = {event['type']: event for event in events}
 
-            # Detecting new Last.fm entries when user is offline
-            if not lf_user_online:
-                # If this is the first track appearing (user had no tracks before)
-                if last_track_start_ts_old2 == 0:
+                if 'first_track' in ev:
                     debug_print("First track appeared!")
                     print("\n*** First track appeared! Starting monitoring...\n")
-                    last_track_start_ts_old2 = last_track_start_ts
-                    lf_track_ts_start_old = last_track_start_ts
-                if last_track_start_ts > last_track_start_ts_old2:
-                    debug_print(f"Detected new entries while offline ({last_track_start_ts} > {last_track_start_ts_old2})")
+
+                # New Last.fm entries showed up when user was offline
+                if 'offline_entries' in ev:
+                    since_ts = ev['offline_entries']['since_ts']
+                    skip_ref_ts = ev['offline_entries']['skip_ref_ts']
+                    debug_print(f"Detected new entries while offline ({last_track_start_ts} > {since_ts})")
                     print("\n*** New last.fm entries showed up while user was offline!\n")
-                    lf_track_ts_start_old = last_track_start_ts
                     duplicate_entries = False
                     i = 0
-                    added_entries_list = ""
+                    offline_entries = []
                     try:
                         recent_tracks_while_offline = lastfm_get_recent_tracks(username, network, 100)
                         for previous, t, nxt in previous_and_next(reversed(recent_tracks_while_offline)):
-                            if int(t.timestamp) > int(last_track_start_ts_old2):
-                                if 0 <= (lf_track_ts_start + LASTFM_ACTIVE_CHECK_INTERVAL - int(t.timestamp)) <= 60:
+                            if int(t.timestamp) > int(since_ts):
+                                if 0 <= (skip_ref_ts - int(t.timestamp)) <= 60:
                                     continue
                                 print(f'{datetime.fromtimestamp(int(t.timestamp)).strftime("%d %b %Y, %H:%M:%S")}\t{calendar.day_abbr[(datetime.fromtimestamp(int(t.timestamp))).weekday()]}\t{t.track}')
-                                added_entries_list += f'{datetime.fromtimestamp(int(t.timestamp)).strftime("%d %b %Y, %H:%M:%S")}, {calendar.day_abbr[(datetime.fromtimestamp(int(t.timestamp))).weekday()]}: {t.track}\n'
+                                offline_entries.append((int(t.timestamp), str(t.track.artist), str(t.track.title), str(t.album) if t.album else ""))
                                 i += 1
                                 if previous:
                                     if previous.timestamp == t.timestamp:
@@ -2871,24 +5562,14 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                         print(f"* Error: {e}")
 
                     if i > 0 and OFFLINE_ENTRIES_NOTIFICATION:
-                        if added_entries_list:
-                            added_entries_list_mbody = f"\n\n{added_entries_list}"
-                        m_subject = f"Last.fm user {username}: new entries showed up while user was offline"
-                        m_body = f"New last.fm entries showed up while user was offline!{added_entries_list_mbody}{get_cur_ts(nl_ch + 'Timestamp: ')}"
-                        print(f"Sending email notification to {RECEIVER_EMAIL}")
-                        send_email(m_subject, m_body, "", SMTP_SSL)
+                        # The notification is sent by a later check, once track details of the entries are looked up
+                        offline_batches.append(OfflineEntriesBatch(offline_entries, network))
 
                     print_cur_ts("\nTimestamp:\t\t\t")
 
-            # User is online (plays music at the moment)
-            if new_track is not None:
-
-                # User paused music earlier
-                if playing_paused is True and lf_user_online:
-                    playing_resumed_ts = lf_current_ts
-                    lf_track_ts_start_after_resume += (playing_resumed_ts - playing_paused_ts)
-                    paused_counter += (int(playing_resumed_ts) - int(playing_paused_ts))
-                    print(f"User RESUMED playing after {calculate_timespan(int(playing_resumed_ts), int(playing_paused_ts))}")
+                # User RESUMED playing music after a pause
+                if 'resumed' in ev:
+                    print(f"User RESUMED playing after {calculate_timespan(int(ev['resumed']['resumed_ts']), int(ev['resumed']['paused_ts']))}")
                     print_cur_ts("\nTimestamp:\t\t\t")
 
                     # If tracking functionality is enabled then RESUME the current song via Spotify client
@@ -2900,104 +5581,23 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                         else:                                   # Linux variants
                             spotify_linux_play_pause("play")
 
-                playing_paused = False
-
-                # Trying to overcome the issue with Last.fm API reporting newly played song (but still continues the same)
-                if (lf_current_ts <= (lf_track_ts_start + 20)) and (last_track_start_ts > last_track_start_ts_old) and (new_track == playing_track):
-                    last_track_start_ts_old = last_track_start_ts
-
                 # Track has changed
-                if (new_track != playing_track or (last_track_start_ts > last_track_start_ts_old and last_track_start_ts > lf_track_ts_start_old - 20)):
-
-                    alive_counter = 0
-
-                    if new_track == playing_track:
-                        song_on_loop += 1
-                        if song_on_loop == SONG_ON_LOOP_VALUE:
-                            looped_songs += 1
-                    else:
-                        song_on_loop = 1
-
-                    playing_track = new_track
-                    artist = str(playing_track.artist)
-                    track = str(playing_track.title)
-                    album = str(playing_track.info.get('album', '')) if playing_track.info.get('album') else ""
-                    info = playing_track.info
+                if 'track_changed' in ev:
+                    playing_track = machine.playing_track
+                    artist = machine.artist
+                    track = machine.track
+                    album = machine.album
+                    listened_songs = machine.listened_songs
+                    song_on_loop = machine.song_on_loop
+                    lf_track_ts_start = machine.lf_track_ts_start
+                    lf_active_ts_start = machine.lf_active_ts_start
 
                     played_for_m_body = ""
                     played_for_m_body_html = ""
 
-                    # Handling how long user played the previous track, if skipped it etc. - in case track duration is available
-                    if track_duration > 0 and lf_track_ts_start_after_resume > 0 and lf_user_online:
-                        played_for_display = False
-                        played_for_time = lf_current_ts - lf_track_ts_start_after_resume
-
-                        listened_percentage = (played_for_time) / (track_duration - 1)
-
-                        if (played_for_time) < (track_duration - LASTFM_ACTIVE_CHECK_INTERVAL - 1):
-                            played_for = f"{display_time(played_for_time)} (out of {display_time(track_duration)})"
-                            played_for_html = f"<b>{display_time(played_for_time)}</b> (out of {display_time(track_duration)})"
-                            if listened_percentage <= SKIPPED_SONG_THRESHOLD2:
-                                if signal_previous_the_same:
-                                    played_for += f" - CONT ({int(listened_percentage * 100)}%)"
-                                    played_for_html += f" - <b>CONT</b> ({int(listened_percentage * 100)}%)"
-                                    signal_previous_the_same = False
-                                    # Mark previous track as CONT in recent_songs_session
-                                    if len(recent_songs_session) > 0 and recent_songs_session[-1]['artist'] == artist_old and recent_songs_session[-1]['track'] == track_old:
-                                        recent_songs_session[-1]['cont'] = True
-                                else:
-                                    played_for += f" - SKIPPED ({int(listened_percentage * 100)}%)"
-                                    played_for_html += f" - <b>SKIPPED</b> ({int(listened_percentage * 100)}%)"
-                                    skipped_songs += 1
-                                    # Mark previous track as skipped in recent_songs_session
-                                    if len(recent_songs_session) > 0 and recent_songs_session[-1]['artist'] == artist_old and recent_songs_session[-1]['track'] == track_old:
-                                        recent_songs_session[-1]['skipped'] = True
-                            else:
-                                played_for += f" ({int(listened_percentage * 100)}%)"
-                                played_for_html += f" ({int(listened_percentage * 100)}%)"
-                            played_for_display = True
-                        else:
-                            played_for = display_time(played_for_time)
-                            played_for_html = played_for
-                            if listened_percentage >= LONGER_SONG_THRESHOLD1 or (played_for_time - track_duration >= LONGER_SONG_THRESHOLD2):
-                                played_for += f" - LONGER than track duration (+ {display_time(played_for_time - track_duration)}, {int(listened_percentage * 100)}%)"
-                                played_for_html += f" - <b>LONGER</b> than track duration (+ {display_time(played_for_time - track_duration)}, {int(listened_percentage * 100)}%)"
-                                played_for_display = True
-
-                        if played_for_display:
-                            played_for_m_body = f"\n\nUser played the previous track ({artist_old} - {track_old}) for: {played_for}"
-                            played_for_m_body_html = f"<br><br>User played the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) for: {played_for_html}"
-                            if PROGRESS_INDICATOR:
-                                print("─" * HORIZONTAL_LINE)
-                            print(f"User played the previous track for: {played_for}")
-                            if not PROGRESS_INDICATOR:
-                                print("─" * HORIZONTAL_LINE)
-                    # Handling how long user played the previous track, if skipped it etc. - in case track duration is NOT available
-                    elif track_duration <= 0 and lf_track_ts_start_after_resume > 0 and lf_user_online:
-                        played_for = display_time(lf_current_ts - lf_track_ts_start_after_resume)
-                        played_for_html = f"<b>{display_time(lf_current_ts - lf_track_ts_start_after_resume)}</b>"
-                        if ((lf_current_ts - lf_track_ts_start_after_resume) <= SKIPPED_SONG_THRESHOLD1):
-                            if signal_previous_the_same:
-                                played_for_m_body = f"\n\nUser CONT the previous track ({artist_old} - {track_old}) for: {played_for}"
-                                played_for_m_body_html = f"<br><br>User <b>CONT</b> the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) for: {played_for_html}"
-                                played_for_str = f"User CONT the previous track for {played_for}"
-                                signal_previous_the_same = False
-                                # Mark previous track as CONT in recent_songs_session
-                                if len(recent_songs_session) > 0 and recent_songs_session[-1]['artist'] == artist_old and recent_songs_session[-1]['track'] == track_old:
-                                    recent_songs_session[-1]['cont'] = True
-                            else:
-                                skipped_songs += 1
-                                played_for_m_body = f"\n\nUser SKIPPED the previous track ({artist_old} - {track_old}) after: {played_for}"
-                                played_for_m_body_html = f"<br><br>User <b>SKIPPED</b> the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) after: {played_for_html}"
-                                played_for_str = f"User SKIPPED the previous track after {played_for}"
-                                # Mark previous track as skipped in recent_songs_session
-                                if len(recent_songs_session) > 0 and recent_songs_session[-1]['artist'] == artist_old and recent_songs_session[-1]['track'] == track_old:
-                                    recent_songs_session[-1]['skipped'] = True
-                        else:
-                            played_for_m_body = f"\n\nUser played the previous track ({artist_old} - {track_old}) for: {played_for}"
-                            played_for_m_body_html = f"<br><br>User played the previous track (<b>{escape(artist_old)} - {escape(track_old)}</b>) for: {played_for_html}"
-                            played_for_str = f"User played the previous track for: {played_for}"
-
+                    # Handling how long user played the previous track, if skipped it etc.
+                    if ev['track_changed']['previous']:
+                        played_for_str, played_for_m_body, played_for_m_body_html = format_played_for_previous(ev['track_changed']['previous'])
                         if PROGRESS_INDICATOR:
                             print("─" * HORIZONTAL_LINE)
                         print(played_for_str)
@@ -3009,36 +5609,23 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
 
                     print(f"Last.fm user:\t\t\t{username}\n")
 
-                    listened_songs += 1
-
-                    # Clearing the flag used to indicate CONT songs (continued from previous playing session)
-                    if listened_songs == 2:
-                        signal_previous_the_same = False
-
-                    if lf_track_ts_start > 0:
-                        lf_track_ts_start_old = lf_track_ts_start
-                    lf_track_ts_start = lf_current_ts
-                    lf_track_ts_start_after_resume = lf_track_ts_start
-                    last_track_start_ts_old = last_track_start_ts
-
-                    # Add current song to recent songs session list
-                    recent_songs_session.append({
-                        'artist': artist,
-                        'track': track,
-                        'timestamp': lf_track_ts_start,
-                        'skipped': False,
-                        'cont': False
-                    })
-                    # Keep only last INACTIVE_EMAIL_RECENT_SONGS_COUNT songs (or 5 if not set)
-                    max_songs = INACTIVE_EMAIL_RECENT_SONGS_COUNT if INACTIVE_EMAIL_RECENT_SONGS_COUNT > 0 else 5
-                    if len(recent_songs_session) > max_songs:
-                        recent_songs_session.pop(0)
-
                     print(f"Track:\t\t\t\t{artist} - {track}")
                     if album:
                         print(f"Album:\t\t\t\t{album}")
 
-                    track_duration, sp_track_uri_id, duration_mark = get_track_info(artist, track, album, network)
+                    # Detection does not wait for slow lookups longer than the deadline, late details are applied by a later check
+                    enrichment_start_ts = time.time()
+                    track_info_future = submit_track_info(artist, track, album, network)
+                    track_info = wait_track_info(track_info_future, ENRICHMENT_DEADLINE)
+                    enrichment_wait += time.time() - enrichment_start_ts
+                    if track_info is None:
+                        debug_print(f"Track details not ready within {ENRICHMENT_DEADLINE}s, continuing without them")
+                        pending_track_info = (track_info_future, artist, track)
+                        track_info = (0, None, "")
+                    else:
+                        pending_track_info = None
+                    track_duration, sp_track_uri_id, duration_mark = track_info
+                    machine.set_track_info(track_duration, sp_track_uri_id, duration_mark)
 
                     if track_duration > 0:
                         print(f"Duration:\t\t\t{display_time(track_duration)}{duration_mark}")
@@ -3059,11 +5646,7 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                     last_activity_to_save.append(artist)
                     last_activity_to_save.append(track)
                     last_activity_to_save.append(album)
-                    try:
-                        with open(lastfm_last_activity_file, 'w', encoding="utf-8") as f:
-                            json.dump(last_activity_to_save, f, indent=2)
-                    except Exception as e:
-                        print(f"* Cannot save last status to '{lastfm_last_activity_file}' file: {e}")
+                    save_last_activity(username, last_activity_to_save)
 
                     duration_m_body = ""
                     duration_m_body_html = ""
@@ -3081,17 +5664,14 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                             spotify_linux_play_song(sp_track_uri_id)
 
                     # User was offline and got active
-                    # Handle case where user had no tracks initially and is becoming active for the first time
-                    if (not lf_user_online and lf_active_ts_start == 0) or (not lf_user_online and (lf_track_ts_start - lf_active_ts_last) > LASTFM_INACTIVITY_CHECK and lf_active_ts_last > 0) or (not lf_user_online and lf_active_ts_last > 0 and app_started_and_user_offline):
-                        app_started_and_user_offline = False
+                    if 'active' in ev:
+                        lf_active_ts_last = ev['active']['active_ts_last']
+                        lf_active_ts_last_old = ev['active']['active_ts_last_old']
                         last_track_start_changed = ""
                         last_track_start_changed_html = ""
-                        lf_active_ts_last_old = lf_active_ts_last
-                        # If user had no tracks initially, lf_active_ts_last will be 0, so skip the check
-                        if lf_active_ts_last > 0 and last_track_start_ts > (lf_active_ts_last + 60) and (int(time.time()) - last_track_start_ts > 240):
-                            last_track_start_changed = f"\n(last track start changed from {get_short_date_from_ts(lf_active_ts_last)} to {get_short_date_from_ts(last_track_start_ts)} - offline mode ?)"
-                            last_track_start_changed_html = f"<br>(last track start changed from <b>{get_short_date_from_ts(lf_active_ts_last)}</b> to <b>{get_short_date_from_ts(last_track_start_ts)}</b> - offline mode ?)"
-                            lf_active_ts_last = last_track_start_ts
+                        if ev['active']['last_track_start_changed_from']:
+                            last_track_start_changed = f"\n(last track start changed from {get_short_date_from_ts(ev['active']['last_track_start_changed_from'])} to {get_short_date_from_ts(last_track_start_ts)} - offline mode ?)"
+                            last_track_start_changed_html = f"<br>(last track start changed from <b>{get_short_date_from_ts(ev['active']['last_track_start_changed_from'])}</b> to <b>{get_short_date_from_ts(last_track_start_ts)}</b> - offline mode ?)"
 
                         duplicate_entries = False
                         private_mode = ""
@@ -3117,19 +5697,6 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                             print(f"*** Last activity:\t\t{get_date_from_ts(lf_active_ts_last)}")
                         else:
                             print(f"\n*** User got ACTIVE (first track)")
-                        # We signal that the currently played song is the same as previous one before user got inactive, so might be continuation of previous track
-                        if artist_old == artist and track_old == track:
-                            signal_previous_the_same = True
-                        else:
-                            signal_previous_the_same = False
-                        paused_counter = 0
-                        listened_songs = 1
-                        skipped_songs = 0
-                        looped_songs = 0
-                        pauses_number = 0
-                        lf_active_ts_start = lf_track_ts_start
-                        playing_resumed_ts = lf_track_ts_start
-                        recent_songs_session = [{'artist': artist, 'track': track, 'timestamp': lf_track_ts_start, 'skipped': False, 'cont': False}]
                         # Handle email subject and body - only include timespan if user had previous activity
                         if lf_active_ts_last > 0:
                             m_subject = f"Last.fm user {username} is active: '{artist} - {track}' (after {calculate_timespan(int(lf_track_ts_start), int(lf_active_ts_last), show_seconds=False)} - {get_short_date_from_ts(lf_active_ts_last)})"
@@ -3188,7 +5755,7 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
 
                         if ACTIVE_NOTIFICATION:
                             print(f"Sending email notification to {RECEIVER_EMAIL}")
-                            send_email(m_subject, m_body, m_body_html, SMTP_SSL)
+                            send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
                             email_sent = True
 
                     if (TRACK_NOTIFICATION or SONG_NOTIFICATION) and not email_sent:
@@ -3230,12 +5797,12 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                         m_body_html = f"<html><head></head><body>Track: <b><a href=\"{track_url}\">{escape(artist)} - {escape(track)}</a></b>{duration_m_body_html}{album_html_line}{music_section_html}{lyrics_section_html}{played_for_m_body_html}{timespan_str_html}{get_cur_ts('<br><br>Timestamp: ')}</body></html>"
 
                     # Check for loop first, before track/song notifications
-                    if song_on_loop == SONG_ON_LOOP_VALUE:
+                    if 'loop' in ev:
                         print("─" * HORIZONTAL_LINE)
                         print(f"User plays song on LOOP ({song_on_loop} times)")
                         print("─" * HORIZONTAL_LINE)
 
-                    if song_on_loop == SONG_ON_LOOP_VALUE and SONG_ON_LOOP_NOTIFICATION:
+                    if 'loop' in ev and SONG_ON_LOOP_NOTIFICATION:
                         timespan_str = f"\n\nSongs Played: {listened_songs}"
                         timespan_str_html = f"<br><br>Songs Played: {listened_songs}"
                         # Only show timespan if lf_active_ts_start is properly set (not 0) and different from current track start
@@ -3273,29 +5840,26 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                         m_body = f"Track: {artist} - {track}{duration_m_body}\n{album_line}{music_section_text}{lyrics_section_text}{played_for_m_body}\n\nUser plays song on LOOP ({song_on_loop} times){timespan_str}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
                         m_body_html = f"<html><head></head><body>Track: <b><a href=\"{track_url}\">{escape(artist)} - {escape(track)}</a></b>{duration_m_body_html}{album_html_line}{music_section_html}{lyrics_section_html}{played_for_m_body_html}<br><br>User plays song on LOOP (<b>{song_on_loop}</b> times){timespan_str_html}{get_cur_ts('<br><br>Timestamp: ')}</body></html>"
                         print(f"Sending email notification to {RECEIVER_EMAIL}")
-                        send_email(m_subject, m_body, m_body_html, SMTP_SSL)
+                        send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
                         email_sent = True
 
                     # Send track/song notifications only if loop notification was not sent
-                    if track.upper() in tracks_upper or album.upper() in tracks_upper:
-                        print("\n*** Track/album matched with the list!")
+                    if WATCHLIST is not None:
+                        watchlist = WATCHLIST
+                    watchlist_entry = watchlist.match(artist, track, album)
+                    if watchlist_entry is not None:
+                        print(f"\n*** Track/album matched with the list! ({watchlist_entry})")
 
                         if TRACK_NOTIFICATION and not email_sent:
                             print(f"Sending email notification to {RECEIVER_EMAIL}")
-                            send_email(m_subject, m_body, m_body_html, SMTP_SSL)
+                            send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
                             email_sent = True
 
                     if SONG_NOTIFICATION and not email_sent:
                         print(f"Sending email notification to {RECEIVER_EMAIL}")
-                        send_email(m_subject, m_body, m_body_html, SMTP_SSL)
+                        send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
                         email_sent = True
 
-                    lf_user_online = True
-                    lf_active_ts_last = int(time.time())
-
-                    artist_old = artist
-                    track_old = track
-
                     try:
                         if csv_file_name:
                             write_csv_entry(csv_file_name, datetime.fromtimestamp(int(lf_track_ts_start)), artist, track, album)
@@ -3312,32 +5876,22 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                                 print(f"\nSongs Played:\t\t\t{listened_songs}")
 
                     print_cur_ts("\nTimestamp:\t\t\t")
-                # Track has not changed, user is online and continues playing
-                else:
-                    lf_active_ts_last = int(time.time())
-                    # We display progress indicator if flag is enabled
-                    if lf_user_online and PROGRESS_INDICATOR:
-                        ts = datetime.fromtimestamp(lf_active_ts_last).strftime('%H:%M:%S')
-                        delta_ts = lf_active_ts_last - lf_track_ts_start_after_resume
-                        if delta_ts > 0:
-                            delta_diff_str = "%02d:%02d:%02d" % (delta_ts // 3600, delta_ts // 60 % 60, delta_ts % 60)
-                        else:
-                            delta_diff_str = "00:00:00"
-                        print(f"# {ts} +{delta_diff_str}")
-            # User is offline (does not play music at the moment)
-            else:
-
-                alive_counter += 1
+                # Track has not changed, user is online and continues playing; we display progress indicator if flag is enabled
+                elif 'playing' in ev and PROGRESS_INDICATOR:
+                    ts = datetime.fromtimestamp(machine.lf_active_ts_last).strftime('%H:%M:%S')
+                    delta_ts = ev['playing']['elapsed']
+                    if delta_ts > 0:
+                        delta_diff_str = "%02d:%02d:%02d" % (delta_ts // 3600, delta_ts // 60 % 60, delta_ts % 60)
+                    else:
+                        delta_diff_str = "00:00:00"
+                    print(f"# {ts} +{delta_diff_str}")
 
                 # User paused playing the music
-                if ((int(time.time()) - lf_active_ts_last) > (LASTFM_ACTIVE_CHECK_INTERVAL * LASTFM_BREAK_CHECK_MULTIPLIER)) and lf_user_online and lf_active_ts_last > 0 and lf_active_ts_start > 0 and (LASTFM_ACTIVE_CHECK_INTERVAL * LASTFM_BREAK_CHECK_MULTIPLIER) < LASTFM_INACTIVITY_CHECK and LASTFM_BREAK_CHECK_MULTIPLIER > 0 and playing_paused is False:
-                    playing_paused = True
-                    playing_paused_ts = lf_active_ts_last
-                    pauses_number += 1
+                if 'paused' in ev:
                     if PROGRESS_INDICATOR:
                         print("─" * HORIZONTAL_LINE)
-                    print(f"User PAUSED playing after {calculate_timespan(int(playing_resumed_ts), int(playing_paused_ts))} (inactivity timer: {display_time(LASTFM_BREAK_CHECK_MULTIPLIER * LASTFM_ACTIVE_CHECK_INTERVAL)})")
-                    print(f"Last activity:\t\t\t{get_date_from_ts(lf_active_ts_last)}")
+                    print(f"User PAUSED playing after {calculate_timespan(int(ev['paused']['resumed_ts']), int(ev['paused']['paused_ts']))} (inactivity timer: {display_time(ev['paused']['break_interval'])})")
+                    print(f"Last activity:\t\t\t{get_date_from_ts(ev['paused']['paused_ts'])}")
                     print_cur_ts("\nTimestamp:\t\t\t")
                     # If tracking functionality is enabled then PAUSE the current song via Spotify client
                     if TRACK_SONGS:
@@ -3347,60 +5901,70 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                             pass
                         else:                                   # Linux variants
                             spotify_linux_play_pause("pause")
+
                 # User got inactive
-                if ((int(time.time()) - lf_active_ts_last) > LASTFM_INACTIVITY_CHECK) and lf_user_online and lf_active_ts_last > 0 and lf_active_ts_start > 0:
+                if 'inactive' in ev:
+                    inactive = ev['inactive']
+                    artist = inactive['artist']
+                    track = inactive['track']
+                    album = inactive['album']
+                    track_duration = inactive['track_duration']
+                    lf_active_ts_start = inactive['active_ts_start']
+                    lf_active_ts_last = inactive['active_ts_last']
+                    paused_counter = inactive['paused_counter']
+                    pauses_number = inactive['pauses_number']
+                    listened_songs = inactive['listened_songs']
+                    skipped_songs = inactive['skipped_songs']
+                    looped_songs = inactive['looped_songs']
+                    recent_songs_session = inactive['recent_songs']
 
-                    lf_user_online = False
+                    duration_m_body = ""
+                    duration_m_body_html = ""
+                    if track_duration > 0:
+                        duration_m_body = f"\nDuration: {display_time(track_duration)}{inactive['duration_mark']}"
+                        duration_m_body_html = f"<br>Duration: {display_time(track_duration)}{inactive['duration_mark']}"
 
                     played_for_m_body = ""
                     played_for_m_body_html = ""
 
-                    # Handling how long user played the last track - in case track duration is available
-                    if track_duration > 0 and lf_track_ts_start_after_resume > 0:
-                        played_for_time = lf_active_ts_last - lf_track_ts_start_after_resume
-                        listened_percentage = (played_for_time) / (track_duration - 1)
+                    # Handling how long user played the last track
+                    if inactive['played_for_time'] is not None:
+                        played_for_time = inactive['played_for_time']
+                        # In case track duration is available
+                        if track_duration > 0:
+                            listened_percentage = (played_for_time) / (track_duration - 1)
 
-                        if (played_for_time) < (track_duration - LASTFM_ACTIVE_CHECK_INTERVAL - 1):
-                            played_for = f"{display_time(played_for_time)} (out of {display_time(track_duration)})"
-                            played_for_html = f"<b>{display_time(played_for_time)}</b> (out of {display_time(track_duration)})"
-                            played_for += f" ({int(listened_percentage * 100)}%)"
-                            played_for_html += f" ({int(listened_percentage * 100)}%)"
+                            if (played_for_time) < (track_duration - LASTFM_ACTIVE_CHECK_INTERVAL - 1):
+                                played_for = f"{display_time(played_for_time)} (out of {display_time(track_duration)})"
+                                played_for_html = f"<b>{display_time(played_for_time)}</b> (out of {display_time(track_duration)})"
+                                played_for += f" ({int(listened_percentage * 100)}%)"
+                                played_for_html += f" ({int(listened_percentage * 100)}%)"
+                            else:
+                                played_for = display_time(played_for_time)
+                                played_for_html = f"<b>{display_time(played_for_time)}</b>"
+                        # In case track duration is NOT available
                         else:
                             played_for = display_time(played_for_time)
-                            played_for_html = f"<b>{display_time(played_for_time)}</b>"
+                            played_for_html = f"<b>{played_for}</b>"
 
                         played_for_m_body = f"\n\nUser played the last track for: {played_for}"
                         played_for_m_body_html = f"<br><br>User played the last track for: {played_for_html}"
                         print(f"User played the last track for: {played_for}")
                         if not PROGRESS_INDICATOR:
                             print("─" * HORIZONTAL_LINE)
-                    # Handling how long user played the last track - in case track duration is NOT available
-                    elif track_duration <= 0 and lf_track_ts_start_after_resume > 0:
-                        played_for = display_time((lf_active_ts_last) - lf_track_ts_start_after_resume)
-
-                        played_for_m_body = f"\n\nUser played the last track for: {played_for}"
-                        played_for_m_body_html = f"<br><br>User played the last track for: <b>{played_for}</b>"
-                        played_for_str = f"User played the last track for: {played_for}"
-
-                        print(played_for_str)
-                        if not PROGRESS_INDICATOR:
-                            print("─" * HORIZONTAL_LINE)
 
                     if PROGRESS_INDICATOR:
                         print("─" * HORIZONTAL_LINE)
 
                     print(f"*** User got INACTIVE after listening to music for {calculate_timespan(int(lf_active_ts_last), int(lf_active_ts_start))}")
                     print(f"*** User played music from {get_range_of_dates_from_tss(lf_active_ts_start, lf_active_ts_last, short=True, between_sep=' to ')}")
-                    playing_resumed_ts = int(time.time())
                     paused_mbody = ""
                     paused_mbody_html = ""
-                    pauses_number -= 1
                     if paused_counter > 0:
                         paused_percentage = int((paused_counter / (int(lf_active_ts_last) - int(lf_active_ts_start))) * 100)
                         print(f"*** User paused music {pauses_number} times for {display_time(paused_counter)} ({paused_percentage}%)")
                         paused_mbody = f"\nUser paused music {pauses_number} times for {display_time(paused_counter)} ({paused_percentage}%)"
                         paused_mbody_html = f"<br>User paused music <b>{pauses_number}</b> times for <b>{display_time(paused_counter)} ({paused_percentage}%)</b>"
-                    paused_counter = 0
 
                     listened_songs_text = f"*** User played {listened_songs} songs"
                     listened_songs_mbody = f"\n\nUser played {listened_songs} songs"
@@ -3450,11 +6014,7 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                     last_activity_to_save.append(artist)
                     last_activity_to_save.append(track)
                     last_activity_to_save.append(album)
-                    try:
-                        with open(lastfm_last_activity_file, 'w', encoding="utf-8") as f:
-                            json.dump(last_activity_to_save, f, indent=2)
-                    except Exception as e:
-                        print(f"* Cannot save last status to '{lastfm_last_activity_file}' file: {e}")
+                    save_last_activity(username, last_activity_to_save)
                     if INACTIVE_NOTIFICATION:
                         # Format recently listened songs list for email (skip if only 1 song)
                         recent_songs_mbody = ""
@@ -3513,99 +6073,615 @@ def lastfm_monitor_user(user, network, username, tracks, csv_file_name):
                         m_body_html = f"<html><head></head><body>Last played: <b><a href=\"{last_played_url}\">{escape(artist)} - {escape(track)}</a></b>{duration_m_body_html}{album_html_line}{music_section_html}{lyrics_section_html}User got inactive after listening to music for <b>{calculate_timespan(int(lf_active_ts_last), int(lf_active_ts_start))}</b><br>User played music from <b>{get_range_of_dates_from_tss(lf_active_ts_start, lf_active_ts_last, short=True, between_sep='</b> to <b>')}</b>{paused_mbody_html}{listened_songs_mbody_html}{played_for_m_body_html}{recent_songs_mbody_html}<br><br>Last activity: <b>{get_date_from_ts(lf_active_ts_last)}</b><br>Inactivity timer: {display_time(LASTFM_INACTIVITY_CHECK)}{get_cur_ts('<br>Timestamp: ')}</body></html>"
 
                         print(f"Sending email notification to {RECEIVER_EMAIL}")
-                        send_email(m_subject, m_body, m_body_html, SMTP_SSL)
+                        send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
                         email_sent = True
-                    lf_active_ts_start = 0
-                    playing_track = None
-                    last_track_start_ts = 0
-                    listened_songs = 0
-                    looped_songs = 0
-                    skipped_songs = 0
-                    pauses_number = 0
-                    recent_songs_session = []
                     print_cur_ts("\nTimestamp:\t\t\t")
 
-                if LIVENESS_CHECK_COUNTER and alive_counter >= LIVENESS_CHECK_COUNTER:
+                if 'liveness' in ev:
                     print_cur_ts("Liveness check, timestamp:\t")
-                    alive_counter = 0
 
-            # Stuff to do regardless if the user is online or offline
-            if last_track_start_ts > 0:
-                last_track_start_ts_old2 = last_track_start_ts
+                ERROR_500_ZERO_TIME_LIMIT = ERROR_500_TIME_LIMIT + LASTFM_CHECK_INTERVAL
+                if LASTFM_CHECK_INTERVAL * ERROR_500_NUMBER_LIMIT > ERROR_500_ZERO_TIME_LIMIT:
+                    ERROR_500_ZERO_TIME_LIMIT = LASTFM_CHECK_INTERVAL * (ERROR_500_NUMBER_LIMIT + 1)
+
+                if error_500_start_ts and ((int(time.time()) - error_500_start_ts) >= ERROR_500_ZERO_TIME_LIMIT):
+                    error_500_start_ts = 0
+                    error_500_counter = 0
+
+                ERROR_NETWORK_ZERO_TIME_LIMIT = ERROR_NETWORK_ISSUES_TIME_LIMIT + LASTFM_CHECK_INTERVAL
+                if LASTFM_CHECK_INTERVAL * ERROR_NETWORK_ISSUES_NUMBER_LIMIT > ERROR_NETWORK_ZERO_TIME_LIMIT:
+                    ERROR_NETWORK_ZERO_TIME_LIMIT = LASTFM_CHECK_INTERVAL * (ERROR_NETWORK_ISSUES_NUMBER_LIMIT + 1)
+
+                if error_network_issue_start_ts and ((int(time.time()) - error_network_issue_start_ts) >= ERROR_NETWORK_ZERO_TIME_LIMIT):
+                    error_network_issue_start_ts = 0
+                    error_network_issue_counter = 0
+
+            except Exception as e:
+
+                error_class = classify_lastfm_error(e)
+                breaker_delay = lastfm_breaker.record_error(e)
+                if breaker_delay:
+                    print(f"* Last.fm API unavailable ({lastfm_breaker.failures} consecutive errors, last: '{e}'), pausing requests for {display_time(int(breaker_delay))}")
+                    print_cur_ts("Timestamp:\t\t\t")
+
+                if error_class == ERROR_CLASS_SERVER:
+                    if not error_500_start_ts:
+                        error_500_start_ts = int(time.time())
+                        error_500_counter = 1
+                    else:
+                        error_500_counter += 1
+
+                if error_class in (ERROR_CLASS_NETWORK, ERROR_CLASS_RATE_LIMIT):
+                    if not error_network_issue_start_ts:
+                        error_network_issue_start_ts = int(time.time())
+                        error_network_issue_counter = 1
+                    else:
+                        error_network_issue_counter += 1
+
+                # Invalid / suspended API key errors are handled regardless of pending 50x and network errors, so the user never stays on a dead key
+                if error_class == ERROR_CLASS_AUTH:
+                    print(f"* Error: '{e}'")
+                    if lastfm_reassign_api_key(network, username):
+                        print(f"* API key might not be valid anymore, switched to another key from the pool ({api_key_label(network.api_key)})")
+                    else:
+                        print("* API key might not be valid anymore!")
+                        if ERROR_NOTIFICATION and not email_sent:
+                            m_subject = f"lastfm_monitor: API key error! (user: {username})"
+                            m_body = f"API key might not be valid anymore: {e}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+                            m_body_html = f"<html><head></head><body>API key might not be valid anymore: {escape(str(e))}{get_cur_ts('<br><br>Timestamp: ')}</body></html>"
+                            print(f"Sending email notification to {RECEIVER_EMAIL}")
+                            send_email_async(m_subject, m_body, m_body_html, SMTP_SSL)
+                            email_sent = True
+                    print_cur_ts("Timestamp:\t\t\t")
+
+                elif error_500_start_ts and (error_500_counter >= ERROR_500_NUMBER_LIMIT and (int(time.time()) - error_500_start_ts) >= ERROR_500_TIME_LIMIT):
+                    print(f"* Error 50x ({error_500_counter}x times in the last {display_time((int(time.time()) - error_500_start_ts))}): '{e}'")
+                    print_cur_ts("Timestamp:\t\t\t")
+                    error_500_start_ts = 0
+                    error_500_counter = 0
+
+                elif error_network_issue_start_ts and (error_network_issue_counter >= ERROR_NETWORK_ISSUES_NUMBER_LIMIT and (int(time.time()) - error_network_issue_start_ts) >= ERROR_NETWORK_ISSUES_TIME_LIMIT):
+                    print(f"* Error with network ({error_network_issue_counter}x times in the last {display_time((int(time.time()) - error_network_issue_start_ts))}): '{e}'")
+                    print_cur_ts("Timestamp:\t\t\t")
+                    error_network_issue_start_ts = 0
+                    error_network_issue_counter = 0
+
+                elif not error_500_start_ts and not error_network_issue_start_ts:
+                    print(f"* Error: '{e}'")
+                    print_cur_ts("Timestamp:\t\t\t")
+
+            if machine.lf_user_online:
+                check_interval = LASTFM_ACTIVE_CHECK_INTERVAL
+            else:
+                check_interval = LASTFM_CHECK_INTERVAL
+
+            if CHECKPOINT_INTERVAL > 0 and (int(time.time()) - checkpoint_saved_ts) >= CHECKPOINT_INTERVAL:
+                save_monitor_checkpoint(username, checkpoint_state())
+                checkpoint_saved_ts = int(time.time())
+
+            check_interval = max(check_interval - enrichment_wait, 0)
+            debug_print(f"Sleeping for {check_interval:.0f}s before next check")
+            time.sleep(check_interval)
+
+            new_track = None
+    finally:
+        # The session ended (Ctrl+C, error or stop in supervisor mode), its final state is checkpointed right away instead of at exit
+        atexit.unregister(save_exit_checkpoint)
+        if CHECKPOINT_INTERVAL > 0:
+            save_exit_checkpoint()
+        if friends_executor:
+            friends_executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Reads the users file for supervisor mode: one Last.fm username per line, empty lines and lines starting with # are skipped
+def read_users_file(users_file):
+    with open(users_file, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    users = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#") and line not in users:
+            users.append(line)
+    return users
+
+
+# Shards users across the given number of workers; users present in previous assignment (username -> worker index) stay
+# on their worker, new users go to the least loaded one, so adding or removing users only restarts the affected workers
+def supervisor_assign_users(users, workers, previous=None):
+    previous = previous or {}
+    shards = [[] for _ in range(workers)]
+    new_users = []
+    for username in users:
+        worker_id = previous.get(username)
+        if worker_id is not None and worker_id < workers:
+            shards[worker_id].append(username)
+        else:
+            new_users.append(username)
+    for username in new_users:
+        min(shards, key=len).append(username)
+    return shards
+
+
+# Returns the CSV file name used for the user in supervisor mode; eg. lastfm_scrobbles.csv -> lastfm_scrobbles_<username>.csv
+def supervisor_csv_file(username):
+    if not CSV_FILE:
+        return ""
+    csv_path = Path(CSV_FILE)
+    return str(csv_path.with_name(f"{csv_path.stem}_{username}{csv_path.suffix}"))
+
 
-            ERROR_500_ZERO_TIME_LIMIT = ERROR_500_TIME_LIMIT + LASTFM_CHECK_INTERVAL
-            if LASTFM_CHECK_INTERVAL * ERROR_500_NUMBER_LIMIT > ERROR_500_ZERO_TIME_LIMIT:
-                ERROR_500_ZERO_TIME_LIMIT = LASTFM_CHECK_INTERVAL * (ERROR_500_NUMBER_LIMIT + 1)
+# Returns module settings (config options possibly changed by config file, dotenv file and CLI flags) passed to worker processes
+def supervisor_settings():
+    skip = ("STATE_STORE", "CIRCUIT_BREAKERS", "SUPERVISOR_QUEUE")
+    return {k: v for k, v in globals().items() if k.isupper() and k not in skip and isinstance(v, (str, int, float, bool, list, tuple, type(None)))}
 
-            if error_500_start_ts and ((int(time.time()) - error_500_start_ts) >= ERROR_500_ZERO_TIME_LIMIT):
-                error_500_start_ts = 0
-                error_500_counter = 0
 
-            ERROR_NETWORK_ZERO_TIME_LIMIT = ERROR_NETWORK_ISSUES_TIME_LIMIT + LASTFM_CHECK_INTERVAL
-            if LASTFM_CHECK_INTERVAL * ERROR_NETWORK_ISSUES_NUMBER_LIMIT > ERROR_NETWORK_ZERO_TIME_LIMIT:
-                ERROR_NETWORK_ZERO_TIME_LIMIT = LASTFM_CHECK_INTERVAL * (ERROR_NETWORK_ISSUES_NUMBER_LIMIT + 1)
+# Queue used by supervisor mode workers to send log lines, email notifications and metrics to the supervisor
+SUPERVISOR_QUEUE = None
 
-            if error_network_issue_start_ts and ((int(time.time()) - error_network_issue_start_ts) >= ERROR_NETWORK_ZERO_TIME_LIMIT):
-                error_network_issue_start_ts = 0
-                error_network_issue_counter = 0
 
+# Replaces stdout in worker processes, every complete output line is sent to the supervisor tagged with the username of the monitoring thread
+class SupervisorQueueWriter(object):
+    def __init__(self, queue, worker_id):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.local = threading.local()
+        self.lines = 0
+
+    def write(self, message):
+        lines = (getattr(self.local, "buffer", "") + message).split("\n")
+        self.local.buffer = lines.pop()
+        username = getattr(self.local, "username", "")
+        for line in lines:
+            self.queue.put(("log", self.worker_id, username, line))
+            self.lines += 1
+
+    def flush(self):
+        pass
+
+
+# Replaces send_email() in worker processes, notifications are queued and sent by the supervisor
+def supervisor_queue_email(subject, body, body_html, use_ssl, smtp_timeout=15):
+    SUPERVISOR_QUEUE.put(("email", subject, body, body_html, use_ssl))
+    return 0
+
+
+# Monitors a single user in a worker thread, restarting the monitoring with backoff when it stops on error
+def supervisor_run_user(writer, username, tracks, stats):
+    writer.local.username = username
+    # Every user gets its own network object, so the HTTP transports are not shared between threads
+    network = pylast.LastFMNetwork(LASTFM_API_KEY, LASTFM_API_SECRET)
+    if LASTFM_API_URL and LASTFM_API_URL != 'https://ws.audioscrobbler.com/2.0/':
+        lastfm_network_set_api_url(network, LASTFM_API_URL)
+    lastfm_assign_api_key(network, username)
+    attempt = 0
+    while True:
+        started_ts = time.time()
+        try:
+            lastfm_monitor_user(network.get_user(username), network, username, tracks, supervisor_csv_file(username))
+        except SystemExit:
+            print(f"* Monitoring of user {username} stopped")
         except Exception as e:
+            print(f"* Error: monitoring of user {username} stopped: {e}")
+        if time.time() - started_ts >= SUPERVISOR_RESTART_MAX_DELAY:
+            attempt = 0
+        delay = jittered_backoff(SUPERVISOR_RESTART_DELAY, attempt, SUPERVISOR_RESTART_MAX_DELAY)
+        attempt += 1
+        stats["user_restarts"] += 1
+        print(f"* Restarting monitoring of user {username} in {display_time(int(delay) or 1)}")
+        time.sleep(delay)
+
+
+# Entry point of a supervisor mode worker process: monitors its shard of users in threads and reports metrics
+def supervisor_worker(worker_id, usernames, settings, tracks, queue):
+    global SUPERVISOR_QUEUE, STATE_STORE, API_KEY_POOL, stdout_bck, send_email
+
+    globals().update(settings)
+    SUPERVISOR_QUEUE = queue
+    # Do not block the exit of a worker on log lines the supervisor did not read yet
+    queue.cancel_join_thread()
+    send_email = supervisor_queue_email
+
+    # The supervisor stops workers with SIGTERM, exiting normally lets atexit handlers save checkpoints of all users
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
 
-            str_matches = ["http code 500", "http code 504", "http code 503", "http code 502"]
-            if any(x in str(e).lower() for x in str_matches):
-                if not error_500_start_ts:
-                    error_500_start_ts = int(time.time())
-                    error_500_counter = 1
-                else:
-                    error_500_counter += 1
+    stdout_bck = sys.stdout
+    writer = SupervisorQueueWriter(queue, worker_id)
+    sys.stdout = writer
 
-            str_matches = ["timed out", "timeout", "name resolution", "failed to resolve", "family not supported", "429 client", "aborted"]
-            if any(x in str(e).lower() for x in str_matches) or str(e) == '':
-                if not error_network_issue_start_ts:
-                    error_network_issue_start_ts = int(time.time())
-                    error_network_issue_counter = 1
-                else:
-                    error_network_issue_counter += 1
+    if STATE_DB_FILE:
+        try:
+            STATE_STORE = StateStore(STATE_DB_FILE, STATE_DB_FLUSH_INTERVAL)
+        except Exception as e:
+            print(f"* Error: State DB '{STATE_DB_FILE}' cannot be opened: {e}")
+            sys.exit(1)
 
-            if error_500_start_ts and (error_500_counter >= ERROR_500_NUMBER_LIMIT and (int(time.time()) - error_500_start_ts) >= ERROR_500_TIME_LIMIT):
-                print(f"* Error 50x ({error_500_counter}x times in the last {display_time((int(time.time()) - error_500_start_ts))}): '{e}'")
-                print_cur_ts("Timestamp:\t\t\t")
-                error_500_start_ts = 0
-                error_500_counter = 0
+    if CONFIG_RELOAD_INTERVAL > 0:
+        ConfigReloader(CONFIG_FILE_PATH, quiet=True).start()
 
-            elif error_network_issue_start_ts and (error_network_issue_counter >= ERROR_NETWORK_ISSUES_NUMBER_LIMIT and (int(time.time()) - error_network_issue_start_ts) >= ERROR_NETWORK_ISSUES_TIME_LIMIT):
-                print(f"* Error with network ({error_network_issue_counter}x times in the last {display_time((int(time.time()) - error_network_issue_start_ts))}): '{e}'")
-                print_cur_ts("Timestamp:\t\t\t")
-                error_network_issue_start_ts = 0
-                error_network_issue_counter = 0
-
-            elif not error_500_start_ts and not error_network_issue_start_ts:
-                print(f"* Error: '{e}'")
-
-                if 'Invalid API key' in str(e) or 'API Key Suspended' in str(e):
-                    print("* API key might not be valid anymore!")
-                    if ERROR_NOTIFICATION and not email_sent:
-                        m_subject = f"lastfm_monitor: API key error! (user: {username})"
-                        m_body = f"API key might not be valid anymore: {e}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-                        m_body_html = f"<html><head></head><body>API key might not be valid anymore: {escape(str(e))}{get_cur_ts('<br><br>Timestamp: ')}</body></html>"
-                        print(f"Sending email notification to {RECEIVER_EMAIL}")
-                        send_email(m_subject, m_body, m_body_html, SMTP_SSL)
-                        email_sent = True
-                print_cur_ts("Timestamp:\t\t\t")
+    if LASTFM_API_KEYS:
+        API_KEY_POOL = ApiKeyPool(parse_api_keys(LASTFM_API_KEY, LASTFM_API_SECRET, LASTFM_API_KEYS))
 
-        if lf_user_online:
-            check_interval = LASTFM_ACTIVE_CHECK_INTERVAL
-        else:
-            check_interval = LASTFM_CHECK_INTERVAL
+    stats = {"user_restarts": 0}
+    threads = []
+    for username in usernames:
+        thread = threading.Thread(target=supervisor_run_user, args=(writer, username, tracks, stats), name=f"monitor_{username}", daemon=True)
+        thread.start()
+        threads.append(thread)
 
-        debug_print(f"Sleeping for {check_interval}s before next check")
-        time.sleep(check_interval)
+    while True:
+        queue.put(("metrics", worker_id, {
+            "pid": os.getpid(),
+            "users": len(usernames),
+            "running": sum(1 for t in threads if t.is_alive()),
+            "user_restarts": stats["user_restarts"],
+            "cpu_time": time.process_time(),
+            "log_lines": writer.lines,
+            "api_keys": API_KEY_POOL.stats() if API_KEY_POOL else {},
+        }))
+        time.sleep(min(60, SUPERVISOR_STATUS_INTERVAL) if SUPERVISOR_STATUS_INTERVAL > 0 else 60)
+
+
+# Sends email notifications queued by the workers, so slow SMTP servers do not block the supervisor loop
+def supervisor_email_sender(email_queue):
+    while True:
+        subject, body, body_html, use_ssl = email_queue.get()
+        send_email(subject, body, body_html, use_ssl)
+
+
+# Returns a stable 64-bit hash of the value used to place nodes and usernames on the consistent hash ring
+def ring_hash(value):
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+# Consistent hash ring of cluster nodes; every node is placed on the ring multiple times (virtual nodes) for even
+# distribution, so when a node joins or leaves only the users of that node move
+class HashRing:
+    def __init__(self, nodes, virtual_nodes=CLUSTER_VIRTUAL_NODES):
+        self.nodes = sorted(set(nodes))
+        self.ring = sorted((ring_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(virtual_nodes))
+        self.hashes = [h for h, _ in self.ring]
+
+    # Returns the node responsible for the username (Last.fm usernames are case-insensitive)
+    def node_for(self, username):
+        if not self.ring:
+            return None
+        i = bisect.bisect(self.hashes, ring_hash(username.lower())) % len(self.ring)
+        return self.ring[i][1]
+
+
+# Cluster membership kept in a SQLite file shared by all nodes (e.g. on a network file system)
+class SqliteMembership:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cluster_nodes (node_id TEXT PRIMARY KEY, heartbeat_ts INTEGER NOT NULL)")
+        self.conn.commit()
+
+    def heartbeat(self, node_id):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO cluster_nodes (node_id, heartbeat_ts) VALUES (?, ?)", (node_id, int(time.time())))
+            self.conn.commit()
+
+    def leave(self, node_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM cluster_nodes WHERE node_id = ?", (node_id,))
+            self.conn.commit()
+
+    # Returns list of nodes which sent a heartbeat within the last ttl seconds
+    def alive_nodes(self, ttl):
+        with self.lock:
+            rows = self.conn.execute("SELECT node_id FROM cluster_nodes WHERE heartbeat_ts >= ?", (int(time.time()) - ttl,)).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# Cluster membership kept in a hash on a Redis-compatible server (Redis, Valkey, KeyDB or a local stand-in used in tests)
+# It speaks the RESP protocol directly, so no client library is needed
+class RedisMembership:
+    def __init__(self, host, port=6379, db=0, password=None, key="lastfm_monitor:cluster", timeout=10):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.key = key
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sock = None
+        self.reader = None
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.reader = self.sock.makefile("rb")
+        if self.password:
+            self._call("AUTH", self.password)
+        if self.db:
+            self._call("SELECT", self.db)
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by Redis server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {payload.decode('utf-8', 'replace')}")
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    def _call(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = str(arg).encode("utf-8")
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        self.sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    # Runs a command, reconnecting once if the connection was lost
+    def call(self, *args):
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    return self._call(*args)
+                except (OSError, ConnectionError):
+                    self.close_socket()
+                    if attempt:
+                        raise
+
+    def close_socket(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.reader = None
+
+    def heartbeat(self, node_id):
+        self.call("HSET", self.key, node_id, int(time.time()))
+
+    def leave(self, node_id):
+        self.call("HDEL", self.key, node_id)
+
+    def alive_nodes(self, ttl):
+        reply = self.call("HGETALL", self.key) or []
+        min_ts = int(time.time()) - ttl
+        return sorted(node for node, ts in zip(reply[::2], reply[1::2]) if int(ts) >= min_ts)
+
+    def close(self):
+        with self.lock:
+            self.close_socket()
+
+
+# Returns membership backend for the cluster URL: sqlite:///path/to/cluster.db or redis://[:password@]host[:port][/db]
+def cluster_membership_from_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        path = os.path.expanduser(url[len("sqlite://"):])
+        if not path:
+            raise ValueError("missing SQLite file path")
+        return SqliteMembership(path)
+    if parsed.scheme == "redis":
+        db = int(parsed.path.strip("/") or 0)
+        return RedisMembership(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password)
+    raise ValueError(f"unsupported cluster backend '{parsed.scheme}', use sqlite:// or redis://")
+
+
+# Supervisor mode: shards users from the users file across worker processes, restarts crashed workers, rebalances
+# when users are added or removed and aggregates logs, email notifications and metrics of all workers
+# In cluster mode (membership given) only users mapped to node_id on the consistent hash ring of alive nodes are monitored
+def run_supervisor(users_file, workers, tracks, membership=None, node_id=None):
+    import multiprocessing
+    import queue as queue_mod
+
+    ctx = multiprocessing.get_context("spawn")
+    out_queue = ctx.Queue()
+    email_queue = queue_mod.Queue()
+    threading.Thread(target=supervisor_email_sender, args=(email_queue,), name="supervisor_email", daemon=True).start()
 
-        new_track = None
+    try:
+        all_users = read_users_file(users_file)
+        users_mtime = os.path.getmtime(users_file)
+    except Exception as e:
+        print(f"* Error: Users file '{users_file}' cannot be read: {e}")
+        sys.exit(1)
+
+    nodes = []
+    if membership:
+        try:
+            membership.heartbeat(node_id)
+            nodes = sorted(set(membership.alive_nodes(CLUSTER_NODE_TTL)) | {node_id})
+        except Exception as e:
+            print(f"* Error: Cluster backend is not available: {e}")
+            sys.exit(1)
+
+    # Returns users this node is responsible for
+    def local_users():
+        if not membership:
+            return all_users
+        ring = HashRing(nodes)
+        return [username for username in all_users if ring.node_for(username) == node_id]
+
+    users = local_users()
+    shards = supervisor_assign_users(users, workers)
+    assignment = {username: i for i, shard in enumerate(shards) for username in shard}
+    procs = [{"process": None, "users": [], "started_ts": 0, "crashes": 0, "next_start_ts": 0, "metrics": {}} for _ in range(workers)]
+
+    def start_worker(i):
+        proc = procs[i]
+        proc["users"] = shards[i]
+        proc["metrics"] = {}
+        if not shards[i]:
+            proc["process"] = None
+            return
+        # Settings are taken at every start, so restarted workers get the reloaded configuration
+        proc["process"] = ctx.Process(target=supervisor_worker, args=(i, shards[i], supervisor_settings(), tracks, out_queue), name=f"lastfm_monitor_worker_{i}", daemon=True)
+        proc["process"].start()
+        proc["started_ts"] = time.time()
+        print(f"* Worker {i} started (pid {proc['process'].pid}), monitoring {len(shards[i])} user(s): {', '.join(shards[i])}")
+
+    def stop_worker(i):
+        process = procs[i]["process"]
+        procs[i]["process"] = None
+        if process is None or not process.is_alive():
+            return
+        process.terminate()
+        process.join(SUPERVISOR_STOP_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def print_status():
+        alive = [p for p in procs if p["process"] is not None and p["process"].is_alive()]
+        metrics = [p["metrics"] for p in alive if p["metrics"]]
+        print(f"* Supervisor status: workers alive: {len(alive)}/{sum(1 for s in shards if s)}, users: {len(assignment)} (running: {sum(m['running'] for m in metrics)}), "
+              f"worker restarts: {sum(p['crashes'] for p in procs)}, user restarts: {sum(m['user_restarts'] for m in metrics)}, workers CPU time: {sum(m['cpu_time'] for m in metrics):.1f}s")
+        api_keys = {}
+        for m in metrics:
+            for label, key_stats in m.get("api_keys", {}).items():
+                total = api_keys.setdefault(label, {"users": 0, "requests": 0, "requests_per_min": 0, "failures": 0, "healthy": True})
+                for name in ("users", "requests", "requests_per_min", "failures"):
+                    total[name] += key_stats[name]
+                total["healthy"] = total["healthy"] and key_stats["healthy"]
+        for label, total in api_keys.items():
+            print(f"* API key {label}: users: {total['users']}, requests: {total['requests']} ({total['requests_per_min']}/min), failures: {total['failures']}{'' if total['healthy'] else ', suspended'}")
+        print_cur_ts("Timestamp:\t\t\t")
+
+    # Applies changed list of users: only workers whose shard changed are restarted, they resume their users from checkpoints
+    def apply_users(new_users):
+        nonlocal users, shards, assignment
+        added = [u for u in new_users if u not in assignment]
+        removed = [u for u in assignment if u not in new_users]
+        if added or removed:
+            print(f"* {len(added)} user(s) added{' (' + ', '.join(added) + ')' if added else ''}, {len(removed)} removed{' (' + ', '.join(removed) + ')' if removed else ''}")
+        users = new_users
+        shards = supervisor_assign_users(users, workers, assignment)
+        assignment = {username: i for i, shard in enumerate(shards) for username in shard}
+        for i in range(workers):
+            if shards[i] != procs[i]["users"]:
+                stop_worker(i)
+                start_worker(i)
+        print_cur_ts("Timestamp:\t\t\t")
+
+    if membership:
+        print(f"Cluster node {node_id}, alive nodes: {', '.join(nodes)} ({len(users)} of {len(all_users)} user(s) assigned to this node)")
+    print(f"Monitoring {len(users)} user(s) from {users_file} with {sum(1 for s in shards if s)} worker process(es)")
+    print("─" * HORIZONTAL_LINE)
+
+    for i in range(workers):
+        start_worker(i)
+
+    reloader = ConfigReloader(CONFIG_FILE_PATH) if CONFIG_RELOAD_INTERVAL > 0 else None
+    reload_ts = status_ts = housekeeping_ts = heartbeat_ts = config_reload_ts = time.time()
+    try:
+        while True:
+            try:
+                message = out_queue.get(timeout=1)
+            except queue_mod.Empty:
+                message = None
+
+            if message is not None:
+                if message[0] == "log":
+                    _, worker_id, username, line = message
+                    print(f"[{username or f'worker {worker_id}'}] {line}")
+                elif message[0] == "email":
+                    email_queue.put(message[1:])
+                elif message[0] == "metrics":
+                    procs[message[1]]["metrics"] = message[2]
+
+            now = time.time()
+            if now - housekeeping_ts < 1:
+                continue
+            housekeeping_ts = now
+
+            # Restart crashed workers with backoff, the crash counter is reset once a worker runs long enough
+            for i, proc in enumerate(procs):
+                process = proc["process"]
+                if process is not None and not process.is_alive():
+                    if now - proc["started_ts"] >= SUPERVISOR_RESTART_MAX_DELAY:
+                        proc["crashes"] = 0
+                    delay = jittered_backoff(SUPERVISOR_RESTART_DELAY, proc["crashes"], SUPERVISOR_RESTART_MAX_DELAY)
+                    proc["crashes"] += 1
+                    proc["process"] = None
+                    proc["next_start_ts"] = now + delay
+                    print(f"* Worker {i} (pid {process.pid}) exited with code {process.exitcode}, restarting in {display_time(int(delay) or 1)}")
+                    print_cur_ts("Timestamp:\t\t\t")
+                elif process is None and shards[i] and proc["next_start_ts"] and now >= proc["next_start_ts"]:
+                    proc["next_start_ts"] = 0
+                    start_worker(i)
+
+            # Running workers reload the configuration themselves, the supervisor keeps its copy current for restarted workers
+            if reloader and now - config_reload_ts >= CONFIG_RELOAD_INTERVAL:
+                config_reload_ts = now
+                try:
+                    reloader.check()
+                except Exception as e:
+                    print(f"* Error reloading configuration: {e}")
+
+            if SUPERVISOR_RELOAD_INTERVAL > 0 and now - reload_ts >= SUPERVISOR_RELOAD_INTERVAL:
+                reload_ts = now
+                try:
+                    mtime = os.path.getmtime(users_file)
+                    if mtime != users_mtime:
+                        users_mtime = mtime
+                        all_users = read_users_file(users_file)
+                        print("* Users file changed")
+                        apply_users(local_users())
+                except Exception as e:
+                    print(f"* Error reloading users file '{users_file}': {e}")
+
+            # Heartbeat of this node; when nodes join or leave the ring changes and only users mapped to the changed nodes move
+            if membership and now - heartbeat_ts >= CLUSTER_HEARTBEAT_INTERVAL:
+                heartbeat_ts = now
+                try:
+                    membership.heartbeat(node_id)
+                    new_nodes = sorted(set(membership.alive_nodes(CLUSTER_NODE_TTL)) | {node_id})
+                    if new_nodes != nodes:
+                        joined = [n for n in new_nodes if n not in nodes]
+                        left = [n for n in nodes if n not in new_nodes]
+                        nodes = new_nodes
+                        print(f"* Cluster nodes changed:{' joined: ' + ', '.join(joined) if joined else ''}{' left: ' + ', '.join(left) if left else ''} (alive nodes: {len(nodes)})")
+                        apply_users(local_users())
+                except Exception as e:
+                    # Keep monitoring the current users, the other nodes will drop this node if the backend stays unavailable
+                    print(f"* Error: Cluster heartbeat failed: {e}")
+
+            if SUPERVISOR_STATUS_INTERVAL > 0 and now - status_ts >= SUPERVISOR_STATUS_INTERVAL:
+                status_ts = now
+                print_status()
+    finally:
+        for i in range(workers):
+            stop_worker(i)
+        # Leave the cluster right away, so the other nodes take over this node's users without waiting for CLUSTER_NODE_TTL
+        if membership:
+            try:
+                membership.leave(node_id)
+            except Exception:
+                pass
 
 
 def main():
-    global CLI_CONFIG_PATH, DOTENV_FILE, LIVENESS_CHECK_COUNTER, LASTFM_API_KEY, LASTFM_API_SECRET, SP_CLIENT_ID, SP_CLIENT_SECRET, CSV_FILE, MONITOR_LIST_FILE, FILE_SUFFIX, DISABLE_LOGGING, LF_LOGFILE, ACTIVE_NOTIFICATION, INACTIVE_NOTIFICATION, TRACK_NOTIFICATION, SONG_NOTIFICATION, SONG_ON_LOOP_NOTIFICATION, OFFLINE_ENTRIES_NOTIFICATION, ERROR_NOTIFICATION, LASTFM_CHECK_INTERVAL, LASTFM_ACTIVE_CHECK_INTERVAL, LASTFM_INACTIVITY_CHECK, TRACK_SONGS, PROGRESS_INDICATOR, USE_TRACK_DURATION_FROM_SPOTIFY, DO_NOT_SHOW_DURATION_MARKS, LASTFM_BREAK_CHECK_MULTIPLIER, SMTP_PASSWORD, stdout_bck, SP_TOKENS_FILE, TRACK_FOLLOWINGS, TRACK_FOLLOWERS, FRIENDS_CHECK_INTERVAL, FOLLOWERS_NOTIFICATION, FOLLOWINGS_NOTIFICATION, FRIENDS_CHANGE_COUNTER, FRIENDS_RETRY_INTERVAL, DEBUG_MODE, LASTFM_USERNAME_GLOBAL
+    global CLI_CONFIG_PATH, DOTENV_FILE, LIVENESS_CHECK_COUNTER, LASTFM_API_KEY, LASTFM_API_SECRET, SP_CLIENT_ID, SP_CLIENT_SECRET, CSV_FILE, MONITOR_LIST_FILE, FILE_SUFFIX, DISABLE_LOGGING, LF_LOGFILE, ACTIVE_NOTIFICATION, INACTIVE_NOTIFICATION, TRACK_NOTIFICATION, SONG_NOTIFICATION, SONG_ON_LOOP_NOTIFICATION, OFFLINE_ENTRIES_NOTIFICATION, ERROR_NOTIFICATION, LASTFM_CHECK_INTERVAL, LASTFM_ACTIVE_CHECK_INTERVAL, LASTFM_INACTIVITY_CHECK, TRACK_SONGS, PROGRESS_INDICATOR, USE_TRACK_DURATION_FROM_SPOTIFY, DO_NOT_SHOW_DURATION_MARKS, LASTFM_BREAK_CHECK_MULTIPLIER, SMTP_PASSWORD, stdout_bck, SP_TOKENS_FILE, TRACK_FOLLOWINGS, TRACK_FOLLOWERS, FRIENDS_CHECK_INTERVAL, FOLLOWERS_NOTIFICATION, FOLLOWINGS_NOTIFICATION, FRIENDS_CHANGE_COUNTER, FRIENDS_RETRY_INTERVAL, DEBUG_MODE, LASTFM_USERNAME_GLOBAL, STATE_DB_FILE, STATE_STORE, USERS_FILE, SUPERVISOR_WORKERS, CLUSTER_BACKEND, CLUSTER_NODE_ID, SHARED_CACHE_SOCKET, CONFIG_FILE_PATH, CONFIG_FILE_VALUES, WATCHLIST, API_KEY_POOL, CONNECTIVITY_CHECK
 
     if "--generate-config" in sys.argv:
         print(CONFIG_BLOCK.strip("\n"))
@@ -3825,6 +6901,12 @@ def main():
         type=int,
         help="Number of recent tracks to list (use with -l)"
     )
+    listing.add_argument(
+        "--stream",
+        dest="list_stream",
+        action="store_true",
+        help="Print the tracks page by page as they are fetched, newest first (use with -l, suited for large -n)"
+    )
 
     # Features & Output
     opts = parser.add_argument_group("Features & output")
@@ -3861,7 +6943,7 @@ def main():
         dest="csv_file",
         metavar="CSV_FILE",
         type=str,
-        help="Write every scrobble to a CSV file"
+        help="Write every scrobble to a CSV file (.parquet, .arrow or .ndjson extension selects a columnar/NDJSON export)"
     )
     opts.add_argument(
         "-s", "--monitor-list",
@@ -3870,6 +6952,26 @@ def main():
         type=str,
         help="Filename with tracks/albums to alert on"
     )
+    opts.add_argument(
+        "--state-db",
+        dest="state_db",
+        metavar="DB_FILE",
+        type=str,
+        help="Keep per-user state in a single SQLite database instead of JSON files"
+    )
+    opts.add_argument(
+        "--shared-cache",
+        dest="shared_cache",
+        metavar="SOCKET",
+        type=str,
+        help="Share lookups with other monitor processes on the host via the cache daemon listening on the Unix socket"
+    )
+    opts.add_argument(
+        "--cache-daemon",
+        dest="cache_daemon",
+        action="store_true",
+        help="Run the shared cache daemon on the --shared-cache / SHARED_CACHE_SOCKET socket and exit when interrupted"
+    )
     opts.add_argument(
         "--track-followings",
         dest="track_followings",
@@ -3898,8 +7000,47 @@ def main():
         default=None,
         help="Enable debug mode (full API traces, internal logic logs)"
     )
+    opts.add_argument(
+        "--startup-profile",
+        dest="startup_profile",
+        action="store_true",
+        default=None,
+        help="Report how long imports and each startup phase took"
+    )
+
+    # Supervisor mode
+    supervisor = parser.add_argument_group("Supervisor mode (multiple users)")
+    supervisor.add_argument(
+        "--users-file",
+        dest="users_file",
+        metavar="USERS_FILE",
+        type=str,
+        help="Monitor all Last.fm users listed in the file (one per line) instead of LASTFM_USERNAME"
+    )
+    supervisor.add_argument(
+        "--workers",
+        dest="workers",
+        metavar="N",
+        type=int,
+        help="Number of worker processes the users are sharded across (default: one per CPU core)"
+    )
+    supervisor.add_argument(
+        "--cluster",
+        dest="cluster",
+        metavar="BACKEND_URL",
+        type=str,
+        help="Split users with other nodes using membership backend: sqlite:///path/cluster.db or redis://host:port/db"
+    )
+    supervisor.add_argument(
+        "--node-id",
+        dest="node_id",
+        metavar="NAME",
+        type=str,
+        help="Unique name of this node in the cluster (default: host name)"
+    )
 
     args = parser.parse_args()
+    startup_phase("argument parsing")
 
     if len(sys.argv) == 1:
         parser.print_help(sys.stderr)
@@ -3918,6 +7059,8 @@ def main():
         try:
             with open(cfg_path, "r") as cf:
                 exec(cf.read(), globals())
+            CONFIG_FILE_PATH = cfg_path
+            CONFIG_FILE_VALUES = tuple(read_config_values(cfg_path).items())
         except Exception as e:
             print(f"* Error loading config file '{cfg_path}': {e}")
             sys.exit(1)
@@ -3955,10 +7098,24 @@ def main():
             if val is not None:
                 globals()[secret] = val
 
-    if not check_internet():
-        sys.exit(1)
+    startup_phase("config and dotenv files")
+
+    if args.shared_cache:
+        SHARED_CACHE_SOCKET = args.shared_cache
+
+    if args.cache_daemon:
+        if not SHARED_CACHE_SOCKET:
+            print("* Error: --cache-daemon requires socket path set via --shared-cache or SHARED_CACHE_SOCKET")
+            sys.exit(1)
+        run_cache_daemon(os.path.expanduser(SHARED_CACHE_SOCKET))
+        sys.exit(0)
+
+    # Runs while the rest of the startup goes on, the monitoring checks it once its first requests are sent
+    CONNECTIVITY_CHECK = get_startup_executor().submit(check_internet, CHECK_INTERNET_URL)
 
     if args.send_test_email:
+        if not connectivity_ok():
+            sys.exit(1)
         print("* Sending test email notification ...\n")
         if send_email("lastfm_monitor: test email", "This is test email - your SMTP settings seems to be correct !", "", SMTP_SSL, smtp_timeout=5) == 0:
             print("* Email sent successfully !")
@@ -3966,10 +7123,49 @@ def main():
             sys.exit(1)
         sys.exit(0)
 
-    if not args.username:
+    if args.users_file:
+        USERS_FILE = os.path.expanduser(args.users_file)
+    else:
+        if USERS_FILE:
+            USERS_FILE = os.path.expanduser(USERS_FILE)
+
+    if args.username or args.list_recent:
+        USERS_FILE = ""
+
+    if not args.username and not USERS_FILE:
         print("* Error: LASTFM_USERNAME argument is required !")
         sys.exit(1)
 
+    if USERS_FILE and not os.path.isfile(USERS_FILE):
+        print(f"* Error: Users file '{USERS_FILE}' does not exist")
+        sys.exit(1)
+
+    if args.workers:
+        SUPERVISOR_WORKERS = args.workers
+
+    if SUPERVISOR_WORKERS <= 0:
+        SUPERVISOR_WORKERS = os.cpu_count() or 1
+
+    if args.cluster:
+        CLUSTER_BACKEND = args.cluster
+
+    if args.node_id:
+        CLUSTER_NODE_ID = args.node_id
+
+    if not CLUSTER_NODE_ID:
+        CLUSTER_NODE_ID = socket.gethostname()
+
+    cluster_membership = None
+    if CLUSTER_BACKEND and USERS_FILE:
+        try:
+            cluster_membership = cluster_membership_from_url(CLUSTER_BACKEND)
+        except Exception as e:
+            print(f"* Error: Cluster backend '{CLUSTER_BACKEND}' cannot be used: {e}")
+            sys.exit(1)
+    elif args.cluster:
+        print("* Error: --cluster requires supervisor mode (--users-file)")
+        sys.exit(1)
+
     if args.lastfm_api_key:
         LASTFM_API_KEY = args.lastfm_api_key
 
@@ -3984,10 +7180,17 @@ def main():
         print("* Error: LASTFM_API_SECRET (-w / --lastfm-secret) value is empty or incorrect")
         sys.exit(1)
 
+    if LASTFM_API_KEYS:
+        try:
+            API_KEY_POOL = ApiKeyPool(parse_api_keys(LASTFM_API_KEY, LASTFM_API_SECRET, LASTFM_API_KEYS))
+        except ValueError as e:
+            print(f"* Error: {e}")
+            sys.exit(1)
+
     if args.debug_mode is True:
         DEBUG_MODE = True
 
-    LASTFM_USERNAME_GLOBAL = args.username
+    LASTFM_USERNAME_GLOBAL = args.username or ""
 
     if args.spotify_creds:
         try:
@@ -4016,7 +7219,12 @@ def main():
         LASTFM_BREAK_CHECK_MULTIPLIER = args.break_multiplier
 
     network = pylast.LastFMNetwork(LASTFM_API_KEY, LASTFM_API_SECRET)
+    if LASTFM_API_URL and LASTFM_API_URL != 'https://ws.audioscrobbler.com/2.0/':
+        lastfm_network_set_api_url(network, LASTFM_API_URL)
+    if API_KEY_POOL:
+        lastfm_assign_api_key(network, args.username or "")
     user = network.get_user(args.username)
+    startup_phase("Last.fm client")
 
     if args.csv_file:
         CSV_FILE = os.path.expanduser(args.csv_file)
@@ -4026,22 +7234,35 @@ def main():
 
     if CSV_FILE:
         try:
-            with open(CSV_FILE, 'a', newline='', buffering=1, encoding="utf-8") as _:
-                pass
+            if export_format(CSV_FILE) in ("parquet", "arrow"):
+                # Fails early with install instructions if pyarrow is missing, part files are created once there is something to write
+                debug_print(f"Exporting to {export_format(CSV_FILE)} files with pyarrow {pa.__version__}")
+            else:
+                with open(CSV_FILE, 'a', newline='', buffering=1, encoding="utf-8") as _:
+                    pass
         except Exception as e:
             print(f"* Error: CSV file cannot be opened for writing: {e}")
             sys.exit(1)
 
     if args.list_recent:
+        if not connectivity_ok():
+            sys.exit(1)
         if args.recent_count and args.recent_count > 0:
             tracks_n = args.recent_count
         else:
             tracks_n = 30
         try:
-            lastfm_list_tracks(args.username, user, network, tracks_n, CSV_FILE)
+            if args.list_stream:
+                lastfm_list_tracks_stream(args.username, user, network, tracks_n, CSV_FILE)
+            else:
+                lastfm_list_tracks(args.username, user, network, tracks_n, CSV_FILE)
         except Exception as e:
             print(f"* Error: {e}")
             sys.exit(1)
+        if args.startup_profile:
+            startup_phase("listing")
+            print()
+            print_startup_profile()
         sys.exit(0)
 
     if args.monitor_list:
@@ -4052,35 +7273,44 @@ def main():
 
     if MONITOR_LIST_FILE:
         try:
-            try:
-                with open(MONITOR_LIST_FILE, encoding="utf-8") as file:
-                    lines = file.read().splitlines()
-            except UnicodeDecodeError:
-                with open(MONITOR_LIST_FILE, encoding="cp1252") as file:
-                    lines = file.read().splitlines()
-
-            lf_tracks = [
-                line.strip()
-                for line in lines
-                if line.strip() and not line.strip().startswith("#")
-            ]
+            lf_tracks = read_watchlist_file(MONITOR_LIST_FILE)
         except Exception as e:
             print(f"* Error: File with Last.fm tracks cannot be opened: {e}")
             sys.exit(1)
+        try:
+            WATCHLIST = get_watchlist_matcher(lf_tracks)
+        except ValueError as e:
+            print(f"* Error: File with Last.fm tracks has an invalid entry: {e}")
+            sys.exit(1)
     else:
         lf_tracks = []
 
+    if args.state_db:
+        STATE_DB_FILE = os.path.expanduser(args.state_db)
+    else:
+        if STATE_DB_FILE:
+            STATE_DB_FILE = os.path.expanduser(STATE_DB_FILE)
+
+    if STATE_DB_FILE:
+        try:
+            STATE_STORE = StateStore(STATE_DB_FILE, STATE_DB_FLUSH_INTERVAL)
+        except Exception as e:
+            print(f"* Error: State DB '{STATE_DB_FILE}' cannot be opened: {e}")
+            sys.exit(1)
+
     if args.disable_logging is True:
         DISABLE_LOGGING = True
 
     if not DISABLE_LOGGING:
+        # In supervisor mode the aggregated output of all users goes to a log named after the users file
+        log_name = args.username or Path(USERS_FILE).stem
         log_path = Path(os.path.expanduser(LF_LOGFILE))
         if log_path.parent != Path('.'):
             if log_path.suffix == "":
-                log_path = log_path.parent / f"{log_path.name}_{args.username}.log"
+                log_path = log_path.parent / f"{log_path.name}_{log_name}.log"
         else:
             if log_path.suffix == "":
-                log_path = Path(f"{log_path.name}_{args.username}.log")
+                log_path = Path(f"{log_path.name}_{log_name}.log")
         log_path.parent.mkdir(parents=True, exist_ok=True)
         FINAL_LOG_PATH = str(log_path)
         sys.stdout = Logger(FINAL_LOG_PATH)
@@ -4174,13 +7404,37 @@ def main():
     print(f"* Liveness check:\t\t{bool(LIVENESS_CHECK_INTERVAL)}" + (f" ({display_time(LIVENESS_CHECK_INTERVAL)})" if LIVENESS_CHECK_INTERVAL else ""))
     print(f"* CSV logging enabled:\t\t{bool(CSV_FILE)}" + (f" ({CSV_FILE})" if CSV_FILE else ""))
     print(f"* Alert on monitored tracks:\t{bool(MONITOR_LIST_FILE)}" + (f" ({MONITOR_LIST_FILE})" if MONITOR_LIST_FILE else ""))
+    print(f"* State DB:\t\t\t{STATE_DB_FILE or 'None (JSON files)'}")
+    if USERS_FILE:
+        print(f"* Supervisor mode:\t\t{USERS_FILE} [workers: {SUPERVISOR_WORKERS}] [reload: {display_time(SUPERVISOR_RELOAD_INTERVAL)}]")
+        if cluster_membership:
+            print(f"* Cluster mode:\t\t\t{CLUSTER_BACKEND} [node: {CLUSTER_NODE_ID}] [heartbeat: {display_time(CLUSTER_HEARTBEAT_INTERVAL)}]")
+    if SHARED_CACHE_SOCKET:
+        print(f"* Shared cache:\t\t\t{SHARED_CACHE_SOCKET}")
+    print(f"* Circuit breaker:\t\t{CIRCUIT_BREAKER_FAILURE_THRESHOLD > 0}" + (f" (after {CIRCUIT_BREAKER_FAILURE_THRESHOLD} errors, backoff {display_time(CIRCUIT_BREAKER_BASE_DELAY)} - {display_time(CIRCUIT_BREAKER_MAX_DELAY)})" if CIRCUIT_BREAKER_FAILURE_THRESHOLD > 0 else ""))
+    if LASTFM_API_URL != 'https://ws.audioscrobbler.com/2.0/' or SPOTIFY_API_URL != 'https://api.spotify.com':
+        print(f"* API URLs:\t\t\t[Last.fm: {LASTFM_API_URL}] [Spotify: {SPOTIFY_API_URL}]")
     print(f"* Output logging enabled:\t{not DISABLE_LOGGING}" + (f" ({FINAL_LOG_PATH})" if not DISABLE_LOGGING else ""))
     if TRACK_SONGS or USE_TRACK_DURATION_FROM_SPOTIFY:
         print(f"* Spotify token cache file:\t{SP_TOKENS_FILE or 'None (memory only)'}")
     print(f"* Configuration file:\t\t{cfg_path}")
+    print(f"* Config reload:\t\t" + (f"every {display_time(CONFIG_RELOAD_INTERVAL)}" if CONFIG_RELOAD_INTERVAL > 0 else "False"))
+    print(f"* API key pool:\t\t\t" + (f"{len(API_KEY_POOL)} keys" if API_KEY_POOL else "False"))
     print(f"* Dotenv file:\t\t\t{env_path or 'None'}")
     print(f"* Debug mode:\t\t\t{DEBUG_MODE}\n")
 
+    if args.startup_profile:
+        startup_phase("settings and summary")
+        print_startup_profile()
+
+    # In supervisor mode the monitoring runs in worker processes, so the signal controls below do not apply
+    if USERS_FILE:
+        if not connectivity_ok():
+            sys.exit(1)
+        run_supervisor(USERS_FILE, SUPERVISOR_WORKERS, lf_tracks, cluster_membership, CLUSTER_NODE_ID)
+        sys.stdout = stdout_bck
+        sys.exit(0)
+
     # We define signal handlers only for Linux, Unix & MacOS since Windows has limited number of signals supported
     if platform.system() != 'Windows':
         signal.signal(signal.SIGUSR1, toggle_active_inactive_notifications_signal_handler)
@@ -4192,6 +7446,9 @@ def main():
         signal.signal(signal.SIGABRT, decrease_inactivity_check_signal_handler)
         signal.signal(signal.SIGHUP, reload_secrets_signal_handler)
 
+    if CONFIG_RELOAD_INTERVAL > 0:
+        ConfigReloader(CONFIG_FILE_PATH).start()
+
     out = f"Monitoring user {args.username}"
     print(out)
     # print("-" * len(out))
@@ -4203,5 +7460,7 @@ def main():
     sys.exit(0)
 
 
+startup_phase("module init")
+
 if __name__ == "__main__":
     main()
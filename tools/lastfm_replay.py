@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Author: Michal Szymanski <misiektoja-github@rm-rf.ninja>
+v1.0
+
+lastfm_replay.py - Record/replay stand-in for the Last.fm and Spotify Web APIs used by lastfm_monitor
+
+In record mode the tool acts as a pass-through proxy: requests sent to it are forwarded to the real Last.fm
+and Spotify APIs and the responses (Last.fm API calls such as user.getRecentTracks and track.getInfo, Spotify
+search) are saved to a cassette file. In serve mode the recorded responses are replayed from the cassette
+with configurable latency, jitter and injected HTTP errors (500, 504, 429), so lastfm_monitor can be load
+tested repeatably on an offline machine.
+
+Point lastfm_monitor at the server via its config file:
+
+  LASTFM_API_URL = 'http://127.0.0.1:8765/2.0/'
+  SPOTIFY_API_URL = 'http://127.0.0.1:8765'
+  SPOTIFY_ACCOUNTS_URL = 'http://127.0.0.1:8765'
+  CHECK_INTERNET_URL = 'http://127.0.0.1:8765/'
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlsplit, urlencode
+
+CASSETTE_VERSION = 1
+
+UPSTREAM_LASTFM = "https://ws.audioscrobbler.com"
+UPSTREAM_SPOTIFY_API = "https://api.spotify.com"
+UPSTREAM_SPOTIFY_ACCOUNTS = "https://accounts.spotify.com"
+
+# Request parameters which identify the caller rather than the request, they are never stored in cassettes
+# (format stays in the key, as JSON responses of lastfm_monitor's JSON client and XML responses of pylast are recorded separately)
+SECRET_PARAMS = {"api_key", "api_sig", "sk"}
+
+
+def service_for_path(path):
+    if path.startswith("/2.0"):
+        return "lastfm"
+    if path.startswith("/api/token"):
+        return "spotify_accounts"
+    if path.startswith("/v1/"):
+        return "spotify"
+    return None
+
+
+def request_key(service, method, path, body):
+    split = urlsplit(path)
+    if service == "lastfm":
+        params = parse_qsl(split.query) + parse_qsl(body.decode("utf-8", "replace"))
+    else:
+        params = parse_qsl(split.query)
+    params = sorted((k, v.lower() if k in ("artist", "track", "album", "user", "q") else v) for k, v in params if k not in SECRET_PARAMS)
+    return f"{method} {split.path}?{urlencode(params)}"
+
+
+def load_cassette(path):
+    with open(path, "r", encoding="utf-8") as f:
+        cassette = json.load(f)
+    if cassette.get("version") != CASSETTE_VERSION:
+        raise ValueError(f"Unsupported cassette version: {cassette.get('version')}")
+    return cassette
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.interactions = []
+
+    def add(self, interaction):
+        with self.lock:
+            interaction["offset"] = round(time.time() - self.start, 3)
+            self.interactions.append(interaction)
+            self.save()
+
+    def save(self):
+        cassette = {"version": CASSETTE_VERSION, "recorded_ts": int(self.start), "interactions": self.interactions}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(cassette, f, indent=1)
+
+
+class Player:
+    def __init__(self, cassette, mode="sequence", speed=1.0):
+        self.mode = mode
+        self.speed = speed
+        self.start = time.time()
+        self.lock = threading.Lock()
+        self.responses = {}
+        self.cursors = {}
+        for interaction in cassette["interactions"]:
+            self.responses.setdefault(interaction["key"], []).append(interaction)
+
+    # Picks the response for the key: in sequence mode consecutive requests get consecutive recordings (the last one repeats),
+    # in timeline mode the most recent recording relative to the elapsed (scaled) time since the server started
+    def pick(self, key):
+        recorded = self.responses.get(key)
+        if not recorded:
+            return None
+        with self.lock:
+            if self.mode == "timeline":
+                elapsed = (time.time() - self.start) * self.speed
+                chosen = recorded[0]
+                for interaction in recorded:
+                    if interaction["offset"] - recorded[0]["offset"] <= elapsed:
+                        chosen = interaction
+                return chosen
+            i = self.cursors.get(key, 0)
+            self.cursors[key] = i + 1
+            return recorded[min(i, len(recorded) - 1)]
+
+
+def make_handler(args, recorder=None, player=None):
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def do_GET(self):
+            self.handle_api("GET")
+
+        def do_POST(self):
+            self.handle_api("POST")
+
+        def send(self, status, body, content_type="application/json", headers=None):
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def handle_api(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            service = service_for_path(self.path)
+            if service is None:
+                # Connectivity check (CHECK_INTERNET_URL) and anything unknown
+                self.send(200, "OK", "text/plain")
+                return
+            if recorder:
+                self.record(service, method, body)
+            else:
+                self.replay(service, method, body)
+
+        def record(self, service, method, body):
+            upstream = {"lastfm": UPSTREAM_LASTFM, "spotify": UPSTREAM_SPOTIFY_API, "spotify_accounts": UPSTREAM_SPOTIFY_ACCOUNTS}[service]
+            headers = {name: self.headers[name] for name in ("Authorization", "Content-Type", "User-Agent") if self.headers.get(name)}
+            request = urllib.request.Request(upstream + self.path, data=body if method == "POST" else None, headers=headers, method=method)
+            start = time.time()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    status, content_type, data = response.status, response.headers.get("Content-Type", ""), response.read()
+            except urllib.error.HTTPError as e:
+                status, content_type, data = e.code, e.headers.get("Content-Type", ""), e.read()
+            except Exception as e:
+                self.send(502, json.dumps({"error": str(e)}))
+                return
+            elapsed = round(time.time() - start, 3)
+            # Access tokens are credentials, they are synthesized during replay instead of being stored
+            if service != "spotify_accounts":
+                recorder.add({"service": service, "key": request_key(service, method, self.path, body), "status": status, "content_type": content_type, "body": data.decode("utf-8", "replace"), "elapsed": elapsed})
+            print(f"{status}\t{elapsed:.3f}s\t{service}\t{request_key(service, method, self.path, body)}")
+            self.send(status, data, content_type or "application/octet-stream")
+
+        def replay(self, service, method, body):
+            with rng_lock:
+                roll = rng.random()
+                delay = max(0.0, args.latency + rng.uniform(-args.jitter, args.jitter)) / 1000
+            if service == "spotify_accounts":
+                time.sleep(delay)
+                self.send(200, json.dumps({"access_token": "replay-token", "token_type": "Bearer", "expires_in": 3600}))
+                return
+            key = request_key(service, method, self.path, body)
+            interaction = player.pick(key)
+            if args.timing == "recorded" and interaction:
+                delay = interaction["elapsed"]
+            time.sleep(delay)
+
+            if roll < args.error_500:
+                self.send(500, "Internal Server Error", "text/plain")
+                return
+            roll -= args.error_500
+            if roll < args.error_504:
+                self.send(504, "Gateway Timeout", "text/plain")
+                return
+            roll -= args.error_504
+            if roll < args.error_429:
+                self.send(429, json.dumps({"error": {"status": 429, "message": "API rate limit exceeded"}}), headers={"Retry-After": "1"})
+                return
+
+            if interaction:
+                self.send(interaction["status"], interaction["body"], interaction.get("content_type") or "application/octet-stream")
+            elif service == "spotify" and self.path.startswith("/v1/browse/categories"):
+                # Token validity check
+                self.send(200, json.dumps({"categories": {"items": [{"id": "replay"}]}}))
+            elif service == "spotify":
+                self.send(200, json.dumps({"tracks": {"items": []}}))
+            else:
+                if args.verbose:
+                    print(f"* Not in cassette: {key}")
+                if "format=json" in key:
+                    self.send(200, json.dumps({"error": 6, "message": "Not found in cassette"}))
+                else:
+                    self.send(200, '<?xml version="1.0" encoding="UTF-8"?>\n<lfm status="failed"><error code="6">Not found in cassette</error></lfm>', "text/xml; charset=utf-8")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Record/replay stand-in for the Last.fm and Spotify Web APIs used by lastfm_monitor",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Record real API traffic of a monitoring session to a cassette
+  python lastfm_replay.py record session.json
+
+  # Replay it with 80 ms +/- 40 ms latency, 2% of 500 errors and 1% of 429 errors
+  python lastfm_replay.py serve session.json --latency 80 --jitter 40 --error-500 0.02 --error-429 0.01
+
+  # Replay responses following the recorded timeline 10 times faster, with recorded response times
+  python lastfm_replay.py serve session.json --mode timeline --speed 10 --timing recorded
+        """
+    )
+
+    parser.add_argument('command', choices=['record', 'serve'], help='Record real API responses or serve them from the cassette')
+    parser.add_argument('cassette', type=str, help='Path to the cassette (JSON) file')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--mode', choices=['sequence', 'timeline'], default='sequence', help='How repeated requests are answered: consecutive recordings (default) or following the recorded timeline')
+    parser.add_argument('--speed', type=float, default=1.0, help='Timeline speed-up factor for --mode timeline (default: 1.0)')
+    parser.add_argument('--timing', choices=['fixed', 'recorded'], default='fixed', help='Use --latency/--jitter (default) or the recorded response times')
+    parser.add_argument('--latency', type=float, default=0, metavar='MS', help='Added response latency in milliseconds (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS', help='Random +/- latency jitter in milliseconds (default: 0)')
+    parser.add_argument('--error-500', type=float, default=0, metavar='RATE', help='Fraction of requests answered with HTTP 500 (default: 0)')
+    parser.add_argument('--error-504', type=float, default=0, metavar='RATE', help='Fraction of requests answered with HTTP 504 (default: 0)')
+    parser.add_argument('--error-429', type=float, default=0, metavar='RATE', help='Fraction of requests answered with HTTP 429 (default: 0)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for repeatable latency and errors')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    args = parser.parse_args()
+
+    if args.error_500 + args.error_504 + args.error_429 > 1:
+        print("Error: the sum of error rates must not exceed 1", file=sys.stderr)
+        sys.exit(1)
+
+    recorder = player = None
+    if args.command == 'record':
+        recorder = Recorder(args.cassette)
+    else:
+        try:
+            player = Player(load_cassette(args.cassette), args.mode, args.speed)
+        except Exception as e:
+            print(f"Error: cannot load cassette: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args, recorder, player))
+    if recorder:
+        print(f"Recording to {args.cassette}, listening on http://{args.host}:{args.port}")
+    else:
+        print(f"Serving {sum(len(v) for v in player.responses.values())} recorded responses ({len(player.responses)} unique requests) on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,12 @@ v1.0
 lastfm_wrapped.py - Generate Spotify Wrapped-style statistics from lastfm_monitor CSV data
 
 This tool analyzes CSV files generated by lastfm_monitor.py and provides statistics similar to Spotify Wrapped,
-including top artists, tracks and albums.
+including top artists, tracks and albums. NDJSON files and Parquet / Arrow exports (directories of part files,
+reading them requires pyarrow) written by lastfm_monitor.py are read as well.
 """
 
 import csv
+import json
 import argparse
 import sys
 from datetime import datetime, date
@@ -78,6 +80,78 @@ def read_csv_data(csv_file):
     return data
 
 
+def read_ndjson_data(ndjson_file):
+    data = []
+
+    try:
+        with open(ndjson_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    data.append({
+                        'date': datetime.fromtimestamp(int(row['Date'])),
+                        'artist': (row.get('Artist') or '').strip(),
+                        'track': (row.get('Track') or '').strip(),
+                        'album': (row.get('Album') or '').strip(),
+                    })
+                except (ValueError, TypeError, KeyError) as e:
+                    print(f"Warning: Skipping invalid row: {e}", file=sys.stderr)
+                    continue
+
+    except FileNotFoundError:
+        raise FileNotFoundError(f"NDJSON file not found: {ndjson_file}")
+    except Exception as e:
+        raise RuntimeError(f"Error reading NDJSON file: {e}")
+
+    return data
+
+
+def read_columnar_data(path, file_format):
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise RuntimeError("Reading Parquet and Arrow files requires pyarrow, install it with: pip install pyarrow")
+
+    format_name = 'Parquet' if file_format == 'parquet' else 'Arrow'
+    if not Path(path).exists():
+        raise FileNotFoundError(f"{format_name} export not found: {path}")
+
+    try:
+        table = ds.dataset(path, format=file_format).to_table(columns=['Date', 'Artist', 'Track', 'Album'])
+    except Exception as e:
+        raise RuntimeError(f"Error reading {format_name} export: {e}")
+
+    # Timestamps are stored as epoch time (Parquet keeps them in milliseconds), they are turned into local time like the dates of CSV files
+    dates = table.column('Date').cast(pa.timestamp('s', tz='UTC')).cast(pa.int64()).to_pylist()
+    data = [
+        {
+            'date': datetime.fromtimestamp(ts),
+            'artist': (artist or '').strip(),
+            'track': (track or '').strip(),
+            'album': (album or '').strip(),
+        }
+        for ts, artist, track, album in zip(dates, table.column('Artist').to_pylist(), table.column('Track').to_pylist(), table.column('Album').to_pylist())
+        if ts is not None
+    ]
+    # Part files of several runs are not in chronological order
+    data.sort(key=lambda entry: entry['date'])
+    return data
+
+
+def read_history_data(path):
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.ndjson', '.jsonl'):
+        return read_ndjson_data(path)
+    if suffix == '.parquet':
+        return read_columnar_data(path, 'parquet')
+    if suffix == '.arrow':
+        return read_columnar_data(path, 'ipc')
+    return read_csv_data(path)
+
+
 def filter_by_date_range(data, start_date, end_date, end_inclusive=False):
     filtered = []
     for entry in data:
@@ -212,7 +286,7 @@ Examples:
     parser.add_argument(
         'csv_file',
         type=str,
-        help='Path to CSV file generated by lastfm_monitor.py'
+        help='Path to CSV file generated by lastfm_monitor.py (or its NDJSON, Parquet or Arrow export)'
     )
 
     parser.add_argument(
@@ -266,7 +340,7 @@ Examples:
         start_date, end_date = get_default_date_range()
 
     try:
-        data = read_csv_data(args.csv_file)
+        data = read_history_data(args.csv_file)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)